@@ -0,0 +1,164 @@
+# importing the libraries
+import json
+import os
+import pandas as pd
+import numpy as np
+from sklearn.model_selection import train_test_split
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.svm import SVC
+from sklearn.metrics import accuracy_score
+
+# independent variables used as model input, in training column order
+INDEPENDENT_VARS = ['academic_pressure', 'work_pressure', 'sleep_duration', 
+                    'work_study_hours', 'financial_stress', 'suicidal_thoughts', 
+                    'diet_Healthy', 'diet_Moderate', 'diet_Unhealthy']
+
+# hyperparameters used when no tuned config has been exported (see tuning.py)
+DEFAULT_PARAMS = {
+    'Random Forest': {'n_estimators': 80},
+    'SVM': {'kernel': 'rbf', 'C': 0.8}
+}
+BEST_CONFIG_FILE = 'best_config.json'
+
+# helper method that changes '7-8 hours' to 7.5
+def parse_time_range(time_str):
+    try:
+        if isinstance(time_str, (int, float)):
+            return time_str
+        
+        # Split the string by space and take the first part
+        time_part = time_str.split(' ')[0]
+        if '-' in time_part:
+            start, end = map(float, time_part.split('-'))
+            return (start + end) / 2
+        else:
+            return float(time_part)
+    except (ValueError, IndexError):
+        # Handle cases that don't fit the pattern
+        return np.nan
+
+# preprocessing steps shared by training and scoring (drops, renames, encodings)
+# bump PREPROCESSING_VERSION whenever they change so saved models are not scored with a different pipeline
+PREPROCESSING_VERSION = 1
+
+# drops the unused columns, renames the rest and encodes 'suicidal_thoughts' as 0/1
+def clean_columns(df):
+    # Drop irrelevant columns
+    df.drop(columns=['id', 'Gender', 'Age', 'City', 'Profession', 'CGPA', 'Study Satisfaction', 
+                     'Job Satisfaction', 'Degree', 
+                     'Family History of Mental Illness'], inplace=True, errors='ignore')
+        
+    # Rename the remaining independent variables for clarity
+    df.rename(columns={
+        'Academic Pressure': 'academic_pressure',
+        'Work Pressure': 'work_pressure',
+        'Sleep Duration': 'sleep_duration',
+        'Dietary Habits': 'dietary_habits',
+        'Work/Study Hours': 'work_study_hours',
+        'Financial Stress': 'financial_stress',
+        'Depression': 'Depression',
+        'Have you ever had suicidal thoughts ?': 'suicidal_thoughts'
+    }, inplace=True)
+    
+    # Convert the 'suicidal_thoughts' variable to numerical format (0 and 1)
+    df['suicidal_thoughts'] = df['suicidal_thoughts'].apply(lambda x: 1 if str(x).strip().lower() == 'yes' else 0)
+    return df
+
+# turns the time range strings ("5-6 hours") into numbers
+def parse_ranges(df):
+    # Apply the new function to clean the time-based columns
+    df['sleep_duration'] = df['sleep_duration'].apply(parse_time_range)
+    df['work_study_hours'] = df['work_study_hours'].apply(parse_time_range)
+    return df
+
+# one-hot encodes the 'dietary_habits' column
+def encode_dummies(df):
+    # Convert the 'Dietary Habits' column into numerical features using one-hot encoding
+    return pd.get_dummies(df, columns=['dietary_habits'], prefix='diet', dtype=int)
+
+def preprocess_frame(df):
+    return encode_dummies(parse_ranges(clean_columns(df)))
+
+# loads and preprocesses the data
+def load_and_preprocess_data(csv_path='Student-Depression-Dataset.csv'):
+    print("Loading the dataset...")
+    try:
+        # Load the dataset from the CSV file
+        df = pd.read_csv(csv_path)
+        df = preprocess_frame(df)
+
+        # Handle potential missing values that may have been created
+        df.dropna(inplace=True)
+        
+        print(f"Dataset loaded and preprocessed!")
+        return df
+    except FileNotFoundError:
+        print("Error: The file 'student-mental-health.csv' was not found.")
+        print("Please download it from Kaggle and place it in this directory.")
+        return None
+    
+# helper method for model function calling
+def evaluate_model(model, X_test, y_test, model_name):
+    print(f"\n--- Evaluating {model_name} ---")
+    
+    # Make predictions on the testing data
+    y_pred = model.predict(X_test)
+
+    # Calculate and print accuracy
+    accuracy = accuracy_score(y_test, y_pred)
+    print(f"Accuracy: {accuracy:.4f}")
+
+# helper method that loads the tuned hyperparameters exported by tuning.py, falling back to the defaults
+def load_best_config(path=BEST_CONFIG_FILE):
+    config = {name: dict(params) for name, params in DEFAULT_PARAMS.items()}
+    if not os.path.exists(path):
+        return config
+    try:
+        with open(path, 'r') as f:
+            tuned = json.load(f)
+    except (json.JSONDecodeError, OSError) as e:
+        print(f"Warning: could not read '{path}' ({e}), using default hyperparameters.")
+        return config
+    for name, params in tuned.items():
+        if name in config:
+            config[name].update(params.get('params', {}))
+    print(f"Loaded tuned hyperparameters from '{path}'.")
+    return config
+    
+def main():
+    # Models: Random Forest and SVM
+    
+    # Load and preprocess the dataset
+    df = load_and_preprocess_data()
+    if df is None:
+        return
+    
+    # Separate input data (X) and output data (y)
+    # Ensure the columns exist in the DataFrame
+    try:
+        X = df[INDEPENDENT_VARS]    # input data
+        y = df['Depression']        # output data
+    except KeyError as e:
+        print(f"Error: Missing column in the dataset: {e}. Please check if the one-hot encoding was successful.")
+        print("Available columns:", df.columns.tolist())
+        return
+
+    # Split data into training and testing sets
+    X_train, X_test, y_train, y_test = train_test_split(
+        X, y, test_size=0.2, random_state=42, stratify=y
+    )
+
+    # Model Development: two models to compare (tuned hyperparameters if tuning.py has been run)
+    config = load_best_config()
+    models = {
+        'Random Forest': RandomForestClassifier(**config['Random Forest'], random_state=42),
+        'SVM': SVC(**config['SVM'], random_state=42)
+    }
+
+    # Train and evaluate each model
+    for name, model in models.items():
+        model.fit(X_train, y_train)
+        evaluate_model(model, X_test, y_test, name)
+        
+if __name__ == "__main__":
+    main()
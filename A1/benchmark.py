@@ -0,0 +1,203 @@
+# reproducible timing and memory benchmark for every stage of the A1 pipeline
+#
+# Usage:
+#   python benchmark.py --scales 10,100,1000                  # writes benchmark_report.json
+#   python benchmark.py --scales 10 --save-baseline           # records benchmark_baseline.json
+#   python benchmark.py --scales 10 --baseline benchmark_baseline.json
+#
+# Synthetic datasets with the same schema as Student-Depression-Dataset.csv are built by
+# resampling real rows (with fresh ids and a fixed seed), so value distributions, the share
+# of unparseable sleep durations and the class balance all match the original. Each stage
+# is timed separately and its peak Python-heap allocation is recorded with tracemalloc.
+# Preprocessing calls the same helpers as a1.preprocess_frame, one stage each, so the benchmark
+# always measures the pipeline that training and scoring actually run.
+# Model fits are capped at --max-fit-rows since SVC training grows quadratically.
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import sklearn
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.model_selection import train_test_split
+from sklearn.svm import SVC
+
+from a1 import DEFAULT_PARAMS, INDEPENDENT_VARS, PREPROCESSING_VERSION, clean_columns, encode_dummies, parse_ranges
+
+CSV_PATH = 'Student-Depression-Dataset.csv'
+BENCH_DIR = os.path.join('.cache', 'bench')
+REPORT_FILE = 'benchmark_report.json'
+BASELINE_FILE = 'benchmark_baseline.json'
+
+# --- SYNTHETIC DATA ---
+
+def synthetic_dataset(scale, csv_path=CSV_PATH, seed=42, chunk_rows=500000):
+    """Writes (once) and returns the path of a dataset `scale` times the size of the original."""
+    os.makedirs(BENCH_DIR, exist_ok=True)
+    out_path = os.path.join(BENCH_DIR, f"synthetic_{scale}x_seed{seed}.csv")
+    if os.path.exists(out_path):
+        return out_path
+
+    source = pd.read_csv(csv_path)
+    total_rows = len(source) * scale
+    rng = np.random.RandomState(seed)
+    tmp_path = out_path + '.tmp'
+    written = 0
+    while written < total_rows:
+        n = min(chunk_rows, total_rows - written)
+        chunk = source.iloc[rng.randint(len(source), size=n)].copy()
+        chunk['id'] = np.arange(written, written + n)
+        chunk.to_csv(tmp_path, mode='a', header=(written == 0), index=False)
+        written += n
+    os.replace(tmp_path, out_path)
+    return out_path
+
+# --- STAGE MEASUREMENT ---
+
+@contextmanager
+def stage(results, name):
+    tracemalloc.start()
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        seconds = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        results[name] = {'seconds': round(seconds, 4), 'peak_mb': round(peak / 2**20, 2)}
+
+def run_pipeline(csv_path, max_fit_rows):
+    """Runs the A1 pipeline stage by stage (the steps of load_and_preprocess_data and main) and measures each."""
+    results = {}
+
+    with stage(results, 'csv_read'):
+        df = pd.read_csv(csv_path)
+    n_rows = len(df)
+
+    # the three steps of a1.preprocess_frame, timed one by one
+    with stage(results, 'clean_columns'):
+        df = clean_columns(df)
+
+    with stage(results, 'parse_time_range'):
+        df = parse_ranges(df)
+
+    with stage(results, 'get_dummies'):
+        df = encode_dummies(df)
+
+    with stage(results, 'dropna'):
+        df.dropna(inplace=True)
+
+    with stage(results, 'split'):
+        X_train, X_test, y_train, y_test = train_test_split(
+            df[INDEPENDENT_VARS], df['Depression'], test_size=0.2, random_state=42, stratify=df['Depression']
+        )
+
+    fit_rows = min(len(X_train), max_fit_rows)
+    X_fit, y_fit = X_train.iloc[:fit_rows], y_train.iloc[:fit_rows]
+    rf = RandomForestClassifier(**DEFAULT_PARAMS['Random Forest'], random_state=42)
+    svc = SVC(**DEFAULT_PARAMS['SVM'], random_state=42)
+
+    with stage(results, 'rf_fit'):
+        rf.fit(X_fit, y_fit)
+    with stage(results, 'svc_fit'):
+        svc.fit(X_fit, y_fit)
+
+    predict_rows = min(len(X_test), max_fit_rows)
+    with stage(results, 'rf_predict'):
+        rf.predict(X_test.iloc[:predict_rows])
+    with stage(results, 'svc_predict'):
+        svc.predict(X_test.iloc[:predict_rows])
+
+    return {
+        'rows': n_rows,
+        'rows_after_dropna': len(df),
+        'fit_rows': fit_rows,
+        'predict_rows': predict_rows,
+        'stages': results
+    }
+
+# --- REPORTING ---
+
+def environment():
+    return {
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'python': sys.version.split()[0],
+        'platform': platform.platform(),
+        'processor': platform.processor() or platform.machine(),
+        'cpu_count': os.cpu_count(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'sklearn': sklearn.__version__
+    }
+
+def compare_with_baseline(report, baseline, threshold, min_delta=0.05):
+    """Prints per-stage time ratios against the baseline; returns the stages slower than `threshold`x."""
+    regressions = []
+    print(f"\n{'scale':>6} {'stage':<18} {'baseline s':>11} {'current s':>10} {'ratio':>7}")
+    for scale, current in report['results'].items():
+        previous = baseline.get('results', {}).get(scale)
+        if previous is None:
+            print(f"{scale:>6} (no baseline for this scale)")
+            continue
+        for name, measured in current['stages'].items():
+            before = previous['stages'].get(name)
+            if before is None:
+                continue
+            ratio = measured['seconds'] / before['seconds'] if before['seconds'] > 0 else float('inf')
+            # stages of a few milliseconds are mostly timer noise, so also require an absolute slowdown
+            regressed = ratio > threshold and measured['seconds'] - before['seconds'] > min_delta
+            flag = "  <-- regression" if regressed else ""
+            print(f"{scale:>6} {name:<18} {before['seconds']:>11.4f} {measured['seconds']:>10.4f} {ratio:>6.2f}x{flag}")
+            if regressed:
+                regressions.append((scale, name, ratio))
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark every stage of the A1 pipeline on synthetic data.")
+    parser.add_argument('--scales', default='10,100,1000', help="comma-separated multiples of the original dataset size")
+    parser.add_argument('--max-fit-rows', type=int, default=50000, help="cap on rows used for model fit/predict stages")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', default=REPORT_FILE)
+    parser.add_argument('--baseline', help="report to compare against; exits with status 1 on regressions")
+    parser.add_argument('--threshold', type=float, default=1.2, help="slowdown ratio counted as a regression")
+    parser.add_argument('--min-delta', type=float, default=0.05, help="seconds a stage must slow down by to count")
+    parser.add_argument('--save-baseline', action='store_true', help=f"also write the report to {BASELINE_FILE}")
+    args = parser.parse_args()
+
+    report = {'environment': environment(), 'preprocessing_version': PREPROCESSING_VERSION,
+              'max_fit_rows': args.max_fit_rows, 'results': {}}
+    for scale in [int(s) for s in args.scales.split(',') if s.strip()]:
+        print(f"\n--- {scale}x ---")
+        path = synthetic_dataset(scale, seed=args.seed)
+        result = run_pipeline(path, args.max_fit_rows)
+        report['results'][f"{scale}x"] = result
+        for name, measured in result['stages'].items():
+            print(f"{name:<18} {measured['seconds']:>9.4f}s  peak {measured['peak_mb']:>9.2f} MB")
+
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"\nReport written to '{args.output}'.")
+    if args.save_baseline:
+        with open(BASELINE_FILE, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"Baseline written to '{BASELINE_FILE}'.")
+
+    if args.baseline:
+        with open(args.baseline, 'r') as f:
+            baseline = json.load(f)
+        if baseline.get('preprocessing_version') != PREPROCESSING_VERSION:
+            print("Note: the baseline was recorded with another preprocessing version.")
+        regressions = compare_with_baseline(report, baseline, args.threshold, args.min_delta)
+        if regressions:
+            print(f"\n{len(regressions)} stage(s) slower than {args.threshold}x the baseline.")
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
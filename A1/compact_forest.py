@@ -0,0 +1,191 @@
+# compact, array-backed inference for the trained A1 random forest
+#
+# Usage:
+#   python compact_forest.py export --model models/random_forest.joblib --out models/random_forest.npz
+#   python compact_forest.py bench --model models/random_forest.joblib
+#
+# Every tree of the fitted forest is flattened into shared contiguous NumPy arrays
+# (feature, threshold, left/right child, leaf value), so a serving process only needs
+# NumPy to load and score it. Traversal is vectorized over all samples and trees at once,
+# one tree level per step, and reproduces RandomForestClassifier.predict/predict_proba.
+import argparse
+import time
+
+import numpy as np
+
+LEAF = -1
+
+class CompactForest:
+    """A fitted random forest stored as flat node arrays."""
+
+    def __init__(self, feature, threshold, left, right, value, roots, classes, max_depth,
+                 feature_columns=None, preprocessing_version=None):
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.value = value
+        self.roots = roots
+        self.classes = classes
+        self.max_depth = int(max_depth)
+        self.feature_columns = feature_columns
+        self.preprocessing_version = preprocessing_version
+        # interleaved child table used during traversal: node i goes to _children[2 * i + went_right],
+        # and leaves point back to themselves so finished samples stay put without extra masking
+        node_ids = np.arange(len(left), dtype=np.int32)
+        is_leaf = left == LEAF
+        self._children = np.empty(2 * len(left), dtype=np.int32)
+        self._children[0::2] = np.where(is_leaf, node_ids, left)
+        self._children[1::2] = np.where(is_leaf, node_ids, right)
+
+    @classmethod
+    def from_sklearn(cls, forest, feature_columns=None, preprocessing_version=None):
+        features, thresholds, lefts, rights, values, roots = [], [], [], [], [], []
+        offset = 0
+        max_depth = 0
+        for estimator in forest.estimators_:
+            tree = estimator.tree_
+            is_leaf = tree.children_left == LEAF
+            # per-tree class fractions, exactly what DecisionTreeClassifier.predict_proba returns
+            value = tree.value[:, 0, :].astype(np.float64)
+            normalizer = value.sum(axis=1, keepdims=True)
+            normalizer[normalizer == 0.0] = 1.0
+            features.append(np.where(is_leaf, 0, tree.feature).astype(np.int32))
+            thresholds.append(tree.threshold.astype(np.float64))
+            lefts.append(np.where(is_leaf, LEAF, tree.children_left + offset).astype(np.int32))
+            rights.append(np.where(is_leaf, LEAF, tree.children_right + offset).astype(np.int32))
+            values.append(value / normalizer)
+            roots.append(offset)
+            offset += tree.node_count
+            max_depth = max(max_depth, tree.max_depth)
+
+        return cls(
+            feature=np.concatenate(features),
+            threshold=np.concatenate(thresholds),
+            left=np.concatenate(lefts),
+            right=np.concatenate(rights),
+            value=np.ascontiguousarray(np.concatenate(values)),
+            roots=np.asarray(roots, dtype=np.int32),
+            classes=np.asarray(forest.classes_),
+            max_depth=max_depth,
+            feature_columns=feature_columns,
+            preprocessing_version=preprocessing_version
+        )
+
+    def save(self, path):
+        np.savez(
+            path, feature=self.feature, threshold=self.threshold, left=self.left, right=self.right,
+            value=self.value, roots=self.roots, classes=self.classes, max_depth=self.max_depth,
+            feature_columns=np.asarray(self.feature_columns if self.feature_columns is not None else []),
+            preprocessing_version=-1 if self.preprocessing_version is None else self.preprocessing_version
+        )
+
+    @classmethod
+    def load(cls, path):
+        arrays = np.load(path, allow_pickle=False)
+        version = int(arrays['preprocessing_version'])
+        return cls(
+            feature=arrays['feature'], threshold=arrays['threshold'], left=arrays['left'],
+            right=arrays['right'], value=arrays['value'], roots=arrays['roots'],
+            classes=arrays['classes'], max_depth=int(arrays['max_depth']),
+            feature_columns=arrays['feature_columns'].tolist() or None,
+            preprocessing_version=None if version < 0 else version
+        )
+
+    def apply(self, X):
+        """Returns the leaf index reached in every tree, shape (n_samples, n_trees)."""
+        # sklearn trees compare float32 inputs against float64 thresholds; do the same to match exactly
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        n_samples, n_features = X.shape
+        flat_X = X.ravel()
+        # one entry per (tree, sample) pair, tree-major so each level's lookups stay within one tree at a time
+        row_offset = np.tile(np.arange(n_samples, dtype=np.int64) * n_features, len(self.roots))
+        nodes = np.repeat(self.roots, n_samples)
+        active = np.arange(nodes.shape[0])
+        for _ in range(self.max_depth):
+            current = nodes[active]
+            went_right = flat_X[row_offset[active] + self.feature[current]] > self.threshold[current]
+            following = self._children[2 * current + went_right]
+            moved = following != current
+            nodes[active] = following
+            # drop pairs that reached a leaf so deeper levels only touch the ones still descending
+            active = active[moved]
+            if active.shape[0] == 0:
+                break
+        return nodes.reshape(len(self.roots), n_samples).T
+
+    def predict_proba(self, X):
+        leaves = self.apply(X)
+        # accumulate tree by tree in estimator order, the same summation order sklearn uses
+        proba = np.zeros((leaves.shape[0], self.value.shape[1]), dtype=np.float64)
+        for t in range(leaves.shape[1]):
+            proba += self.value[leaves[:, t]]
+        proba /= leaves.shape[1]
+        return proba
+
+    def predict(self, X):
+        return self.classes.take(np.argmax(self.predict_proba(X), axis=1), axis=0)
+
+# --- EXPORT AND BENCHMARK ---
+
+def export_bundle(model_path, out_path):
+    from scoring import load_model
+
+    bundle = load_model(model_path)
+    if bundle['model_name'] != 'Random Forest':
+        raise ValueError(f"Only Random Forest bundles can be flattened, got '{bundle['model_name']}'.")
+    compact = CompactForest.from_sklearn(bundle['model'], bundle['feature_columns'], bundle['preprocessing_version'])
+    compact.save(out_path)
+    print(f"Flattened {len(compact.roots)} trees ({len(compact.feature)} nodes, max depth {compact.max_depth}) "
+          f"into '{out_path}'.")
+    return compact
+
+def benchmark(model_path, csv_path='Student-Depression-Dataset.csv',
+              batch_sizes=(1, 10, 100, 1000, 10000, 100000), repeats=20):
+    """Compares median predict latency of sklearn and CompactForest, and checks their outputs agree."""
+    from a1 import INDEPENDENT_VARS, load_and_preprocess_data
+    from scoring import load_model
+
+    forest = load_model(model_path)['model']
+    compact = CompactForest.from_sklearn(forest)
+    pool = load_and_preprocess_data(csv_path)[INDEPENDENT_VARS].to_numpy(dtype=np.float64)
+    rng = np.random.RandomState(0)
+
+    print(f"\n{'batch':>8} {'sklearn ms':>12} {'compact ms':>12} {'speedup':>8}  match")
+    for batch_size in batch_sizes:
+        X = pool[rng.randint(len(pool), size=batch_size)]
+        runs = max(3, repeats if batch_size <= 1000 else repeats // 4)
+        timings = {}
+        for name, predict in (('sklearn', forest.predict), ('compact', compact.predict)):
+            samples = []
+            for _ in range(runs):
+                start = time.perf_counter()
+                predict(X)
+                samples.append(time.perf_counter() - start)
+            timings[name] = np.median(samples) * 1000
+        match = (np.array_equal(forest.predict(X), compact.predict(X))
+                 and np.array_equal(forest.predict_proba(X), compact.predict_proba(X)))
+        print(f"{batch_size:>8} {timings['sklearn']:>12.3f} {timings['compact']:>12.3f} "
+              f"{timings['sklearn'] / timings['compact']:>7.1f}x  {'yes' if match else 'NO'}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Flatten and benchmark the A1 random forest.")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    export_parser = subparsers.add_parser('export', help="flatten a saved Random Forest bundle into a .npz file")
+    export_parser.add_argument('--model', required=True, help="bundle written by 'scoring.py export'")
+    export_parser.add_argument('--out', required=True)
+
+    bench_parser = subparsers.add_parser('bench', help="latency benchmark against sklearn for batch sizes 1 to 100k")
+    bench_parser.add_argument('--model', required=True)
+    bench_parser.add_argument('--csv', default='Student-Depression-Dataset.csv')
+    bench_parser.add_argument('--repeats', type=int, default=20)
+
+    args = parser.parse_args()
+    if args.command == 'export':
+        export_bundle(args.model, args.out)
+    else:
+        benchmark(args.model, args.csv, repeats=args.repeats)
+
+if __name__ == "__main__":
+    main()
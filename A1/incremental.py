@@ -0,0 +1,223 @@
+# incremental ingestion and retraining for when new survey rows are appended to the CSV
+#
+# Usage:
+#   python incremental.py --model models/random_forest.joblib
+#
+# The byte offset of the last fully ingested line is kept in .cache/incremental/ingest_state.json, so
+# each run only reads and preprocesses the rows appended since the previous run. Their
+# features are stored as a new part in the feature cache, and the state is saved right after
+# the part, so a crash in between leaves at most one orphan part that the next run discards.
+# The saved model is then updated
+# with just those rows where the estimator allows it (extra warm-started trees for the
+# random forest, partial_fit for online learners). Everything else, and every model once
+# --full-refit-days have passed, gets a full refit on the cached features.
+import argparse
+import glob
+import hashlib
+import io
+import json
+import os
+import time
+
+import numpy as np
+import pandas as pd
+from sklearn.base import clone
+
+from a1 import INDEPENDENT_VARS, PREPROCESSING_VERSION, preprocess_frame
+from scoring import load_model, save_model
+
+CACHE_DIR = '.cache'
+INCREMENTAL_DIR = os.path.join(CACHE_DIR, 'incremental')
+STATE_FILE = os.path.join(INCREMENTAL_DIR, 'ingest_state.json')
+CSV_PATH = 'Student-Depression-Dataset.csv'
+
+# --- INGEST STATE ---
+
+def empty_state(csv_path):
+    return {
+        'csv_path': os.path.abspath(csv_path),
+        'preprocessing_version': PREPROCESSING_VERSION,
+        'header_hash': None,
+        'byte_offset': 0,
+        'n_rows': 0,
+        'last_id': None,
+        'model_rows': 0,
+        'last_full_refit': None,
+        'incremental_updates': 0
+    }
+
+def load_state(csv_path):
+    if not os.path.exists(STATE_FILE):
+        return empty_state(csv_path)
+    with open(STATE_FILE, 'r') as f:
+        state = json.load(f)
+    if state.get('csv_path') != os.path.abspath(csv_path) or state.get('preprocessing_version') != PREPROCESSING_VERSION:
+        print("Ingest state belongs to another file or preprocessing version, starting over.")
+        state = empty_state(csv_path)
+        reset_cache(state)
+    return state
+
+def save_state(state):
+    os.makedirs(INCREMENTAL_DIR, exist_ok=True)
+    tmp_path = STATE_FILE + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(state, f, indent=2)
+    os.replace(tmp_path, STATE_FILE)  # never leave a half-written state behind
+
+def reset_cache(state):
+    for part in glob.glob(os.path.join(INCREMENTAL_DIR, 'part_*.npz')):
+        os.remove(part)
+    state.update(empty_state(state['csv_path']))
+
+# helper method that reads the byte range a part covers from its name (part_<start>_<end>.npz)
+def part_range(part_path):
+    start, end = os.path.basename(part_path)[len('part_'):-len('.npz')].split('_')
+    return int(start), int(end)
+
+# parts ending past the saved offset were written by a run that crashed before saving its state;
+# those rows are read again, so the parts are removed to avoid counting them twice
+def drop_orphan_parts(state):
+    for part in glob.glob(os.path.join(INCREMENTAL_DIR, 'part_*.npz')):
+        if part_range(part)[1] > state['byte_offset']:
+            print(f"Removing '{os.path.basename(part)}', written after the last saved ingest state.")
+            os.remove(part)
+
+# --- DELTA INGESTION ---
+
+def read_new_rows(csv_path, state):
+    """Returns the rows appended since the last run and the byte offset just past them."""
+    with open(csv_path, 'rb') as f:
+        header = f.readline()
+        header_hash = hashlib.sha1(header).hexdigest()
+        size = os.fstat(f.fileno()).st_size
+
+        # a changed header or a file shorter than what we already read means it was rewritten, not appended to
+        if state['header_hash'] not in (None, header_hash) or size < state['byte_offset']:
+            print("CSV was rewritten since the last run, re-ingesting from row 0.")
+            reset_cache(state)
+        state['header_hash'] = header_hash
+
+        start = max(state['byte_offset'], len(header))
+        f.seek(start)
+        data = f.read()
+
+    # only consume complete lines; a row still being written is picked up next time
+    end = data.rfind(b'\n') + 1
+    if end == 0:
+        return None, start
+    chunk = pd.read_csv(io.BytesIO(header + data[:end]))
+    return chunk, start + end
+
+def ingest(csv_path, state):
+    """Preprocesses only the appended rows and stores them as a new part of the feature cache."""
+    drop_orphan_parts(state)
+    chunk, new_offset = read_new_rows(csv_path, state)
+    if chunk is None or chunk.empty:
+        state['byte_offset'] = new_offset
+        save_state(state)
+        return 0
+
+    last_id = int(chunk['id'].iloc[-1]) if 'id' in chunk else None
+    df = preprocess_frame(chunk)
+    df = df.reindex(columns=INDEPENDENT_VARS + ['Depression'], fill_value=0).dropna()
+    X = df[INDEPENDENT_VARS].to_numpy(dtype=np.float64)
+    y = df['Depression'].to_numpy()
+
+    os.makedirs(INCREMENTAL_DIR, exist_ok=True)
+    part_path = os.path.join(INCREMENTAL_DIR, f"part_{state['byte_offset']:012d}_{new_offset:012d}.npz")
+    tmp_path = part_path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        np.savez(f, X=X, y=y)
+    os.replace(tmp_path, part_path)  # a part is either complete or absent
+
+    state['byte_offset'] = new_offset
+    state['n_rows'] += len(y)
+    state['last_id'] = last_id
+    save_state(state)  # the offset moves together with the part it covers
+    print(f"Ingested {len(chunk)} new row(s), {len(y)} usable after preprocessing (last id {last_id}).")
+    return len(y)
+
+def load_cached_features(state):
+    parts = sorted(part for part in glob.glob(os.path.join(INCREMENTAL_DIR, 'part_*.npz'))
+                   if part_range(part)[1] <= state['byte_offset'])
+    if not parts:
+        return np.empty((0, len(INDEPENDENT_VARS))), np.empty(0, dtype=int)
+    arrays = [np.load(part) for part in parts]
+    return np.concatenate([a['X'] for a in arrays]), np.concatenate([a['y'] for a in arrays])
+
+# --- MODEL UPDATES ---
+
+def update_incrementally(model, X_new, y_new, trees_per_update):
+    """Updates a fitted model with new rows only; returns False when a full refit is needed instead."""
+    if len(np.unique(y_new)) < len(model.classes_):
+        return False  # new trees / partial_fit need every class present in the batch
+    if hasattr(model, 'estimators_') and 'warm_start' in model.get_params():
+        # grow extra trees on the new rows; the existing trees are kept as they are
+        model.set_params(warm_start=True, n_estimators=len(model.estimators_) + trees_per_update)
+        model.fit(X_new, y_new)
+        model.set_params(warm_start=False)
+        return True
+    if hasattr(model, 'partial_fit'):
+        model.partial_fit(X_new, y_new)
+        return True
+    return False
+
+def full_refit(model, X, y, base_n_estimators):
+    model = clone(model)
+    if 'n_estimators' in model.get_params():
+        model.set_params(n_estimators=base_n_estimators, warm_start=False)
+    model.fit(X, y)
+    return model
+
+def refit_due(state, full_refit_days):
+    if state['last_full_refit'] is None:
+        return True
+    return time.time() - state['last_full_refit'] >= full_refit_days * 86400
+
+def main():
+    parser = argparse.ArgumentParser(description="Ingest appended rows and update the saved A1 model.")
+    parser.add_argument('--model', required=True, help="bundle written by 'scoring.py export'")
+    parser.add_argument('--csv', default=CSV_PATH)
+    parser.add_argument('--full-refit-days', type=float, default=7, help="days between scheduled full refits")
+    parser.add_argument('--trees-per-update', type=int, default=10, help="trees added to the forest per incremental update")
+    parser.add_argument('--min-update-rows', type=int, default=200, help="new rows needed before updating the model")
+    parser.add_argument('--full-refit', action='store_true', help="force a full refit now")
+    args = parser.parse_args()
+
+    start = time.time()
+    state = load_state(args.csv)
+    ingest(args.csv, state)
+
+    bundle = load_model(args.model)
+    model = bundle['model']
+    base_n_estimators = bundle.get('base_n_estimators', model.get_params().get('n_estimators'))
+    X, y = load_cached_features(state)
+    pending = state['n_rows'] - state['model_rows']
+
+    if args.full_refit or refit_due(state, args.full_refit_days):
+        print(f"Full refit on {len(y)} cached rows.")
+        model = full_refit(model, X, y, base_n_estimators)
+        state['last_full_refit'] = time.time()
+        state['incremental_updates'] = 0
+    elif pending < args.min_update_rows:
+        print(f"{pending} new row(s) pending, waiting for {args.min_update_rows} before updating the model.")
+        save_state(state)
+        return
+    elif update_incrementally(model, X[state['model_rows']:], y[state['model_rows']:], args.trees_per_update):
+        print(f"Incremental update on {pending} new row(s).")
+        state['incremental_updates'] += 1
+    else:
+        print(f"{bundle['model_name']} cannot be updated incrementally here, falling back to a full refit.")
+        model = full_refit(model, X, y, base_n_estimators)
+        state['last_full_refit'] = time.time()
+        state['incremental_updates'] = 0
+
+    # remember the configured forest size so a full refit drops the warm-started trees again
+    save_model(model, bundle['model_name'], args.model, n_train_rows=len(y), base_n_estimators=base_n_estimators)
+
+    state['model_rows'] = state['n_rows']
+    save_state(state)
+    print(f"Model saved to '{args.model}' in {time.time() - start:.1f}s.")
+
+if __name__ == "__main__":
+    main()
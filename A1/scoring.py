@@ -0,0 +1,149 @@
+# model persistence and batch scoring for the A1 depression classifier
+#
+# Usage:
+#   python scoring.py export --model "Random Forest" --out models/random_forest.joblib
+#   python scoring.py score --model models/random_forest.joblib --input new_students.csv --output scored.csv
+#
+# A saved bundle holds the fitted estimator together with everything needed to rebuild its
+# input: the feature column order, the one-hot diet categories and the preprocessing version
+# it was trained with (which pins the preprocess_frame / parse_time_range behavior). Scoring streams the input CSV in chunks,
+# so memory stays flat and throughput is the same for 1k or 1M rows.
+import argparse
+import os
+import time
+from datetime import datetime
+
+import joblib
+import numpy as np
+import pandas as pd
+import sklearn
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.svm import SVC
+
+from a1 import (INDEPENDENT_VARS, PREPROCESSING_VERSION, load_and_preprocess_data,
+                load_best_config, preprocess_frame)
+
+MODEL_CLASSES = {
+    'Random Forest': RandomForestClassifier,
+    'SVM': SVC
+}
+
+# --- MODEL PERSISTENCE ---
+
+def save_model(model, model_name, path, n_train_rows=None, **metadata):
+    """Serializes a fitted estimator together with its preprocessing contract."""
+    bundle = {
+        'model': model,
+        'model_name': model_name,
+        'feature_columns': list(INDEPENDENT_VARS),
+        'diet_categories': [col[len('diet_'):] for col in INDEPENDENT_VARS if col.startswith('diet_')],
+        'preprocessing_version': PREPROCESSING_VERSION,
+        'sklearn_version': sklearn.__version__,
+        'n_train_rows': n_train_rows,
+        'trained_at': datetime.now().isoformat(timespec='seconds'),
+        **metadata
+    }
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    joblib.dump(bundle, path)
+    return bundle
+
+def load_model(path):
+    """Loads a bundle written by save_model and checks it still matches this code's preprocessing."""
+    bundle = joblib.load(path)
+    if bundle.get('preprocessing_version') != PREPROCESSING_VERSION:
+        raise ValueError(
+            f"Model '{path}' was trained with preprocessing version {bundle.get('preprocessing_version')}, "
+            f"but a1.py is at version {PREPROCESSING_VERSION}. Re-export the model."
+        )
+    if bundle.get('sklearn_version') != sklearn.__version__:
+        print(f"Warning: model was saved with scikit-learn {bundle.get('sklearn_version')}, "
+              f"running {sklearn.__version__}.")
+    return bundle
+
+def train_and_export(model_name, path, csv_path='Student-Depression-Dataset.csv'):
+    """Fits the chosen model on the full dataset with the tuned (or default) config and saves it."""
+    df = load_and_preprocess_data(csv_path)
+    if df is None:
+        return None
+    params = load_best_config()[model_name]
+    if model_name == 'SVM':
+        params = {**params, 'probability': True}  # needed for predict_proba when scoring
+    model = MODEL_CLASSES[model_name](**params, random_state=42)
+    # fit on a plain array since scoring passes arrays, not DataFrames
+    model.fit(df[INDEPENDENT_VARS].to_numpy(dtype=np.float64), df['Depression'].to_numpy())
+    save_model(model, model_name, path, n_train_rows=len(df))
+    print(f"{model_name} trained on {len(df)} rows and saved to '{path}'.")
+    return model
+
+# --- BATCH SCORING ---
+
+def build_features(chunk, bundle):
+    """Turns a raw CSV chunk into the model's feature matrix; rows that cannot be parsed are masked out."""
+    features = preprocess_frame(chunk.copy())
+    # a chunk may not contain every diet category, so align to the trained column order
+    features = features.reindex(columns=bundle['feature_columns'], fill_value=0)
+    valid = features.notna().all(axis=1).to_numpy()
+    return features.to_numpy(dtype=np.float64), valid
+
+def score_chunk(chunk, bundle):
+    model = bundle['model']
+    X, valid = build_features(chunk, bundle)
+
+    out = pd.DataFrame({'id': chunk['id'].to_numpy() if 'id' in chunk else np.arange(len(chunk))})
+    prediction = np.full(len(chunk), np.nan)
+    probability = np.full(len(chunk), np.nan)
+    if valid.any():
+        X_valid = X[valid]
+        prediction[valid] = model.predict(X_valid)
+        if hasattr(model, 'predict_proba') and getattr(model, 'probability', True):
+            probability[valid] = model.predict_proba(X_valid)[:, 1]
+    out['depression_pred'] = pd.Series(prediction).astype('Int64')
+    out['depression_proba'] = probability.round(4)
+    out['status'] = np.where(valid, 'scored', 'skipped_unparseable')
+    return out
+
+def score_csv(model_path, input_path, output_path, chunksize=50000):
+    """Streams input_path in chunks, scores each one and appends the results to output_path."""
+    bundle = load_model(model_path)
+    if os.path.exists(output_path):
+        os.remove(output_path)
+
+    total_rows = 0
+    skipped_rows = 0
+    start = time.time()
+    for i, chunk in enumerate(pd.read_csv(input_path, chunksize=chunksize)):
+        scored = score_chunk(chunk, bundle)
+        scored.to_csv(output_path, mode='a', header=(i == 0), index=False)
+        total_rows += len(scored)
+        skipped_rows += int((scored['status'] != 'scored').sum())
+        elapsed = time.time() - start
+        print(f"chunk {i + 1}: {total_rows} rows scored ({total_rows / elapsed:,.0f} rows/s)")
+
+    elapsed = time.time() - start
+    print(f"Scored {total_rows} rows in {elapsed:.2f}s ({skipped_rows} skipped as unparseable). "
+          f"Results written to '{output_path}'.")
+    return total_rows
+
+def main():
+    parser = argparse.ArgumentParser(description="Export and batch-score the A1 depression classifier.")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    export_parser = subparsers.add_parser('export', help="train on the full dataset and save the model bundle")
+    export_parser.add_argument('--model', choices=list(MODEL_CLASSES), default='Random Forest')
+    export_parser.add_argument('--out', default=os.path.join('models', 'random_forest.joblib'))
+    export_parser.add_argument('--csv', default='Student-Depression-Dataset.csv')
+
+    score_parser = subparsers.add_parser('score', help="score a CSV with a saved model bundle")
+    score_parser.add_argument('--model', required=True, help="path to a bundle written by 'export'")
+    score_parser.add_argument('--input', required=True)
+    score_parser.add_argument('--output', required=True)
+    score_parser.add_argument('--chunksize', type=int, default=50000)
+
+    args = parser.parse_args()
+    if args.command == 'export':
+        train_and_export(args.model, args.out, args.csv)
+    else:
+        score_csv(args.model, args.input, args.output, args.chunksize)
+
+if __name__ == "__main__":
+    main()
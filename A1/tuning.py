@@ -0,0 +1,277 @@
+# budgeted hyperparameter search for the A1 models (successive halving)
+#
+# Usage:
+#   python tuning.py --budget 600 --jobs 4
+#
+# Every surviving candidate is re-evaluated on a larger share of the training folds
+# (budget grows by a factor of eta per rung) while the bottom candidates are dropped.
+# Results are appended to tuning_results.jsonl as they finish, so an interrupted or
+# budget-limited run picks up where it stopped. The winners are exported to
+# best_config.json, which a1.main() loads automatically.
+import argparse
+import hashlib
+import json
+import math
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+
+import numpy as np
+from sklearn.base import clone
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.metrics import accuracy_score
+from sklearn.model_selection import StratifiedKFold
+from sklearn.svm import SVC
+
+from a1 import BEST_CONFIG_FILE, INDEPENDENT_VARS, PREPROCESSING_VERSION, load_and_preprocess_data
+
+CACHE_DIR = '.cache'
+RESULTS_FILE = 'tuning_results.jsonl'
+CSV_PATH = 'Student-Depression-Dataset.csv'
+
+BASE_MODELS = {
+    'Random Forest': RandomForestClassifier(random_state=42, n_jobs=1),
+    'SVM': SVC(kernel='rbf', random_state=42)
+}
+
+# --- CACHED FEATURES AND CV SPLITS ---
+
+# helper method that identifies a version of the CSV by path, size and modification time
+def dataset_key(csv_path):
+    stat = os.stat(csv_path)
+    raw = f"{os.path.abspath(csv_path)}|{stat.st_size}|{stat.st_mtime_ns}"
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()[:16]
+
+# loads the preprocessed feature matrix, running load_and_preprocess_data only on a cache miss
+def load_cached_features(csv_path=CSV_PATH, cache_dir=CACHE_DIR):
+    os.makedirs(cache_dir, exist_ok=True)
+    cache_path = os.path.join(cache_dir, f"features_{dataset_key(csv_path)}.npz")
+    if os.path.exists(cache_path):
+        cached = np.load(cache_path)
+        return cached['X'], cached['y']
+
+    df = load_and_preprocess_data(csv_path)
+    if df is None:
+        raise FileNotFoundError(csv_path)
+    X = df[INDEPENDENT_VARS].to_numpy(dtype=np.float64)
+    y = df['Depression'].to_numpy()
+    np.savez(cache_path, X=X, y=y)
+    return X, y
+
+# loads stratified CV splits; training indices are shuffled once so any prefix is a random subsample
+def load_cached_splits(csv_path, y, n_splits=3, seed=42, cache_dir=CACHE_DIR):
+    cache_path = os.path.join(cache_dir, f"cv_{dataset_key(csv_path)}_{n_splits}_{seed}.npz")
+    if os.path.exists(cache_path):
+        cached = np.load(cache_path)
+        return [(cached[f'train_{i}'], cached[f'test_{i}']) for i in range(n_splits)]
+
+    rng = np.random.RandomState(seed)
+    skf = StratifiedKFold(n_splits=n_splits, shuffle=True, random_state=seed)
+    splits = [(rng.permutation(train_idx), test_idx) for train_idx, test_idx in skf.split(np.zeros(len(y)), y)]
+    arrays = {}
+    for i, (train_idx, test_idx) in enumerate(splits):
+        arrays[f'train_{i}'] = train_idx
+        arrays[f'test_{i}'] = test_idx
+    np.savez(cache_path, **arrays)
+    return splits
+
+# --- SEARCH SPACE ---
+
+def sample_params(model_name, rng):
+    if model_name == 'Random Forest':
+        return {
+            'n_estimators': int(round(10 ** rng.uniform(1.3, 2.6))),
+            'max_depth': [None, 4, 8, 12, 16, 24][rng.randint(6)],
+            'min_samples_leaf': int(rng.choice([1, 2, 4, 8, 16])),
+            'max_features': ['sqrt', 0.5, None][rng.randint(3)]
+        }
+    return {
+        'C': float(round(10 ** rng.uniform(-2, 2), 4)),
+        'gamma': ['scale', float(round(10 ** rng.uniform(-3, 0), 5))][rng.randint(2)]
+    }
+
+# helper method that gives each candidate a stable id so results can be matched across runs
+def candidate_id(model_name, params):
+    raw = json.dumps([model_name, params], sort_keys=True)
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()[:12]
+
+# --- PARALLEL EVALUATION ---
+
+# data shared with worker processes, set once per worker instead of pickled per task
+_worker_data = {}
+
+def _init_worker(X, y, splits):
+    _worker_data['X'] = X
+    _worker_data['y'] = y
+    _worker_data['splits'] = splits
+
+def evaluate_candidate(model_name, params, budget):
+    """Mean CV accuracy of one candidate trained on the first `budget` rows of every training fold."""
+    X, y, splits = _worker_data['X'], _worker_data['y'], _worker_data['splits']
+    start = time.time()
+    scores = []
+    for train_idx, test_idx in splits:
+        subset = train_idx[:budget]
+        model = clone(BASE_MODELS[model_name]).set_params(**params)
+        model.fit(X[subset], y[subset])
+        scores.append(accuracy_score(y[test_idx], model.predict(X[test_idx])))
+    return float(np.mean(scores)), time.time() - start
+
+# --- RESUMABLE RESULTS ---
+
+# helper method that describes what a score depends on besides the candidate and budget;
+# every record stores it and only records with a matching context are reused
+def run_context(csv_path, n_splits, seed):
+    return {'dataset': dataset_key(csv_path), 'preprocessing': PREPROCESSING_VERSION,
+            'folds': n_splits, 'seed': seed}
+
+def load_results(context, path=RESULTS_FILE):
+    results = {}
+    if not os.path.exists(path):
+        return results
+    with open(path, 'r') as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue  # a partially written last line from an interrupted run
+            if record.get('context') != context:
+                continue  # scored on another dataset, pipeline or set of folds
+            results[(record['candidate'], record['budget'])] = record
+    return results
+
+def append_result(record, path=RESULTS_FILE):
+    with open(path, 'a') as f:
+        f.write(json.dumps(record) + "\n")
+
+# --- SUCCESSIVE HALVING ---
+
+def successive_halving(model_name, executor, results, max_budget, deadline, context,
+                       n_candidates=27, min_budget=None, eta=3, seed=42):
+    """
+    Runs one successive-halving bracket and returns (best record at the largest budget reached,
+    whether the final rung finished). A bracket cut short by the deadline is not finished.
+    """
+    if min_budget is None:
+        # size the first rung so the last surviving candidate is trained on the full folds
+        n_rungs = int(math.log(n_candidates, eta) + 1e-9)
+        min_budget = max(100, max_budget // eta ** n_rungs)
+
+    rng = np.random.RandomState(seed)
+    candidates = {}
+    while len(candidates) < n_candidates:
+        params = sample_params(model_name, rng)
+        candidates.setdefault(candidate_id(model_name, params), params)
+
+    survivors = list(candidates)
+    budget = min(min_budget, max_budget)
+    best = None
+
+    while survivors:
+        print(f"[{model_name}] rung budget={budget} rows, {len(survivors)} candidate(s)")
+        rung = {cid: results[(cid, budget)] for cid in survivors if (cid, budget) in results}
+
+        pending = {}
+        for cid in survivors:
+            if cid not in rung:
+                future = executor.submit(evaluate_candidate, model_name, candidates[cid], budget)
+                pending[future] = cid
+
+        while pending:
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                break
+            done, _ = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+            for future in done:
+                cid = pending.pop(future)
+                score, fit_time = future.result()
+                record = {
+                    'model': model_name, 'candidate': cid, 'params': candidates[cid],
+                    'budget': budget, 'score': score, 'fit_time': round(fit_time, 3),
+                    'context': context
+                }
+                results[(cid, budget)] = record
+                rung[cid] = record
+                append_result(record)
+
+        if pending:
+            for future in pending:
+                future.cancel()
+            print(f"[{model_name}] wall-clock budget exhausted, {len(pending)} evaluation(s) left unfinished.")
+
+        if rung:
+            ranked = sorted(rung.values(), key=lambda r: r['score'], reverse=True)
+            best = ranked[0]
+        if pending:
+            return best, False
+        if budget >= max_budget or len(survivors) == 1:
+            return best, True
+
+        survivors = [r['candidate'] for r in ranked[:max(1, math.ceil(len(ranked) / eta))]]
+        budget = min(budget * eta, max_budget)
+
+    return best, False
+
+# writes the winners of finished brackets; models whose search stopped early keep the entry already
+# in the file, so a short or interrupted run never replaces a config found with a full search
+def export_best_config(best_records, path=BEST_CONFIG_FILE):
+    config = {}
+    if os.path.exists(path):
+        try:
+            with open(path, 'r') as f:
+                config = json.load(f)
+        except (json.JSONDecodeError, OSError):
+            config = {}
+    for model_name, (record, finished) in best_records.items():
+        if record is None or not finished:
+            print(f"[{model_name}] search did not finish its last rung, keeping the existing configuration.")
+            continue
+        config[model_name] = {'params': record['params'], 'cv_accuracy': record['score'], 'budget': record['budget']}
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(config, f, indent=2)
+    os.replace(tmp_path, path)
+    print(f"Best configuration exported to '{path}'.")
+    return config
+
+def main():
+    parser = argparse.ArgumentParser(description="Successive-halving hyperparameter search for the A1 models.")
+    parser.add_argument('--budget', type=float, default=600, help="wall-clock budget in seconds for the whole search")
+    parser.add_argument('--jobs', type=int, default=os.cpu_count(), help="number of worker processes")
+    parser.add_argument('--candidates', type=int, default=27, help="candidates sampled per model")
+    parser.add_argument('--min-budget', type=int, default=None, help="training rows per fold on the first rung (default: derived from --candidates and --eta)")
+    parser.add_argument('--eta', type=int, default=3, help="halving factor")
+    parser.add_argument('--folds', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=42, help="seed for the CV splits and the sampled candidates")
+    parser.add_argument('--csv', default=CSV_PATH)
+    args = parser.parse_args()
+
+    start = time.time()
+    X, y = load_cached_features(args.csv)
+    splits = load_cached_splits(args.csv, y, n_splits=args.folds, seed=args.seed)
+    max_budget = min(len(train_idx) for train_idx, _ in splits)
+    context = run_context(args.csv, args.folds, args.seed)
+    results = load_results(context)
+    if results:
+        print(f"Resuming with {len(results)} previously evaluated configuration(s).")
+
+    best_records = {}
+    # leaving the pool waits for evaluations already running, so the budget can overrun by at most one of them
+    with ProcessPoolExecutor(max_workers=args.jobs, initializer=_init_worker, initargs=(X, y, splits)) as executor:
+        model_names = list(BASE_MODELS)
+        for i, model_name in enumerate(model_names):
+            # split whatever time is left evenly between the models still to search
+            share = (start + args.budget - time.time()) / (len(model_names) - i)
+            best_records[model_name] = successive_halving(
+                model_name, executor, results, max_budget, time.time() + share, context,
+                n_candidates=args.candidates, min_budget=args.min_budget, eta=args.eta, seed=args.seed
+            )
+            record, _ = best_records[model_name]
+            if record:
+                print(f"[{model_name}] best: {record['params']} accuracy={record['score']:.4f} at {record['budget']} rows")
+
+    export_best_config(best_records)
+    print(f"Search finished in {time.time() - start:.1f}s.")
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,13 @@
 import streamlit as st
 import os
 import time
-# --- Using the recommended SDK imports (google-genai) ---
-from google.genai import Client 
-from google.genai.errors import APIError 
+import asyncio
+import queue
+import threading
+import model_router
+import hedging
+from rescaler import rescale_recipe
+# NOTE: the google-genai SDK takes most of a second to import, so it is imported lazily in get_client()
 
 # --- 1. CONFIGURATION AND INITIALIZATION ---
 
@@ -14,23 +18,57 @@ st.set_page_config(
     layout="centered"
 )
 
-# Initialize the Gemini client
-try:
-    # --- CRITICAL: Using os.environ as requested ---
-    # Ensure the API key is set as an environment variable (using 'set' or '$env:' command)
-    if "GEMINI_API_KEY" not in os.environ:
-        st.error("🚨 GEMINI_API_KEY environment variable not found.")
-        st.caption("Please set your API key using `set GEMINI_API_KEY=YOUR_KEY` (CMD) or `$env:GEMINI_API_KEY='YOUR_KEY'` (PowerShell) before running.")
-        st.stop()
-        
-    # --- Using the Client constructor from the new SDK ---
-    client = Client() 
-except Exception as e:
-    st.error(f"Failed to initialize Gemini Client: {e}")
+# --- CRITICAL: Using os.environ as requested ---
+# Ensure the API key is set as an environment variable (using 'set' or '$env:' command)
+if "GEMINI_API_KEY" not in os.environ:
+    st.error("🚨 GEMINI_API_KEY environment variable not found.")
+    st.caption("Please set your API key using `set GEMINI_API_KEY=YOUR_KEY` (CMD) or `$env:GEMINI_API_KEY='YOUR_KEY'` (PowerShell) before running.")
     st.stop()
 
-# Model choice
-MODEL_NAME = "gemini-2.5-flash"
+@st.cache_resource(show_spinner=False)
+def get_client(api_base=None):
+    """
+    Builds the Gemini client once per server process instead of on every rerun.
+    
+    The client (and its HTTP transport) is shared by all sessions and reruns; it is only
+    created the first time a recipe is requested, so the page renders without waiting on the SDK.
+    """
+    # --- Using the Client constructor from the new SDK ---
+    from google.genai import Client
+    # GEMINI_API_BASE can point the SDK at a local stand-in (AI_Agent_Final/mock_gemini.py) for offline testing
+    return Client(http_options={"base_url": api_base}) if api_base else Client()
+
+# Model choice: simple requests go to the light tier, plans and long constraint lists to the strong one
+MODEL_TIERS = {
+    model_router.LIGHT: os.environ.get("GEMINI_LIGHT_MODEL", "gemini-2.5-flash-lite"),
+    model_router.STRONG: os.environ.get("GEMINI_STRONG_MODEL", "gemini-2.5-flash"),
+}
+
+# Stream the recipe into the page as it is written (set GEMINI_STREAM=0 to wait for the full response)
+STREAM_RESPONSES = os.environ.get("GEMINI_STREAM", "1") != "0"
+STREAM_TICK_SECONDS = 0.25 # How often the page is touched while waiting for the next chunk, so a resubmit can cancel the stream
+
+@st.cache_resource(show_spinner=False)
+def get_event_loop():
+    """
+    One event loop per server process, running on its own thread. Every async SDK call runs
+    on it, so the cached client's async connections always belong to the same, open loop.
+    """
+    loop = asyncio.new_event_loop()
+    threading.Thread(target=loop.run_forever, name="gemini-aio", daemon=True).start()
+    return loop
+
+@st.cache_resource(show_spinner=False)
+def get_tier_stats():
+    """Per-tier call statistics shared by every session of this server process."""
+    stats = {tier: {"routed": 0, "calls": 0, "errors": 0, "fallbacks": 0, "latency_s": 0.0, "cost_usd": 0.0} for tier in MODEL_TIERS}
+    return stats, threading.Lock()
+
+def record_tier_stat(tier, **increments):
+    stats, lock = get_tier_stats()
+    with lock:
+        for key, value in increments.items():
+            stats[tier][key] += value
 
 # --- 2. PROMPT ENGINEERING (The core of the project) ---
 
@@ -93,30 +131,147 @@ def create_recipe_prompt(ingredients, servings, constraints):
 
 # --- 3. API CALL LOGIC (With Exponential Backoff) ---
 
-def generate_content_with_retry(prompt, max_retries=5):
+def generate_content_with_retry(prompt, tier=model_router.STRONG, max_retries=5, report_errors=True):
     """Handles the Gemini API call with exponential backoff for robustness."""
+    from google.genai.errors import APIError
+    
+    try:
+        client = get_client(os.environ.get("GEMINI_API_BASE"))
+    except Exception as e:
+        st.error(f"Failed to initialize Gemini Client: {e}")
+        return None
+    
+    model = MODEL_TIERS[tier]
     for attempt in range(max_retries):
+        start = time.perf_counter()
         try:
             # Note: client.models.generate_content is the correct method for the new SDK
-            response = client.models.generate_content(
-                model=MODEL_NAME,
-                contents=prompt,
-                config={"temperature": 0.8} # Allow for some creativity in recipe generation
+            def _generate(cancel=None):
+                return client.models.generate_content(
+                    model=model,
+                    contents=prompt,
+                    config={"temperature": 0.8} # Allow for some creativity in recipe generation
+                )
+            if hedging.HEDGE_ENABLED:
+                # A slow call gets an identical twin after the observed p90; the SDK call can't be
+                # interrupted, so the loser finishes in the background and its answer is dropped
+                response = hedging.shared().call(_generate)
+            else:
+                response = _generate()
+            usage = getattr(response, "usage_metadata", None)
+            cost = model_router.estimate_cost(
+                model,
+                getattr(usage, "prompt_token_count", None) or 0,
+                getattr(usage, "candidates_token_count", None) or 0,
             )
+            record_tier_stat(tier, calls=1, latency_s=time.perf_counter() - start, cost_usd=cost)
             return response.text
         
         except APIError as e: 
+            record_tier_stat(tier, calls=1, errors=1, latency_s=time.perf_counter() - start)
             if attempt < max_retries - 1:
                 wait_time = 2 ** attempt  # Exponential backoff (1s, 2s, 4s, 8s, 16s)
                 time.sleep(wait_time)
-            else:
+            elif report_errors:
                 st.error(f"Failed after {max_retries} attempts. Please try again later. Error: {e}")
                 return None
         except Exception as e:
-             st.error(f"An unexpected error occurred: {e}")
+             if report_errors:
+                 st.error(f"An unexpected error occurred: {e}")
              return None
     return None
 
+async def _read_stream(client, model, prompt, chunks):
+    """Runs on the shared event loop: puts each streamed chunk on `chunks`; cancelling it closes the stream."""
+    stream = await client.aio.models.generate_content_stream(
+        model=model,
+        contents=prompt,
+        config={"temperature": 0.8} # Allow for some creativity in recipe generation
+    )
+    try:
+        async for chunk in stream:
+            chunks.put(chunk)
+    finally:
+        await stream.aclose() # Also on cancellation, which drops the connection and so the request
+
+def stream_content_with_retry(prompt, tier, status, placeholder, max_retries=5, report_errors=True):
+    """
+    Streams the response with the SDK's async client, rendering the text into `placeholder`
+    chunk by chunk, with the same exponential backoff as generate_content_with_retry.
+    
+    The stream is read on the shared event loop while this run renders the chunks. Resubmitting
+    the form starts a full rerun, which stops this run at its next page update; `status` is
+    refreshed while waiting on a chunk so that happens promptly, and the stream is cancelled.
+    """
+    from google.genai.errors import APIError
+    
+    try:
+        client = get_client(os.environ.get("GEMINI_API_BASE"))
+    except Exception as e:
+        st.error(f"Failed to initialize Gemini Client: {e}")
+        return None
+    
+    model = MODEL_TIERS[tier]
+    for attempt in range(max_retries):
+        start = time.perf_counter()
+        chunks = queue.Queue()
+        text = ""
+        usage = None
+        placeholder.empty()
+        future = asyncio.run_coroutine_threadsafe(_read_stream(client, model, prompt, chunks), get_event_loop())
+        try:
+            while not (future.done() and chunks.empty()):
+                try:
+                    chunk = chunks.get(timeout=STREAM_TICK_SECONDS)
+                except queue.Empty:
+                    status.caption(f"✍️ Chef Remy is writing... ({time.perf_counter() - start:.1f}s)")
+                    continue
+                text += chunk.text or ""
+                usage = chunk.usage_metadata or usage # The last chunk carries the totals
+                placeholder.markdown(text + " ▌")
+            future.result() # Raises the stream's error, if any
+            cost = model_router.estimate_cost(
+                model,
+                getattr(usage, "prompt_token_count", None) or 0,
+                getattr(usage, "candidates_token_count", None) or 0,
+            )
+            record_tier_stat(tier, calls=1, latency_s=time.perf_counter() - start, cost_usd=cost)
+            placeholder.markdown(text)
+            return text
+        
+        except APIError as e:
+            record_tier_stat(tier, calls=1, errors=1, latency_s=time.perf_counter() - start)
+            if attempt < max_retries - 1:
+                time.sleep(2 ** attempt) # Exponential backoff (1s, 2s, 4s, 8s, 16s)
+            elif report_errors:
+                st.error(f"Failed after {max_retries} attempts. Please try again later. Error: {e}")
+                return None
+        except Exception as e:
+            if report_errors:
+                st.error(f"An unexpected error occurred: {e}")
+            return None
+        finally:
+            # Also runs when a resubmit stops this run mid-stream: cancel the read, which closes the stream
+            future.cancel()
+    return None
+
+def generate_with_fallback(prompt, tier, generate=generate_content_with_retry):
+    """
+    Calls the chosen tier; a light-tier call that fails or skips the recipe template is
+    retried once on the strong tier. Returns (recipe markdown or None, tier that served it).
+    
+    `generate(prompt, tier, max_retries=..., report_errors=...)` makes the calls, so the
+    streaming and non-streaming paths share the routing.
+    """
+    record_tier_stat(tier, routed=1)
+    if tier == model_router.LIGHT:
+        recipe_markdown = generate(prompt, tier, max_retries=2, report_errors=False)
+        if recipe_markdown and "Recipe Name" in recipe_markdown:
+            return recipe_markdown, tier
+        record_tier_stat(tier, fallbacks=1)
+        tier = model_router.STRONG
+    return generate(prompt, tier), tier
+
 # --- 4. STREAMLIT UI LAYOUT ---
 
 st.title("👨‍🍳 The Little Chef (Assistant)")
@@ -129,61 +284,122 @@ st.markdown(
     """
 )
 
-with st.form("recipe_form"):
-    st.header("What's in the Fridge? 🧊")
+def render_recipe_form():
+    """
+    Form and result area. Deliberately not an st.fragment: a resubmit from inside a fragment
+    is queued behind the running script, while a full rerun stops it, which is what cancels
+    a recipe that is still streaming.
+    """
+    with st.form("recipe_form"):
+        st.header("What's in the Fridge? 🧊")
     
-    ingredients = st.text_area(
-        "List your ingredients (e.g., chicken breast, half onion, old tortillas, jar of salsa)",
-        height=150,
-        key="ingredients",
-        placeholder="Required: List all available food items here, separated by commas."
-    )
+        ingredients = st.text_area(
+            "List your ingredients (e.g., chicken breast, half onion, old tortillas, jar of salsa)",
+            height=150,
+            key="ingredients",
+            placeholder="Required: List all available food items here, separated by commas."
+        )
     
-    col1, col2 = st.columns(2)
+        col1, col2 = st.columns(2)
     
-    with col1:
-        servings = st.number_input(
-            "How many servings do you need?",
-            min_value=1,
-            max_value=8,
-            value=2,
-            key="servings"
-        )
+        with col1:
+            servings = st.number_input(
+                "How many servings do you need?",
+                min_value=1,
+                max_value=8,
+                value=2,
+                key="servings"
+            )
     
-    with col2:
-        constraints = st.text_input(
-            "Dietary constraints or special requests (e.g., Vegetarian, quick 30-min meal)",
-            value="Quick and easy, minimal dirty dishes",
-            key="constraints"
-        )
+        with col2:
+            constraints = st.text_input(
+                "Dietary constraints or special requests (e.g., Vegetarian, quick 30-min meal)",
+                value="Quick and easy, minimal dirty dishes",
+                key="constraints"
+            )
 
-    # Submit button to trigger the generation
-    submitted = st.form_submit_button("Cook Up a Solution! 🍽️")
+        # Submit button to trigger the generation
+        submitted = st.form_submit_button("Cook Up a Solution! 🍽️")
 
-# --- 5. EXECUTION ---
+    # --- 5. EXECUTION ---
 
-if submitted and ingredients:
+    # Same fridge and constraints, only a different head count: rescale the last recipe locally
+    last = st.session_state.get("last_recipe")
+    if (submitted and ingredients and last and last["ingredients"] == ingredients
+            and last["constraints"] == constraints and last["shown_servings"] != servings):
+        recipe_markdown = rescale_recipe(last["recipe"], servings, from_servings=last["servings"])
+        last["shown_servings"] = servings
+        st.success(f"✨ Rescaled for {servings} servings, no new API call needed!")
+        st.markdown(recipe_markdown)
     
-    # 1. Assemble the prompt
-    full_prompt = create_recipe_prompt(ingredients, servings, constraints)
+    elif submitted and ingredients:
     
-    # Debugging: Show the user the prompt engineering is working (Optional for final product)
-    with st.expander("Peek at Chef Remy's Instructions (Prompt Engineering Demo)"):
-        st.code(full_prompt, language="markdown")
-        st.success("The **Persona Pattern** and **Template Pattern** are being applied!")
-
-    # 2. Call the API
-    with st.spinner(f"Chef Remy is hard at work creating a masterpiece..."):
-        recipe_markdown = generate_content_with_retry(full_prompt)
+        # 1. Assemble the prompt
+        full_prompt = create_recipe_prompt(ingredients, servings, constraints)
     
-    # 3. Display Results
-    if recipe_markdown:
-        st.success("✨ Your meal is served!")
-        st.markdown(recipe_markdown)
+        # Debugging: Show the user the prompt engineering is working (Optional for final product)
+        with st.expander("Peek at Chef Remy's Instructions (Prompt Engineering Demo)"):
+            st.code(full_prompt, language="markdown")
+            st.success("The **Persona Pattern** and **Template Pattern** are being applied!")
+
+        # 2. Call the API
+        tier = model_router.choose_tier(f"{ingredients}, {constraints}", ingredient_count=len([i for i in ingredients.split(",") if i.strip()]))
+        status = st.empty()
+        placeholder = st.empty()
+        start = time.perf_counter()
+        if STREAM_RESPONSES:
+            def stream(prompt, tier, **kwargs):
+                return stream_content_with_retry(prompt, tier, status, placeholder, **kwargs)
+            status.caption("✍️ Chef Remy is hard at work creating a masterpiece...")
+            recipe_markdown, served_by = generate_with_fallback(full_prompt, tier, generate=stream)
+        else:
+            with st.spinner(f"Chef Remy is hard at work creating a masterpiece..."):
+                recipe_markdown, served_by = generate_with_fallback(full_prompt, tier)
     
-elif submitted and not ingredients:
-    st.warning("Please tell Chef Remy what ingredients you have!")
+        # 3. Display Results
+        if recipe_markdown:
+            # Scaling always starts from the generated recipe, so repeated changes don't compound rounding
+            st.session_state.last_recipe = {
+                "ingredients": ingredients,
+                "constraints": constraints,
+                "servings": servings,
+                "shown_servings": servings,
+                "recipe": recipe_markdown,
+            }
+            with status.container():
+                st.success("✨ Your meal is served!")
+                st.caption(f"Served by {MODEL_TIERS[served_by]} ({served_by} tier) in {time.perf_counter() - start:.1f}s")
+            placeholder.markdown(recipe_markdown)
+        else:
+            status.empty()
     
+    elif submitted and not ingredients:
+        st.warning("Please tell Chef Remy what ingredients you have!")
+
+render_recipe_form()
+
+with st.expander("Model tier usage (this server)"):
+    stats, lock = get_tier_stats()
+    with lock:
+        rows = [
+            {
+                "tier": tier,
+                "model": MODEL_TIERS[tier],
+                "routed": row["routed"],
+                "calls": row["calls"],
+                "errors": row["errors"],
+                "fallbacks": row["fallbacks"],
+                "avg_latency_s": round(row["latency_s"] / row["calls"], 2) if row["calls"] else None,
+                "cost_usd": round(row["cost_usd"], 5),
+            }
+            for tier, row in stats.items()
+        ]
+    st.dataframe(rows, hide_index=True)
+    st.caption("Fallbacks count light-tier requests that were retried on the strong tier.")
+    if hedging.HEDGE_ENABLED:
+        hedge = hedging.shared().snapshot()
+        st.caption(f"Hedged requests: {hedge['hedged']} of {hedge['calls']} calls (the twin answered first {hedge['hedge_won']} times, {hedge['budget_denied']} skipped over budget); current threshold {hedging.shared().threshold():.2f}s.")
+
 # Footer for project context
 st.markdown("---")
 st.markdown(
@@ -0,0 +1,135 @@
+# Shared module: AI_Agent_Final/ and "AI Assistant Project/" each ship an identical copy so either
+# app runs from its own folder. Edit both copies together; AI_Agent_Final/tests/test_shared_modules.py
+# fails when they differ.
+import os
+import time
+import threading
+import contextvars
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+# --- Configuration ---
+HEDGE_ENABLED = os.environ.get("CHEF_HEDGE", "") not in ("", "0")  # Off by default: set to 1 to hedge slow API calls
+HEDGE_PERCENTILE = float(os.environ.get("CHEF_HEDGE_PERCENTILE", 0.9))  # A call slower than this share of recent calls gets a twin
+HEDGE_BUDGET = float(os.environ.get("CHEF_HEDGE_BUDGET", 0.1))  # Extra requests allowed per call (0.1 = at most ~10% more load)
+HEDGE_BURST = 3  # Hedges that may fire back to back before the budget has to refill
+MIN_SAMPLES = 20  # Below this many observed calls the threshold falls back to DEFAULT_DELAY_S
+DEFAULT_DELAY_S = 5.0
+MIN_DELAY_S = 0.2  # Never hedge sooner than this, even when every recent call was fast
+WINDOW = 200  # Recent call latencies the threshold is computed from
+
+# --- Hedged Calls ---
+# One process-wide Hedger is shared by every session and worker, so the budget caps the
+# extra load on the API as a whole and the threshold learns from all recent calls.
+
+
+class Hedger:
+    """
+    Runs a blocking call and, if it has not returned by the adaptive threshold (the observed
+    HEDGE_PERCENTILE latency), starts an identical second call and returns whichever
+    acceptable result arrives first.
+
+    A hedge spends one token from a budget that refills by HEDGE_BUDGET per call, so hedges
+    stay at about that share of all calls even when the API is slow across the board.
+    """
+    def __init__(self, percentile: float = HEDGE_PERCENTILE, budget: float = HEDGE_BUDGET, burst: float = HEDGE_BURST, max_workers: int = 16):
+        self.percentile = percentile
+        self.budget = budget
+        self.burst = burst
+        self._lock = threading.Lock()
+        self._latencies = deque(maxlen=WINDOW)
+        self._tokens = float(burst)
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="chef-hedge")
+        self.stats = {"calls": 0, "hedged": 0, "hedge_won": 0, "budget_denied": 0, "cancelled": 0}
+
+    def threshold(self) -> float:
+        """Seconds to wait for the first call before hedging it."""
+        with self._lock:
+            samples = sorted(self._latencies)
+        if len(samples) < MIN_SAMPLES:
+            return DEFAULT_DELAY_S
+        index = min(len(samples) - 1, int(self.percentile * len(samples)))
+        return max(MIN_DELAY_S, samples[index])
+
+    def _observe(self, started: float):
+        with self._lock:
+            self._latencies.append(time.perf_counter() - started)
+
+    def _take_token(self) -> bool:
+        with self._lock:
+            if self._tokens >= 1:
+                self._tokens -= 1
+                self.stats["hedged"] += 1
+                return True
+            self.stats["budget_denied"] += 1
+            return False
+
+    def _start(self, func, args, kwargs, cancel: threading.Event):
+        started = time.perf_counter()
+        context = contextvars.copy_context() # Keep the caller's trace and job visible inside the call
+
+        def _timed():
+            try:
+                return context.run(func, *args, cancel=cancel, **kwargs)
+            finally:
+                self._observe(started) # A cancelled call counts with the time it ran, a lower bound on its latency
+
+        return self._executor.submit(_timed)
+
+    def call(self, func, *args, accept=None, **kwargs):
+        """
+        Calls func(*args, cancel=<threading.Event>, **kwargs) with hedging.
+
+        `accept(result)` decides whether a result may win (e.g. not an HTTP 5xx); when neither
+        call produces one, the first call's result is returned or its exception raised. The
+        losing call gets its `cancel` event set so it can stop early; its result is discarded.
+        """
+        with self._lock:
+            self.stats["calls"] += 1
+            self._tokens = min(self.burst, self._tokens + self.budget)
+        accept = accept or (lambda result: True)
+        cancels = [threading.Event()]
+        futures = [self._start(func, args, kwargs, cancels[0])]
+
+        done, _ = wait(futures, timeout=self.threshold())
+        if not done and self._take_token():
+            cancels.append(threading.Event())
+            futures.append(self._start(func, args, kwargs, cancels[1]))
+
+        pending = set(futures)
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None and accept(future.result()):
+                    winner = futures.index(future)
+                    self._cancel_others(futures, cancels, winner)
+                    if winner == 1:
+                        with self._lock:
+                            self.stats["hedge_won"] += 1
+                    return future.result()
+        return futures[0].result() # Neither was acceptable: behave as if there had been no hedge
+
+    def _cancel_others(self, futures, cancels, winner):
+        for index, future in enumerate(futures):
+            if index != winner and not future.done():
+                cancels[index].set()
+                future.cancel()
+                with self._lock:
+                    self.stats["cancelled"] += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return dict(self.stats, tokens=round(self._tokens, 2))
+
+
+_shared = None
+_shared_lock = threading.Lock()
+
+
+def shared() -> Hedger:
+    """The process-wide Hedger."""
+    global _shared
+    with _shared_lock:
+        if _shared is None:
+            _shared = Hedger()
+        return _shared
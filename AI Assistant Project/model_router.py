@@ -0,0 +1,53 @@
+# Shared module: AI_Agent_Final/ and "AI Assistant Project/" each ship an identical copy so either
+# app runs from its own folder. Edit both copies together; AI_Agent_Final/tests/test_shared_modules.py
+# fails when they differ.
+import re
+
+# --- Tiers ---
+# Each app maps these tiers to concrete model names in its own configuration.
+LIGHT = "light"    # Fast and cheap: simple few-ingredient recipes, targeted repairs
+STRONG = "strong"  # Slower and pricier: meal plans, long constraint lists, fallback for the light tier
+
+# USD per 1M tokens (input, output), paid-tier list prices; update when they change
+PRICES = {
+    "gemini-2.5-flash-lite": (0.10, 0.40),
+    "gemini-2.5-flash": (0.30, 2.50),
+    "gemini-2.5-flash-preview-09-2025": (0.30, 2.50),
+    "gemini-2.5-pro": (1.25, 10.00),
+}
+
+# --- Routing Rules ---
+MAX_LIGHT_CHARS = 300        # Longer requests usually carry detailed requirements
+MAX_LIGHT_INGREDIENTS = 6
+MAX_LIGHT_CONSTRAINTS = 2    # Dietary rules named in the request
+MAX_LIGHT_DISLIKES = 8       # Disliked ingredients the recipe has to work around
+
+_COMPLEX_CUES = re.compile(
+    r"\b(?:meal\s+plan|meal\s+prep|plan\s+my|for\s+the\s+week|this\s+week|next\s+week|\d+\s+days|each\s+day|every\s+day"
+    r"|weekly|menu|courses|party|potluck|(?:several|multiple|\d+)\s+(?:meals|recipes|dishes))\b"
+)
+_CONSTRAINT_CUES = re.compile(
+    r"\b(?:vegan|vegetarian|pescatarian|gluten[\s-]free|dairy[\s-]free|nut[\s-]free|keto|paleo|low[\s-](?:carb|fat|sodium|calorie)"
+    r"|high[\s-]protein|halal|kosher|allerg\w*|diabetic|calories|macros|under\s+\$?\d+)\b"
+)
+_ITEM_SPLIT = re.compile(r",|\band\b|\bplus\b|;")
+
+
+def choose_tier(request: str, ingredient_count: int = None, dislike_count: int = 0) -> str:
+    """Picks LIGHT for short, simple recipe requests and STRONG for anything plan-like or heavily constrained."""
+    text = request.lower()
+    if _COMPLEX_CUES.search(text) or len(text) > MAX_LIGHT_CHARS:
+        return STRONG
+    if ingredient_count is None:
+        ingredient_count = len([item for item in _ITEM_SPLIT.split(text) if item.strip()])
+    if ingredient_count > MAX_LIGHT_INGREDIENTS:
+        return STRONG
+    if len(_CONSTRAINT_CUES.findall(text)) > MAX_LIGHT_CONSTRAINTS or dislike_count > MAX_LIGHT_DISLIKES:
+        return STRONG
+    return LIGHT
+
+
+def estimate_cost(model: str, prompt_tokens: int, response_tokens: int) -> float:
+    """USD cost of one call at list prices; 0.0 for models without a known price."""
+    input_price, output_price = PRICES.get(model, (0.0, 0.0))
+    return (prompt_tokens * input_price + response_tokens * output_price) / 1_000_000
@@ -6,14 +6,35 @@ import time
 import urllib.request
 import urllib.error
 import streamlit as st
+import uuid
+import metrics
+import mock_gemini
+import jobs
+import intents
+import chat_history
+import constraints
+import rescaler
+import model_router
+import hedging
+import weather
+import recipe_store
+import shared_state
 
 # --- API Configuration ---
-API_URL = "https://generativelanguage.googleapis.com/v1beta/models/gemini-2.5-flash-preview-09-2025:generateContent?key="
+API_BASE = os.environ.get("GEMINI_API_BASE", "https://generativelanguage.googleapis.com") # Point at mock_gemini.py to run offline
+API_URL = f"{API_BASE}/v1beta/models/{{model}}:generateContent?key="
 API_KEY = os.environ.get("GEMINI_API_KEY", "")
+GEMINI_MOCK = os.environ.get("GEMINI_MOCK", "") # Set to 1 to replay recorded responses in-process (no API key needed)
+GEMINI_RECORD_DIR = os.environ.get("GEMINI_RECORD_DIR", "") # Set to save real API responses as new mock recordings
 LOG_FILE = "chef_agent_log.txt"
-SAVED_RECIPES_DIR = "saved_recipes"
-MEAL_HISTORY_FILE = "meal_history.json" # File for long-term memory
-MODEL_NAME = "gemini-2.5-flash"
+SAVED_RECIPES_DIR = "saved_recipes" # Pre-store recipe files, imported into recipe_store/ on first start
+MEAL_HISTORY_FILE = "meal_history.json" # Pre-namespace memory file, imported into the default user's state on first start
+AUDIT_LOG_TAIL = 200 # Most recent audit entries shown on the Audit Log page
+MODEL_TIERS = { # Simple requests and repairs go to the light tier, meal plans and long constraint lists to the strong one
+    model_router.LIGHT: os.environ.get("GEMINI_LIGHT_MODEL", "gemini-2.5-flash-lite"),
+    model_router.STRONG: os.environ.get("GEMINI_STRONG_MODEL", "gemini-2.5-flash-preview-09-2025"),
+}
+JOB_POLL_SECONDS = 1.0 # How often the page checks on background generation jobs
 
 # --- CUSTOM FETCH IMPLEMENTATION (For environment compatibility and Gemini API calls) ---
 class APIResponse:
@@ -41,84 +62,197 @@ def custom_fetch(url, options):
     except Exception as e:
         raise e
 
+def hedged_fetch(fetch_func, url, options):
+    """
+    Sends the request through the shared Hedger: a call still running at the hedging threshold
+    gets an identical twin, and the first non-5xx/429 response wins.
+    
+    The loser's `cancel` event is set; the in-process stand-in stops on it, while a real
+    urllib request cannot be interrupted and is simply discarded when it returns.
+    """
+    return hedging.shared().call(
+        lambda cancel: fetch_func(url, dict(options, cancel=cancel)),
+        accept=lambda r: r is not None and r.status < 500 and r.status != 429,
+    )
+
+# --- OFFLINE MODE (Installs the `__fetch` override used by generate_content_and_plan) ---
+if GEMINI_MOCK:
+    __fetch = mock_gemini.shared_from_env()
+elif GEMINI_RECORD_DIR:
+    __fetch = mock_gemini.recording_fetch(custom_fetch, GEMINI_RECORD_DIR)
+
 # --- INITIALIZATION and UTILITIES ---
 
+@st.cache_resource(show_spinner=False)
+def ensure_storage_dirs():
+    """Opens the recipe store, imports pre-namespace memory, clears stale chat archives and generated namespaces, and warms the weather cache once per server process instead of on every rerun."""
+    recipe_store.shared().import_legacy(SAVED_RECIPES_DIR)
+    import_legacy_memory()
+    chat_history.prune_archives()
+    shared_state.prune_session_namespaces(shared_state.STATE_DIR)
+    shared_state.prune_session_namespaces(recipe_store.STORE_DIR)
+    weather.shared().refresh() # Warm the weather cache in the background before the first chat turn
+
 def initialize_state():
     """Initializes Streamlit session state variables and file structures."""
-    if 'log_history' not in st.session_state: st.session_state.log_history = []
-    if 'scheduled_events' not in st.session_state: st.session_state.scheduled_events = [] 
+    if 'session_id' not in st.session_state: st.session_state.session_id = uuid.uuid4().hex
+    if 'user_id' not in st.session_state: # ?user=<id> picks a shared namespace (not a login)
+        requested = st.query_params.get("user", "").strip()
+        if not requested: # A new private namespace, written to the URL so a reload or bookmark comes back to it
+            requested = shared_state.session_namespace(st.session_state.session_id)
+            st.query_params["user"] = requested
+        st.session_state.user_id = shared_state.namespace(requested)
     if 'last_recipe_title' not in st.session_state: st.session_state.last_recipe_title = ""
-    if 'last_recipe_markdown' not in st.session_state: st.session_state.last_recipe_markdown = ""
-    if 'messages' not in st.session_state: st.session_state.messages = []
+    if 'last_recipe_markdown' not in st.session_state: st.session_state.last_recipe_markdown = "" # As generated; resizes never overwrite it
+    if 'last_recipe_servings' not in st.session_state: st.session_state.last_recipe_servings = None # Serving count it was last resized to
+    if 'messages' not in st.session_state: st.session_state.messages = [] # Most recent messages; older ones live in the chat archive
+    if 'archived_count' not in st.session_state: st.session_state.archived_count = 0
+    if 'shown_archived' not in st.session_state: st.session_state.shown_archived = 0 # Archived messages brought back by "load earlier"
     if 'confirm_scheduling' not in st.session_state: st.session_state.confirm_scheduling = False
     
-    if 'processing_query' not in st.session_state: st.session_state.processing_query = None
+    if 'pending_jobs' not in st.session_state: st.session_state.pending_jobs = [] # Background generation job ids, oldest first
     if 'current_view' not in st.session_state: st.session_state.current_view = "💬 Chef Remy Chat"
     if 'confirm_dislikes' not in st.session_state: st.session_state.confirm_dislikes = None 
         
-    if not os.path.exists(SAVED_RECIPES_DIR):
-        os.makedirs(SAVED_RECIPES_DIR)
+    ensure_storage_dirs()
+    # Shared by every tab and server process of this user; re-read (cached per file change) on each run
+    st.session_state.scheduled_events = load_scheduled_events()
     
-    if not API_KEY:
+    if not API_KEY and not GEMINI_MOCK:
         st.error("🚨 GEMINI_API_KEY environment variable not found. Please set it to run the Agent.")
 
+def report_problem(level: str, message: str, log: tuple = None) -> None:
+    """
+    Shows a problem (st.error / st.warning) and writes it to the audit log.
+    
+    Inside a background job there is no page to draw on and no session state, so the notice
+    is kept on the job and shown and logged when the session picks the result up.
+    """
+    if jobs.add_notice(level, message, log):
+        return
+    getattr(st, level)(message)
+    if log:
+        log_action(*log)
+
+def add_message(role: str, content: str) -> None:
+    """Appends a chat message; the oldest ones are moved to this session's on-disk archive once the chat is long."""
+    spilled = chat_history.append(st.session_state.messages, st.session_state.session_id, role, content)
+    st.session_state.archived_count += spilled
+
 def log_action(action: str, params: dict, status: str, result: str = "") -> None:
-    """Logs the action to the audit file and session state."""
+    """Logs the action to the audit file and the user's shared audit log."""
     timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
     log_entry = f"[{timestamp}] ACTION: {action} | STATUS: {status} | RESULT: {result}"
     
-    st.session_state.log_history.append(log_entry)
-    
     try:
-        with open(LOG_FILE, "a", encoding="utf-8") as f:
-            f.write(f"[{timestamp}] ACTION: {action} | PARAMS: {params} | STATUS: {status} | RESULT: {result}\n")
+        shared_state.append_line(shared_state.user_path(st.session_state.user_id, "audit_log.txt"), log_entry)
+        shared_state.append_line(LOG_FILE, f"[{timestamp}] USER: {st.session_state.user_id} | ACTION: {action} | PARAMS: {params} | STATUS: {status} | RESULT: {result}")
     except Exception as e:
         st.warning(f"[ERROR] Could not write to audit file: {e}")
 
 # --- MEMORY AND TOOL MANAGEMENT ---
 
-def get_memory_data():
-    """Loads all memory data (history and dislikes) from the local JSON file."""
-    default_data = {"history": [], "disliked_ingredients": []}
-    if not os.path.exists(MEAL_HISTORY_FILE):
-        return default_data
+DEFAULT_MEMORY = {"history": [], "disliked_ingredients": []}
+
+def _file_stamp(path):
+    """(mtime_ns, size, inode) of a file, or None if it does not exist; every atomic replace gets a new inode."""
     try:
-        with open(MEAL_HISTORY_FILE, 'r') as f:
-            data = json.load(f)
-            if isinstance(data, dict):
-                return {**default_data, **data} 
-            else:
-                return default_data
-    except (json.JSONDecodeError, FileNotFoundError):
-        return default_data
-
-def save_memory_data(data):
-    """Saves all memory data to the local JSON file."""
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size, stat.st_ino
+
+@st.cache_data(max_entries=64, show_spinner=False)
+def _load_state_file(path, stamp, default):
+    """Parses a shared state file; cached per file stamp so reruns skip the JSON parse until the file changes."""
+    data, _ = shared_state.read_document(path, default)
+    if isinstance(default, dict):
+        return {**default, **data} if isinstance(data, dict) else default
+    return data if isinstance(data, list) else default
+
+def read_state(name, default):
+    """Reads one of this user's shared state files (memory, schedule); a copy, so callers can modify it freely."""
+    path = shared_state.user_path(st.session_state.user_id, name)
+    stamp = _file_stamp(path)
+    if stamp is None:
+        return json.loads(json.dumps(default))
+    return _load_state_file(path, stamp, default)
+
+def update_state(name, mutate, default):
+    """
+    Applies `mutate(data)` to one of this user's shared state files with optimistic concurrency:
+    if another tab or server process wrote the file in between, the change is re-applied to the
+    latest data. Returns mutate's result; raises shared_state.VersionConflict if it kept losing.
+    """
+    path = shared_state.user_path(st.session_state.user_id, name)
+    def _mutate(data):
+        if isinstance(default, dict):
+            for key, value in default.items():
+                data.setdefault(key, json.loads(json.dumps(value)))
+        return mutate(data)
+    result = shared_state.update_document(path, _mutate, default)
+    # Coarse filesystem timestamps may give the new file the stamp of an older cached version; drop just that entry
+    _load_state_file.clear(path, _file_stamp(path), default)
+    return result
+
+def import_legacy_memory():
+    """One-time import of the old single-user meal_history.json into the default user's namespace."""
+    path = shared_state.user_path(shared_state.DEFAULT_USER, "meal_history.json")
+    if os.path.exists(path) or not os.path.exists(MEAL_HISTORY_FILE):
+        return
+    legacy, _ = shared_state.read_document(MEAL_HISTORY_FILE, DEFAULT_MEMORY)
     try:
-        with open(MEAL_HISTORY_FILE, 'w') as f:
-            json.dump(data, f)
-        return True
+        shared_state.write_document(path, {**DEFAULT_MEMORY, **legacy}, 0)
+    except shared_state.VersionConflict:
+        pass # Another process imported it first
+
+def get_memory_data():
+    """Loads all memory data (history and dislikes) for the current user."""
+    return read_state("meal_history.json", DEFAULT_MEMORY)
+
+def update_memory_data(mutate):
+    """Applies `mutate(data)` to the user's memory (see update_state); returns its result, or None if saving failed."""
+    try:
+        return update_state("meal_history.json", mutate, DEFAULT_MEMORY)
     except Exception as e:
         log_action("MEMORY_SAVE", {"data": "..."*10}, "FAIL", f"Could not save memory: {e}")
-        return False
+        return None
+
+def load_scheduled_events():
+    return read_state("scheduled_events.json", [])
+
+def add_scheduled_event(event: dict) -> None:
+    """Adds an event to the user's shared schedule."""
+    update_state("scheduled_events.json", lambda events: events.append(event), [])
+    st.session_state.scheduled_events = load_scheduled_events()
+
+def remove_scheduled_events(should_remove) -> int:
+    """Removes the user's scheduled events for which `should_remove(event)` is true; returns how many were removed."""
+    def _remove(events):
+        kept = [event for event in events if not should_remove(event)]
+        removed = len(events) - len(kept)
+        events[:] = kept
+        return removed
+    removed = update_state("scheduled_events.json", _remove, [])
+    st.session_state.scheduled_events = load_scheduled_events()
+    return removed
 
 def add_to_meal_history(recipe_title: str):
     """Adds a new recipe to the meal history."""
-    data = get_memory_data()
-    history = data['history']
-    
-    if recipe_title in history:
-        history.remove(recipe_title)
+    def _add(data):
+        history = data['history']
+        
+        if recipe_title in history:
+            history.remove(recipe_title)
 
-    history.insert(0, recipe_title)
-    data['history'] = history[:10]
+        history.insert(0, recipe_title)
+        data['history'] = history[:10]
+        return True
     
-    return save_memory_data(data)
+    return update_memory_data(_add) is not None
 
 def add_disliked_ingredients_from_recipe(recipe_markdown: str):
     """Parses a deleted recipe for its ingredients and adds them to the disliked list."""
-    data = get_memory_data()
-    
     match = re.search(r"### \*\*Ingredients:\*\*.*?\n\n(.*?)\n\n###", recipe_markdown, re.DOTALL)
     if not match:
         log_action("MEMORY_DISLIKE", {}, "FAIL", "Could not find ingredient list in recipe content.")
@@ -128,31 +262,34 @@ def add_disliked_ingredients_from_recipe(recipe_markdown: str):
     
     raw_ingredients = re.findall(r'^\*\s*(.+?)(?:,\s*\d+.*)?$', ingredients_block, re.MULTILINE)
     
-    new_dislikes = data['disliked_ingredients']
-    for item in raw_ingredients:
-        item_name = item.split(',')[0].strip().lower()
-        if item_name and item_name not in new_dislikes:
-            new_dislikes.append(item_name)
+    def _add(data):
+        new_dislikes = data['disliked_ingredients']
+        for item in raw_ingredients:
+            item_name = item.split(',')[0].strip().lower()
+            if item_name and item_name not in new_dislikes:
+                new_dislikes.append(item_name)
+        return list(new_dislikes)
     
-    data['disliked_ingredients'] = new_dislikes
+    new_dislikes = update_memory_data(_add)
+    if new_dislikes is None:
+        return False
     log_action("MEMORY_DISLIKE", {"count": len(raw_ingredients)}, "SUCCESS", f"Learned {len(raw_ingredients)} disliked ingredients: {', '.join(new_dislikes)}")
-    
-    return save_memory_data(data)
+    return True
 
 def add_disliked_ingredients_from_chat(ingredients: list[str]):
     """Adds ingredients directly from chat input."""
-    data = get_memory_data()
-    new_dislikes = data['disliked_ingredients']
-    learned_count = 0
-    
-    for item in ingredients:
-        item = item.strip().lower()
-        if item and item not in new_dislikes:
-            new_dislikes.append(item)
-            learned_count += 1
-            
-    data['disliked_ingredients'] = new_dislikes
-    save_memory_data(data)
+    def _add(data):
+        new_dislikes = data['disliked_ingredients']
+        learned_count = 0
+        
+        for item in ingredients:
+            item = item.strip().lower()
+            if item and item not in new_dislikes:
+                new_dislikes.append(item)
+                learned_count += 1
+        return learned_count
+    
+    learned_count = update_memory_data(_add) or 0
     
     if learned_count > 0:
         log_action("PREFERENCE_LEARNED", {"items": ingredients}, "SUCCESS", f"Learned {learned_count} new dislike(s).")
@@ -161,17 +298,6 @@ def add_disliked_ingredients_from_chat(ingredients: list[str]):
         return "I already knew about those foods, chef. Anything else I can help with?"
 
 
-def mock_weather_api(location="Your Area"):
-    """Simulates a call to a weather API to get current conditions."""
-    current_hour = datetime.now().hour
-    
-    if 6 <= current_hour < 10:
-        return f"The current weather in {location} is 55°F (13°C) and cloudy. Perfect for a warm breakfast."
-    elif 10 <= current_hour < 16:
-        return f"The current weather in {location} is 88°F (31°C) and sunny. Highly recommend a COOL, NO-COOK meal."
-    else: # Evening/Night
-        return f"The current weather in {location} is 68°F (20°C) and clear. Good for a comforting dinner."
-
 # --- AGENT DSL DEFINITION (Same as previous, included for prompt context) ---
 DSL_SPECIFICATION = """..."""
 
@@ -184,7 +310,7 @@ def create_recipe_prompt(user_input):
     memory_data = get_memory_data()
     meal_history = memory_data['history']
     disliked_ingredients = memory_data['disliked_ingredients']
-    weather_report = mock_weather_api()
+    weather_report = weather.current_report() # Cached; never waits on the weather provider
 
     system_instruction = (
         "You are Chef Remy, the world-class, budget-conscious rat chef from the movie Ratatouille. \n"
@@ -231,8 +357,15 @@ def create_recipe_prompt(user_input):
 
 # --- 3. API CALL LOGIC (To Get Recipe and Actions) ---
 
-def generate_content_and_plan(prompt, max_retries=3):
-    """Handles the Gemini API call with exponential backoff."""
+def generate_content_and_plan(prompt, max_retries=3, tier=model_router.STRONG, problems=None):
+    """
+    Handles the Gemini API call with exponential backoff, on the model configured for `tier`.
+    
+    With a `problems` list, errors are appended to it as report_problem arguments instead of
+    being shown, so the caller can decide whether they matter.
+    """
+    model = MODEL_TIERS[tier]
+    report = report_problem if problems is None else lambda *args, **kwargs: problems.append((args, kwargs))
     
     headers = { 'Content-Type': 'application/json' }
     payload = {
@@ -243,31 +376,41 @@ def generate_content_and_plan(prompt, max_retries=3):
     response_text = None
     for attempt in range(max_retries):
         try:
-            full_url = f"{API_URL}{API_KEY}"
+            full_url = f"{API_URL.format(model=model)}{API_KEY}"
             if attempt > 0:
                 time.sleep(2**attempt)
                 
             api_fetch_func = globals().get('__fetch', custom_fetch)
 
-            response = api_fetch_func(full_url, {
+            options = {
                 'method': 'POST',
                 'headers': headers,
                 'body': json.dumps(payload)
-            })
+            }
+            with metrics.span("custom_fetch", attempt=attempt + 1, tier=tier), metrics.span(f"model:{tier}"):
+                if hedging.HEDGE_ENABLED:
+                    response = hedged_fetch(api_fetch_func, full_url, options)
+                else:
+                    response = api_fetch_func(full_url, options)
             
             if response and response.status == 200:
                 result = response.json()
+                usage = result.get('usageMetadata', {})
+                metrics.record_usage(usage)
+                metrics.increment(f"calls.{tier}")
+                metrics.increment(f"cost_usd.{tier}", model_router.estimate_cost(model, usage.get('promptTokenCount', 0), usage.get('candidatesTokenCount', 0)))
                 response_text = result.get('candidates', [{}])[0].get('content', {}).get('parts', [{}])[0].get('text', "")
                 break
             
             elif response and response.status >= 400:
                 error_message = response.json().get('error', {}).get('message', 'Unknown error.')
-                st.error(f"API Error {response.status}: {error_message}")
-                log_action("LLM_CALL", {"prompt": prompt}, f"API_ERROR_{response.status}", error_message)
+                metrics.increment(f"errors.{tier}")
+                report("error", f"API Error {response.status}: {error_message}",
+                               log=("LLM_CALL", {"prompt": prompt}, f"API_ERROR_{response.status}", error_message))
                 return None, None
 
         except Exception as e:
-            st.warning(f"Connection error (Attempt {attempt+1}): {e}")
+            report("warning", f"Connection error (Attempt {attempt+1}): {e}")
 
     if not response_text:
         return None, None
@@ -312,7 +455,7 @@ def execute_add_reminder(time: str, message: str) -> tuple[bool, str]:
     clean_title = message.replace('Check on ', '').replace('! This meal is ready.', '').strip()
 
     result_message = f"Reminder set: '{message}' at {resolved_time_str}."
-    st.session_state.scheduled_events.append({
+    add_scheduled_event({
         "type": "Reminder", 
         "description": message,
         "time_raw": resolved_time_str,
@@ -331,7 +474,7 @@ def execute_add_calendar_event(title: str, time: str, duration: str) -> tuple[bo
     resolved_time_str = resolve_time_to_absolute(time)
     
     result_message = f"Event added: '{title}' starting at {resolved_time_str}, lasting {duration}."
-    st.session_state.scheduled_events.append({
+    add_scheduled_event({
         "type": "Calendar Event", 
         "description": result_message,
         "time_raw": resolved_time_str,
@@ -341,63 +484,51 @@ def execute_add_calendar_event(title: str, time: str, duration: str) -> tuple[bo
     return True, result_message
 
 def execute_save_recipe(filename: str, content: str) -> tuple[bool, str]:
-    """Saves the recipe content to a local file (File I/O action) AND updates meal history."""
-    
-    illegal_chars = r'[<>:"/\\|?*\'`]'
-    sanitized_filename = re.sub(illegal_chars, '', filename).replace(' ', '_').replace('**', '').replace('__', '')
-    
-    clean_filename = f"{sanitized_filename}.md"
-    file_path = os.path.join(SAVED_RECIPES_DIR, clean_filename)
-    
+    """Saves the recipe as a new version in the content-addressed recipe store (File I/O action) AND updates meal history."""
     try:
-        with open(file_path, "w", encoding="utf-8") as f:
-            f.write(content)
-        
-        add_to_meal_history(filename)
-        
-        return True, f"Recipe saved successfully to `{clean_filename}`"
+        saved = recipe_store.shared(st.session_state.user_id).save(filename, content)
     except Exception as e:
-        return False, f"File I/O Error: Could not save recipe. {e} Filepath attempted: {file_path}"
+        return False, f"File I/O Error: Could not save recipe. {e} Store: {recipe_store.STORE_DIR}"
+    
+    add_to_meal_history(filename)
+    
+    metrics.increment(f"recipe_store.{saved.status}")
+    short_hash = saved.digest[:12]
+    if saved.status == "unchanged":
+        return True, f"Recipe `{saved.title}` is already saved with identical content (`{short_hash}`)."
+    if saved.status == "existing":
+        return True, f"Recipe saved as version {saved.version} of `{saved.title}`; its content was already stored (`{short_hash}`), so nothing new was written."
+    if saved.status == "near_duplicate":
+        return True, (f"Recipe saved as version {saved.version} of `{saved.title}` (`{short_hash}`). It is {saved.similarity:.0%} similar "
+                      f"to `{saved.similar_to}`, so only the differences were stored ({saved.stored_bytes} bytes).")
+    return True, f"Recipe saved as version {saved.version} of `{saved.title}` (`{short_hash}`, {saved.stored_bytes} bytes compressed)."
 
 # --- Deletion Logic ---
 
-def delete_recipe_and_events(filename: str, title: str):
+def delete_recipe_and_events(slug: str, title: str):
     """Performs the final deletion and memory update after user confirmation."""
-    file_path = os.path.join(SAVED_RECIPES_DIR, filename)
     status_emoji = "❌"
     
-    recipe_markdown = ""
-    try:
-        with open(file_path, 'r', encoding="utf-8") as f: 
-            recipe_markdown = f.read()
-    except Exception:
-        pass 
-        
     try:
-        if os.path.exists(file_path):
-            os.remove(file_path)
-            file_result = f"File '{filename}' deleted successfully."
+        if recipe_store.shared(st.session_state.user_id).delete(slug):
+            file_result = f"Recipe '{slug}' and all its versions deleted successfully."
             status_emoji = "✅"
             
             # --- Memory learning logic is now triggered in the confirmation form handler ---
             
         else:
-            file_result = f"File '{filename}' not found."
+            file_result = f"Recipe '{slug}' not found."
             
-        log_action("DELETE_FILE", {"filename": filename}, status_emoji, file_result)
+        log_action("DELETE_FILE", {"recipe": slug}, status_emoji, file_result)
     except Exception as e:
-        file_result = f"Error deleting file: {e}"
-        log_action("DELETE_FILE", {"filename": filename}, "❌", file_result)
+        file_result = f"Error deleting recipe: {e}"
+        log_action("DELETE_FILE", {"recipe": slug}, "❌", file_result)
 
-    initial_count = len(st.session_state.scheduled_events)
     normalized_delete_title = title.lower().strip().replace('_', ' ')
     
-    st.session_state.scheduled_events = [
-        event for event in st.session_state.scheduled_events
-        if 'title' not in event or normalized_delete_title not in event['title'].lower().strip().replace('_', ' ')
-    ]
-    
-    deleted_count = initial_count - len(st.session_state.scheduled_events)
+    deleted_count = remove_scheduled_events(
+        lambda event: 'title' in event and normalized_delete_title in event['title'].lower().strip().replace('_', ' ')
+    )
     event_result = f"{deleted_count} scheduled event(s) removed for recipe: '{title}'."
     
     log_action("DELETE_SCHEDULE", {"title": title}, "✅" if deleted_count > 0 else "ℹ️", event_result)
@@ -407,18 +538,13 @@ def delete_recipe_and_events(filename: str, title: str):
     st.rerun() # Rerun to refresh the Recipe Book page
 
 
-def prepare_delete_and_dislike(filename: str, title: str):
-    """
-    Triggers the two-step deletion process by setting the confirmation state.
-    """
-    file_path = os.path.join(SAVED_RECIPES_DIR, filename)
-    
+def stage_delete_confirmation(slug: str, title: str) -> bool:
+    """Sets the confirmation state that shows the deletion form on the Recipe Book page."""
     try:
-        with open(file_path, 'r', encoding="utf-8") as f: 
-            recipe_markdown = f.read()
+        recipe_markdown = recipe_store.shared(st.session_state.user_id).read(slug)
     except Exception:
         st.error("Could not read recipe content. Cannot determine ingredients for dislike memory.")
-        return 
+        return False
         
     # Extract existing ingredients for pre-population
     match = re.search(r"### \*\*Ingredients:\*\*.*?\n\n(.*?)\n\n###", recipe_markdown, re.DOTALL)
@@ -430,59 +556,218 @@ def prepare_delete_and_dislike(filename: str, title: str):
     
     # Set the state variable to trigger the confirmation form
     st.session_state.confirm_dislikes = {
-        "filename": filename,
+        "slug": slug,
         "title": title,
         "default_dislikes": ", ".join(default_dislikes)
     }
-    st.rerun() # Force rerun to show the form
+    return True
+
+def prepare_delete_and_dislike(slug: str, title: str):
+    """
+    Triggers the two-step deletion process by setting the confirmation state.
+    """
+    if stage_delete_confirmation(slug, title):
+        st.rerun() # Force rerun to show the form
+
+# --- LOCAL INTENT HANDLERS (Answered without an LLM call) ---
+
+def list_saved_recipes() -> list[tuple[str, str]]:
+    """Returns (slug, title) for every saved recipe."""
+    return [(slug, title) for slug, title, _, _ in recipe_store.shared(st.session_state.user_id).list_recipes()]
+
+def handle_show_recipes(argument) -> str:
+    recipes = list_saved_recipes()
+    if not recipes:
+        return "Your recipe book is empty, chef. Ask me to cook something and I'll save it for you!"
+    titles = "\n".join(f"* {title}" for _, title in recipes)
+    return f"You have {len(recipes)} saved recipe(s):\n\n{titles}\n\nOpen the **📚 Saved Recipe Book** page to read or delete them."
+
+def handle_history(argument) -> str:
+    history = get_memory_data()['history']
+    if not history:
+        return "You haven't cooked anything with me yet. Tell me what's in your fridge!"
+    meals = "\n".join(f"{i}. {title}" for i, title in enumerate(history, start=1))
+    return f"Here's what you've cooked recently, newest first (I remember your last 10 meals):\n\n{meals}"
+
+def handle_schedule(argument) -> str:
+    events = sorted(st.session_state.scheduled_events, key=lambda e: parse_time_to_float(e.get('time_raw', '')))
+    if not events:
+        return "Nothing is scheduled yet. Ask for a recipe with a start time and I'll plan it for you."
+    lines = "\n".join(f"* **{e.get('time_raw', '?')}** ({e['type']}): {e.get('title') or e['description']}" for e in events)
+    return f"Here's your schedule for today:\n\n{lines}"
+
+def handle_delete(target: str) -> str:
+    recipes = list_saved_recipes()
+    matched_titles = intents.match_titles(target, [title for _, title in recipes])
+    matches = [(slug, title) for slug, title in recipes if title in matched_titles]
+    if not matches:
+        return f"I couldn't find a saved recipe matching '{target}'. Say 'show my recipes' to see what's in your book."
+    if len(matches) > 1:
+        options = ", ".join(title for _, title in matches)
+        return f"More than one recipe matches '{target}': {options}. Which one should I delete?"
+    slug, title = matches[0]
+    if st.session_state.confirm_dislikes is not None:
+        return "Another deletion is waiting for confirmation on the **📚 Saved Recipe Book** page. Finish that one first."
+    if not stage_delete_confirmation(slug, title):
+        return f"I couldn't read **{title}**, so nothing was deleted."
+    return f"Ready to delete **{title}**. Confirm (and review what I should learn to avoid) on the **📚 Saved Recipe Book** page."
+
+def handle_scale(target) -> str:
+    recipe = st.session_state.last_recipe_markdown
+    if not recipe:
+        return "Ask me for a recipe first, then I can resize it for you."
+    original = rescaler.parse_servings(recipe)
+    if not original:
+        return "I couldn't find the serving count in the last recipe, so I can't resize it."
+    # Always rescale the generated recipe, so repeated resizes don't compound rounding errors
+    current = st.session_state.last_recipe_servings or original
+    servings = max(1, round(current * target)) if isinstance(target, float) else target
+    st.session_state.last_recipe_servings = servings
+    resized = rescaler.rescale_recipe(recipe, servings, from_servings=original)
+    return f"📏 **{st.session_state.last_recipe_title}, resized for {servings} serving(s):**\n\n{resized}"
+
+def handle_dislike(items: list[str]) -> str:
+    return add_disliked_ingredients_from_chat(items)
 
 # --- EXECUTION FLOW ---
 
+def parse_recipe_title(recipe_markdown: str) -> str:
+    """Reads the dish name from the template's 'Recipe Name' heading, stripped of filename-unsafe characters."""
+    title_match = re.search(r"##\s*\*+\s*Recipe Name:\s*(.*)\*+", recipe_markdown, re.IGNORECASE)
+    recipe_title_raw = title_match.group(1).strip() if title_match else "Untitled Recipe"
+    return re.sub(r'[<>:"/\\|?*\'`]', '', recipe_title_raw).replace('**', '').replace('__', '').strip()
+
+def is_complete(recipe_markdown, action_block) -> bool:
+    """Cheap structural check: a titled recipe with an ingredient list and an action plan."""
+    return bool(recipe_markdown and action_block
+                and re.search(r"Recipe Name:", recipe_markdown, re.IGNORECASE)
+                and re.search(r"Ingredients", recipe_markdown, re.IGNORECASE))
+
+def generate_with_fallback(prompt, tier):
+    """
+    Calls the routed tier; a light-tier error or incomplete answer is retried once on the strong tier.
+    Light-tier errors are only reported when the strong tier fails as well.
+    """
+    light_problems = [] if tier == model_router.LIGHT else None
+    with metrics.span("generate_content_and_plan", tier=tier):
+        recipe_markdown, action_block = generate_content_and_plan(prompt, tier=tier, problems=light_problems)
+    if tier == model_router.LIGHT and not is_complete(recipe_markdown, action_block):
+        metrics.increment("fallbacks.light_to_strong")
+        with metrics.span("generate_content_and_plan", tier=model_router.STRONG, fallback=True):
+            recipe_markdown, action_block = generate_content_and_plan(prompt, tier=model_router.STRONG)
+        if not recipe_markdown:
+            for args, kwargs in light_problems:
+                report_problem(*args, **kwargs)
+    return recipe_markdown, action_block
+
+def enforce_constraints(recipe_markdown, action_block, disliked, history, user_input):
+    """
+    Checks the recipe against the dislike list and meal history, and only when it breaks
+    them asks the model for a targeted edit (replace X / rename) instead of a new recipe.
+    """
+    with metrics.span("validate_recipe"):
+        violations = constraints.find_violations(recipe_markdown, parse_recipe_title(recipe_markdown), disliked, history, user_input)
+    if not violations:
+        return recipe_markdown, action_block
+    
+    metrics.increment("constraints.violations", len(violations))
+    with metrics.span("repair_recipe", violations=len(violations)):
+        repaired_markdown, repaired_actions = generate_with_fallback(constraints.build_repair_prompt(recipe_markdown, action_block, violations), model_router.LIGHT)
+    
+    if repaired_markdown:
+        remaining = constraints.find_violations(repaired_markdown, parse_recipe_title(repaired_markdown), disliked, history, user_input)
+        if len(remaining) < len(violations):
+            metrics.increment("constraints.repairs")
+            report_problem("info", f"Chef Remy swapped out {constraints.describe(constraints.resolved(violations, remaining))} to respect your preferences.")
+            if remaining:
+                report_problem("warning", f"Heads up: this recipe still uses {constraints.describe(remaining)}, which goes against your preferences.")
+            return repaired_markdown, repaired_actions or action_block
+    
+    metrics.increment("constraints.repair_failed")
+    report_problem("warning", f"Heads up: this recipe still uses {constraints.describe(violations)}, which goes against your preferences.")
+    return recipe_markdown, action_block
+
+def generation_job(full_prompt, tier=model_router.STRONG, disliked=(), history=(), user_input=""):
+    """Runs on a background worker: the API call, its retry backoff and validation, with no Streamlit calls."""
+    job = jobs.current()
+    with metrics.trace("generation_job", trace_id=job.trace_id if job else None):
+        recipe_markdown, action_block = generate_with_fallback(full_prompt, tier)
+        if recipe_markdown:
+            recipe_markdown, action_block = enforce_constraints(recipe_markdown, action_block, disliked, history, user_input)
+        return recipe_markdown, action_block
+
 def process_query_and_run(user_input):
-    """Handles the long-running API call and execution phase (Run 2)."""
-    
-    # --- STEP 0: Check for Dislike Intent (New Intent Classification) ---
-    dislike_pattern = r"(?:i\s+don['\s+]t\s+(?:like|want)|i\s+hate|avoid|no|exclude)\s+(.+)"
-    
-    match = re.search(dislike_pattern, user_input, re.IGNORECASE)
-    
-    if match:
-        raw_dislikes = match.group(1)
-        disliked_items = [item.strip() for item in re.split(r',\s*|\s+and\s*|\s+', raw_dislikes) if item.strip()]
-        
-        if disliked_items:
-            response_message = add_disliked_ingredients_from_chat(disliked_items)
-            st.session_state.messages.append({"role": "assistant", "content": response_message})
-            st.session_state.processing_query = None # Clear flag and stop the cycle
-            return
+    """Handles a chat turn: a local intent answered right away, or the recipe generation queued in the background."""
+    
+    # --- STEP 0: Intent Routing (Only recipe requests need the LLM) ---
+    with metrics.span("route_intent"):
+        intent = intents.classify(user_input, titles=[title for _, title in list_saved_recipes()])
+    metrics.increment(f"intents.{intent.name}")
+    
+    local_handlers = {
+        intents.DISLIKE: handle_dislike,
+        intents.SHOW_RECIPES: handle_show_recipes,
+        intents.HISTORY: handle_history,
+        intents.SCHEDULE: handle_schedule,
+        intents.DELETE: handle_delete,
+        intents.SCALE: handle_scale,
+    }
+    handler = local_handlers.get(intent.name)
+    if handler:
+        add_message("assistant", handler(intent.argument))
+        return
 
-    # --- Step 1: Proceed with Recipe Generation (Original Logic) ---
+    # --- Step 1: Queue the Recipe Generation (Picked up by collect_finished_jobs) ---
+    
+    with metrics.span("create_recipe_prompt"):
+        full_prompt = create_recipe_prompt(user_input) # Reads memory and session state, so built here, not in the worker
+    memory_data = get_memory_data() # Snapshot for the validator; the worker cannot read Streamlit caches
+    tier = model_router.choose_tier(user_input, dislike_count=len(memory_data['disliked_ingredients']))
+    metrics.increment(f"routed.{tier}")
+    job_id = jobs.submit(st.session_state.session_id, user_input, generation_job, full_prompt, tier=tier,
+                         disliked=tuple(memory_data['disliked_ingredients']), history=tuple(memory_data['history']), user_input=user_input)
+    st.session_state.pending_jobs.append(job_id)
+
+def apply_generation_result(job):
+    """Runs on the script thread once a generation job has finished: shows the recipe and executes the plan."""
+    for notice in job.notices:
+        icon = "ℹ️" if notice['level'] == "info" else "⚠️"
+        add_message("system", f"{icon} {notice['message']}")
+        if notice['log']:
+            log_action(*notice['log'])
+    
+    if job.status == jobs.CANCELLED:
+        add_message("assistant", f"Okay, I cancelled that request (*{job.label[:60]}*). Send it again whenever you like.")
+        return
     
-    with st.spinner(f"Chef Remy is generating your recipe and action plan..."):
-        full_prompt = create_recipe_prompt(user_input)
-        recipe_markdown, action_block = generate_content_and_plan(full_prompt)
+    if job.status == jobs.DONE:
+        recipe_markdown, action_block = job.result
+    else:
+        if job.error:
+            log_action("LLM_CALL", {"prompt": job.label}, "JOB_FAILED", job.error)
+        recipe_markdown, action_block = None, None
     
     if not recipe_markdown:
         assistant_message = "I couldn't generate a recipe or plan. Please check the API key and try again with clearer ingredients."
-        st.session_state.messages.append({"role": "assistant", "content": assistant_message})
+        add_message("assistant", assistant_message)
         return
     
     # 2. Extract Recipe Title and Save to State
-    title_match = re.search(r"##\s*\*+\s*Recipe Name:\s*(.*)\*+", recipe_markdown, re.IGNORECASE)
-    recipe_title_raw = title_match.group(1).strip() if title_match else "Untitled Recipe"
-    recipe_title = re.sub(r'[<>:"/\\|?*\'`]', '', recipe_title_raw).replace('**', '').replace('__', '').strip()
+    recipe_title = parse_recipe_title(recipe_markdown)
     
     st.session_state.last_recipe_title = recipe_title
     st.session_state.last_recipe_markdown = recipe_markdown 
+    st.session_state.last_recipe_servings = None
     
     # 3. Assemble and Display Recipe Output
     recipe_display = f"✨ **Your meal is served: {recipe_title}!**\n\n{recipe_markdown}"
-    st.session_state.messages.append({"role": "assistant", "content": recipe_display})
+    add_message("assistant", recipe_display)
 
     # 4. Action Interpretation
-    planned_actions = parse_actions(action_block)
+    with metrics.span("parse_actions"):
+        planned_actions = parse_actions(action_block)
     
-    st.session_state.messages.append({"role": "system", "content": f"**Agent Plan:** Executing {len(planned_actions)} actions."})
+    add_message("system", f"**Agent Plan:** Executing {len(planned_actions)} actions.")
     
     # 5. Action Execution
     executor_map = {
@@ -491,19 +776,13 @@ def process_query_and_run(user_input):
         "SAVE_RECIPE": execute_save_recipe,
     }
     
-    st.session_state.messages.append({
-        "role": "system", 
-        "content": f"**Agent:** I have a 3-step plan ready based on the recipe's timeline. Starting execution now."
-    })
+    add_message("system", f"**Agent:** I have a 3-step plan ready based on the recipe's timeline. Starting execution now.")
     
     for action in planned_actions:
         action_name = action['action_name']
         params = action['params']
         
-        st.session_state.messages.append({
-            "role": "system",
-            "content": f"⏳ **STATUS:** Starting **{action_name}**..."
-        })
+        add_message("system", f"⏳ **STATUS:** Starting **{action_name}**...")
         
         params.pop('content', None) 
         params.pop('filename', None) 
@@ -522,7 +801,8 @@ def process_query_and_run(user_input):
         
         if executor_func:
             try:
-                success, result_message = executor_func(**params)
+                with metrics.span(f"execute:{action_name}"):
+                    success, result_message = executor_func(**params)
             except Exception as e:
                 success = False
                 result_message = f"Execution Error: Invalid parameters or unhandled exception: {e}"
@@ -530,20 +810,30 @@ def process_query_and_run(user_input):
             status_emoji = "✅" if success else "❌"
             
             execution_log_entry = f"{status_emoji} **{action_name}**: {result_message}"
-            st.session_state.messages.append({
-                "role": "system",
-                "content": execution_log_entry
-            })
+            add_message("system", execution_log_entry)
             
-            log_action(action_name, params, status_emoji, result_message)
+            # The recipe text is kept in the recipe store; the result message names its hash
+            log_action(action_name, {k: v for k, v in params.items() if k != 'content'}, status_emoji, result_message)
         else:
-            st.session_state.messages.append({
-                "role": "system",
-                "content": f"⚠️ **{action_name}**: Unknown action."
-            })
-    
-    st.session_state.messages.append({"role": "system", "content": "All planned steps executed (or denied)."})
-    st.session_state.processing_query = None 
+            add_message("system", f"⚠️ **{action_name}**: Unknown action.")
+    
+    add_message("system", "All planned steps executed (or denied).")
+
+def collect_finished_jobs() -> int:
+    """Applies every finished job of this session, in submission order; returns how many were applied."""
+    collected = 0
+    for job_id in list(st.session_state.pending_jobs):
+        job = jobs.get(job_id)
+        if job is not None and not job.finished:
+            continue
+        st.session_state.pending_jobs.remove(job_id)
+        if job is None:
+            continue # Pruned after sitting unclaimed past jobs.JOB_TTL_SECONDS
+        jobs.release(job_id)
+        with metrics.trace("apply_generation_result", trace_id=job.trace_id): # Same id as the turn that submitted it
+            apply_generation_result(job)
+        collected += 1
+    return collected
 
 
 # Helper function to convert relative time to a stable, absolute time string
@@ -617,6 +907,11 @@ def parse_duration_to_hours(duration_str):
         
     return 0.0
 
+@st.cache_data(max_entries=256, show_spinner=False)
+def read_recipe_body(user_id, digest):
+    """Reads a stored recipe body; bodies never change, so the user and content hash are the whole cache key."""
+    return recipe_store.shared(user_id).read_body(digest)
+
 def render_saved_recipes():
     st.header("Recipe Book 📚")
     
@@ -652,7 +947,7 @@ def render_saved_recipes():
                     add_disliked_ingredients_from_chat(final_dislikes)
                     
                     # 3. Perform the actual file and schedule deletion
-                    delete_recipe_and_events(data['filename'], data['title'])
+                    delete_recipe_and_events(data['slug'], data['title'])
                     
                     # NOTE: delete_recipe_and_events performs st.rerun() at the end
                 
@@ -667,20 +962,22 @@ def render_saved_recipes():
         st.markdown("### Saved Recipes")
     # --- END DISLIKE CONFIRMATION FORM ---
     
-    recipe_files = [f for f in os.listdir(SAVED_RECIPES_DIR) if f.endswith('.md')]
+    recipes = recipe_store.shared(st.session_state.user_id).list_recipes()
     
-    if not recipe_files:
+    if not recipes:
         st.info("No recipes saved yet. Generate and execute a recipe plan in the Chat tab!")
         return
+    
+    usage = recipe_store.shared(st.session_state.user_id).usage()
+    st.caption(f"{usage['versions']} saved version(s) of {usage['recipes']} recipe(s), {usage['bodies']} distinct bodies: "
+               f"{usage['stored_bytes'] / 1024:.1f} KB on disk for {usage['raw_bytes'] / 1024:.1f} KB of text.")
         
-    for filename in recipe_files:
-        filepath = os.path.join(SAVED_RECIPES_DIR, filename)
-        title_for_display = filename.replace('.md', '').replace('_', ' ')
-        raw_title = filename.replace('.md', '') 
+    for slug, title_for_display, digest, version_count in recipes:
+        raw_title = slug
         
         # Create a form for the delete button to prevent rerun issues
         with st.form(key=f"delete_form_{raw_title}"):
-            st.markdown(f"**{title_for_display}**")
+            st.markdown(f"**{title_for_display}**" + (f" ({version_count} versions)" if version_count > 1 else ""))
             
             # Use disabled=True if a deletion is already pending
             delete_button = st.form_submit_button(
@@ -691,26 +988,25 @@ def render_saved_recipes():
 
             if delete_button:
                 # TRIGER STEP 1: Set the confirmation state
-                prepare_delete_and_dislike(filename, raw_title) 
+                prepare_delete_and_dislike(slug, title_for_display) 
             
             with st.expander("View Recipe Details"):
                 try:
-                    with open(filepath, 'r', encoding="utf-8") as f:
-                        content = f.read()
-                        st.markdown(content)
+                    st.markdown(read_recipe_body(st.session_state.user_id, digest))
                 except Exception as e:
-                    st.error(f"Could not read recipe file: {e}")
+                    st.error(f"Could not read recipe: {e}")
         st.markdown("---")
 
 
 def render_audit_log():
     st.header("Agent Audit Log 📜")
     
-    if not st.session_state.log_history:
-        st.info("No actions have been logged in this session.")
+    log_history = shared_state.read_tail(shared_state.user_path(st.session_state.user_id, "audit_log.txt"), AUDIT_LOG_TAIL)
+    if not log_history:
+        st.info("No actions have been logged yet.")
     
     log_content = ""
-    for entry in reversed(st.session_state.log_history):
+    for entry in reversed(log_history):
         log_content += f"{entry}\n"
     
     st.code(log_content)
@@ -719,7 +1015,7 @@ def render_scheduled_events():
     st.header("Daily Schedule Timeline 📅")
     
     if not st.session_state.scheduled_events:
-        st.info("No scheduled actions (reminders or calendar events) have been set this session.")
+        st.info("No scheduled actions (reminders or calendar events) have been set yet.")
         return
     
     schedulable_events = []
@@ -800,48 +1096,143 @@ def render_scheduled_events():
         
         current_hour += 1
 
+def render_metrics_view():
+    st.header("Agent Metrics 📈")
+    st.caption("Latency percentiles per pipeline stage, aggregated across all sessions served by this process.")
+    
+    data = metrics.snapshot()
+    if not data['stages']:
+        st.info("No requests have been traced yet. Ask Chef Remy for a recipe in the Chat tab!")
+        return
+    
+    rows = [{"stage": stage, **values} for stage, values in sorted(data['stages'].items())]
+    st.dataframe(rows, hide_index=True)
+    
+    counters = data['counters']
+    col1, col2, col3 = st.columns(3)
+    col1.metric("Prompt tokens", int(counters.get("tokens.prompt", 0)))
+    col2.metric("Response tokens", int(counters.get("tokens.response", 0)))
+    col3.metric("Total tokens", int(counters.get("tokens.total", 0)))
+    
+    st.subheader("Model Tiers")
+    tier_rows = []
+    for tier, model in MODEL_TIERS.items():
+        latency = data['stages'].get(f"model:{tier}", {})
+        tier_rows.append({
+            "tier": tier,
+            "model": model,
+            "routed": int(counters.get(f"routed.{tier}", 0)),
+            "calls": int(counters.get(f"calls.{tier}", 0)),
+            "errors": int(counters.get(f"errors.{tier}", 0)),
+            "p50_ms": latency.get("p50_ms", 0.0),
+            "p95_ms": latency.get("p95_ms", 0.0),
+            "cost_usd": round(counters.get(f"cost_usd.{tier}", 0.0), 5),
+        })
+    st.dataframe(tier_rows, hide_index=True)
+    st.caption(f"Light → strong fallbacks: {int(counters.get('fallbacks.light_to_strong', 0))}. Costs use list prices from `model_router.PRICES`.")
+    
+    if hedging.HEDGE_ENABLED:
+        st.subheader("Hedged Requests")
+        hedger = hedging.shared()
+        hedge = hedger.snapshot()
+        col1, col2, col3, col4 = st.columns(4)
+        col1.metric("Hedge threshold", f"{hedger.threshold():.2f} s")
+        col2.metric("Hedges fired", hedge["hedged"], help=f"Out of {hedge['calls']} calls")
+        col3.metric("Hedge won", hedge["hedge_won"])
+        col4.metric("Over budget", hedge["budget_denied"], help="Slow calls that were not hedged because the budget was spent")
+    
+    if metrics.METRICS_JSONL_FILE:
+        st.caption(f"Finished traces are also exported to `{metrics.METRICS_JSONL_FILE}`.")
+    else:
+        st.caption("Set the CHEF_METRICS_JSONL environment variable to export every trace as JSONL.")
+    
+    with st.expander("Raw metrics (JSON)"):
+        st.json(data)
+    
+    if st.button("Reset Metrics"):
+        metrics.reset()
+        st.rerun()
+
 # --- Render Functions for Sidebar Navigation (Moved to bottom for clarity) ---
 
+@st.fragment(run_every=JOB_POLL_SECONDS)
+def render_job_queue():
+    """Polls this session's background jobs; only rendered (and so only polling) while some are pending."""
+    if collect_finished_jobs():
+        st.rerun() # Full rerun so the chat and the sidebar memory show the new results
+    
+    for job_id in st.session_state.pending_jobs:
+        job = jobs.get(job_id)
+        if job is None:
+            continue
+        state = "cooking" if job.status == jobs.RUNNING else "waiting for a free stove"
+        col1, col2 = st.columns([5, 1])
+        col1.caption(f"⏳ {state} ({job.elapsed():.0f}s): {job.label[:60]}")
+        if job.status == jobs.QUEUED and col2.button("✖", key=f"cancel_job_{job_id}", help="Cancel this request"):
+            jobs.cancel(job_id)
+
+@st.cache_data(max_entries=32, show_spinner=False)
+def load_archived_messages(session_id, count, archived_count):
+    """Reads archived messages back; keyed on archived_count so new spills are picked up."""
+    return chat_history.read_archive(session_id, count)
+
+def render_message(message):
+    role = message["role"]
+    content = message["content"]
+    
+    if role == "user":
+        st.chat_message("user").write(content)
+    elif role == "assistant":
+        st.chat_message("assistant", avatar="👨‍🍳").markdown(content)
+    elif role == "system":
+        with st.chat_message("system"):
+            st.caption(content)
+            steps = message.get("steps", [])
+            if len(steps) > 1:
+                with st.expander(f"{len(steps)} agent steps"):
+                    for step in steps:
+                        st.caption(step)
+
+@st.fragment
 def render_chat_tab():
+    """Chat history and input; typing a message reruns only this fragment until the turn is finished."""
     st.title("💬 Chef Remy Chat")
     
+    # Only the most recent messages are kept in memory; earlier ones are read back from disk on request
+    hidden = st.session_state.archived_count - st.session_state.shown_archived
+    if hidden > 0 and st.button(f"⬆️ Load earlier messages ({hidden} more)", key="load_earlier_messages"):
+        st.session_state.shown_archived += min(chat_history.PAGE_SIZE, hidden)
+    if st.session_state.shown_archived:
+        archived = load_archived_messages(st.session_state.session_id, st.session_state.shown_archived, st.session_state.archived_count)
+        for message in archived:
+            render_message(message)
+    
     for message in st.session_state.messages:
-        role = message["role"]
-        content = message["content"]
-        
-        if role == "user":
-            st.chat_message("user").write(content)
-        elif role == "assistant":
-            st.chat_message("assistant", avatar="👨‍🍳").markdown(content)
-        elif role == "system":
-            st.chat_message("system").caption(content)
-            
-    # Chat input handling (Run 1: Capture and Rerun)
-    if st.session_state.processing_query is None:
-        if prompt := st.chat_input("Ask Chef Remy to cook or access a recipe..."):
+        render_message(message)
             
-            # --- CHECK FOR DIRECT PREFERENCE LEARNING ---
-            dislike_pattern = r"(?:i\s+don['\s+]t\s+(?:like|want)|i\s+hate|avoid|no|exclude)\s+(.+)"
-            match = re.search(dislike_pattern, prompt, re.IGNORECASE)
-            
-            if match:
-                raw_dislikes = match.group(1)
-                # Split keywords by commas, 'and', or space
-                disliked_items = [item.strip() for item in re.split(r',\s*|\s+and\s*|\s+', raw_dislikes) if item.strip()]
-                
-                if disliked_items:
-                    # Execute preference learning and provide feedback immediately
-                    response_message = add_disliked_ingredients_from_chat(disliked_items)
-                    st.session_state.messages.append({"role": "user", "content": prompt}) # User input is displayed
-                    st.session_state.messages.append({"role": "assistant", "content": response_message})
-                    
-                    st.rerun() 
-                    return # Exit function after handling preference
+    if st.session_state.pending_jobs:
+        st.caption(f"👨‍🍳 Chef Remy is working on {len(st.session_state.pending_jobs)} request(s); follow them in the Kitchen Queue.")
             
-            # --- NO PREFERENCE DETECTED: Proceed with Recipe Generation ---
-            st.session_state.messages.append({"role": "user", "content": prompt})
-            st.session_state.processing_query = prompt
-            st.rerun()
+    # Chat input handling (Stays available while earlier requests are still cooking)
+    if prompt := st.chat_input("Ask Chef Remy to cook or access a recipe..."):
+        add_message("user", prompt)
+        with metrics.trace("process_query_and_run"): # The turn's trace; its background job and pickup continue it
+            process_query_and_run(prompt)
+        st.rerun() # Full rerun so the new messages, the job queue and the sidebar memory are shown
+
+@st.fragment
+def render_safety_controls():
+    """Toggling authorization only reruns this fragment; the flag is read when actions execute."""
+    st.session_state.confirm_scheduling = st.checkbox(
+        "**Authorize External Actions (Safety):** I authorize the agent to execute scheduling and file save actions.",
+        value=st.session_state.confirm_scheduling,
+        key="sidebar_confirm_scheduling"
+    )
+    
+    if st.session_state.confirm_scheduling:
+        st.success("Actions are authorized.")
+    else:
+        st.warning("Actions (Reminders/Calendar/Save) will be DENIED until authorized.")
 
 # --- MAIN STREAMLIT APP ---
 
@@ -854,21 +1245,22 @@ st.set_page_config(
 initialize_state()
 st.title("👨‍🍳 The Little Chef: AI Agent")
 
-# Check for a query that needs processing from a previous run
-if st.session_state.processing_query:
-    process_query_and_run(st.session_state.processing_query)
-
 # --- SIDEBAR NAVIGATION (Floating/Always Visible) ---
 with st.sidebar:
     st.header("Agent Navigation")
     
     st.session_state.current_view = st.radio(
         "Go to:",
-        ["💬 Chef Remy Chat", "📚 Saved Recipe Book", "📅 Scheduled Actions", "📜 Agent Audit Log"],
+        ["💬 Chef Remy Chat", "📚 Saved Recipe Book", "📅 Scheduled Actions", "📜 Agent Audit Log", "📈 Agent Metrics"],
         key="sidebar_navigation_key"
     )
     
     st.markdown("---")
+    if st.session_state.pending_jobs:
+        st.header("Kitchen Queue")
+        render_job_queue()
+        st.markdown("---")
+    
     st.header("Adaptive Memory")
     
     memory_data = get_memory_data() 
@@ -878,27 +1270,21 @@ with st.sidebar:
     st.markdown("---")
     st.header("Controls & Safety")
     
-    st.session_state.confirm_scheduling = st.checkbox(
-        "**Authorize External Actions (Safety):** I authorize the agent to execute scheduling and file save actions.",
-        value=st.session_state.confirm_scheduling,
-        key="sidebar_confirm_scheduling"
-    )
-    
-    if st.session_state.confirm_scheduling:
-        st.success("Actions are authorized.")
-    else:
-        st.warning("Actions (Reminders/Calendar/Save) will be DENIED until authorized.")
+    render_safety_controls()
     
     st.markdown("---")
     st.caption("Instructions: Type a request like 'I have leftover rice, eggs, and soy sauce. Make a quick dinner for one.'")
 
 # --- CONDITIONAL RENDERING ---
 
-if st.session_state.current_view == "💬 Chef Remy Chat":
-    render_chat_tab()
-elif st.session_state.current_view == "📚 Saved Recipe Book":
-    render_saved_recipes()
-elif st.session_state.current_view == "📅 Scheduled Actions":
-    render_scheduled_events()
-elif st.session_state.current_view == "📜 Agent Audit Log":
-    render_audit_log()
\ No newline at end of file
+with metrics.span(f"render:{st.session_state.current_view}"):
+    if st.session_state.current_view == "💬 Chef Remy Chat":
+        render_chat_tab()
+    elif st.session_state.current_view == "📚 Saved Recipe Book":
+        render_saved_recipes()
+    elif st.session_state.current_view == "📅 Scheduled Actions":
+        render_scheduled_events()
+    elif st.session_state.current_view == "📜 Agent Audit Log":
+        render_audit_log()
+    elif st.session_state.current_view == "📈 Agent Metrics":
+        render_metrics_view()
\ No newline at end of file
@@ -0,0 +1,73 @@
+import os
+import json
+import time
+from collections import deque
+
+# --- Configuration ---
+ARCHIVE_DIR = "chat_archive"  # One JSONL file of spilled messages per browser session
+MAX_LIVE_MESSAGES = 60  # Messages kept in session state (and rendered on every rerun)
+SPILL_BATCH = 20  # Extra messages spilled at once, so the archive is written every few turns, not every message
+PAGE_SIZE = 20  # Archived messages brought back per "load earlier" click
+ARCHIVE_TTL_DAYS = 7  # Archives of sessions idle for longer are deleted
+
+# --- Bounded Chat History ---
+# Messages are plain dicts ({"role", "content"}) so session state stays cheap to copy and
+# AppTest can read them. Consecutive system lines are collapsed into one message whose
+# "steps" list holds every line and whose "content" is the latest one.
+
+
+def archive_path(session_id: str) -> str:
+    return os.path.join(ARCHIVE_DIR, f"{session_id}.jsonl")
+
+
+def append(messages: list, session_id: str, role: str, content: str) -> int:
+    """Adds a message, spilling the oldest ones to the archive when the list is full; returns how many were spilled."""
+    if role == "system" and messages and messages[-1]["role"] == "system":
+        last = messages[-1]
+        steps = last.setdefault("steps", [last["content"]])
+        if steps[-1].startswith("⏳"):
+            steps.pop() # A "Starting ..." status is replaced by the line that reports its outcome
+        steps.append(content)
+        last["content"] = content
+    else:
+        messages.append({"role": role, "content": content})
+
+    if len(messages) <= MAX_LIVE_MESSAGES:
+        return 0
+    spill_count = min(len(messages) - 1, len(messages) - MAX_LIVE_MESSAGES + SPILL_BATCH)
+    try:
+        os.makedirs(ARCHIVE_DIR, exist_ok=True)
+        with open(archive_path(session_id), "a", encoding="utf-8") as f:
+            for message in messages[:spill_count]:
+                f.write(json.dumps(message) + "\n")
+    except OSError:
+        return 0 # Keep everything in memory rather than lose messages
+    del messages[:spill_count]
+    return spill_count
+
+
+def read_archive(session_id: str, count: int) -> list:
+    """Returns the `count` most recently archived messages, oldest first."""
+    try:
+        with open(archive_path(session_id), "r", encoding="utf-8") as f:
+            lines = deque(f, maxlen=count)
+    except FileNotFoundError:
+        return []
+    return [json.loads(line) for line in lines]
+
+
+def prune_archives(ttl_days: float = ARCHIVE_TTL_DAYS) -> int:
+    """Deletes archives of sessions that have not written anything for `ttl_days`."""
+    if not os.path.isdir(ARCHIVE_DIR):
+        return 0
+    cutoff = time.time() - ttl_days * 86400
+    removed = 0
+    for name in os.listdir(ARCHIVE_DIR):
+        path = os.path.join(ARCHIVE_DIR, name)
+        try:
+            if name.endswith(".jsonl") and os.path.getmtime(path) < cutoff:
+                os.remove(path)
+                removed += 1
+        except OSError:
+            continue
+    return removed
@@ -0,0 +1,154 @@
+import re
+from collections import namedtuple
+from functools import lru_cache
+
+# --- Configuration ---
+# Other names the model may use for a disliked ingredient; a dislike of the key also covers these.
+SYNONYMS = {
+    "cilantro": ["coriander"],
+    "coriander": ["cilantro"],
+    "scallion": ["green onion", "spring onion"],
+    "green onion": ["scallion", "spring onion"],
+    "bell pepper": ["capsicum", "sweet pepper"],
+    "eggplant": ["aubergine"],
+    "zucchini": ["courgette"],
+    "shrimp": ["prawn"],
+    "chickpea": ["garbanzo bean", "garbanzo"],
+    "ground beef": ["minced beef", "beef mince"],
+    "dairy": ["milk", "cheese", "butter", "cream", "yogurt", "yoghurt"],
+    "nut": ["peanut", "almond", "cashew", "walnut", "pecan", "pistachio", "hazelnut"],
+    "shellfish": ["shrimp", "prawn", "crab", "lobster", "clam", "mussel", "oyster", "scallop"],
+    "pork": ["bacon", "ham", "sausage", "chorizo", "prosciutto"],
+}
+# Dairy words that also name plant-based products ("peanut butter", "coconut milk"); after one of
+# PLANT_QUALIFIERS they are not dairy, so a dislike of dairy (or of milk, butter...) skips them
+PLANT_BASED = {"milk", "butter", "cream", "cheese", "yogurt", "yoghurt"}
+PLANT_QUALIFIERS = ["peanut", "almond", "cashew", "coconut", "oat", "soy", "rice", "hemp", "nut", "apple", "cocoa", "vegan"]
+OES_PLURALS = {"potato", "tomato", "mango"}  # Words ending in "o" whose plural takes "es"; the rest just take "s"
+
+Violation = namedtuple("Violation", ["kind", "term", "found"])  # kind: "disliked" or "repeat_title"
+
+# --- Term Normalization ---
+
+def normalize(text: str) -> str:
+    text = text.lower().replace("’", "'")
+    return re.sub(r"\s+", " ", re.sub(r"[^a-z0-9' ]+", " ", text)).strip()
+
+
+def singular(word: str) -> str:
+    if word.endswith("ies") and len(word) > 4:
+        return word[:-3] + "y"
+    if word.endswith(("oes", "ches", "shes", "sses", "xes")):
+        return word[:-2]
+    if word.endswith("s") and not word.endswith("ss") and len(word) > 3:
+        return word[:-1]
+    return word
+
+
+def variants(term: str) -> set:
+    """Singular, plural and synonym spellings of one disliked term (the last word is the one inflected)."""
+    base = " ".join(singular(w) for w in normalize(term).split())
+    if not base:
+        return set()
+    forms = {base}
+    for synonym in SYNONYMS.get(base, []):
+        forms.add(normalize(synonym))
+    inflected = set()
+    for form in forms:
+        head, _, last = form.rpartition(" ")
+        prefix = f"{head} " if head else ""
+        inflected.add(form)
+        if last.endswith("y") and last[-2:-1] not in "aeiou":
+            inflected.add(f"{prefix}{last[:-1]}ies")
+        elif last.endswith(("ch", "sh", "s", "x")) or last in OES_PLURALS:
+            inflected.add(f"{prefix}{last}es")
+        inflected.add(f"{prefix}{last}s")
+    return inflected
+
+# --- Precompiled Matcher (Rebuilt only when the dislike list changes) ---
+
+@lru_cache(maxsize=32)
+def dislike_matcher(terms: tuple):
+    """Returns (compiled regex, variant -> disliked term) for a tuple of disliked terms."""
+    owner = {}
+    for term in terms:
+        for form in variants(term):
+            owner.setdefault(form, term)
+    if not owner:
+        return None, owner
+    # Longest first so "green onions" wins over "onions"
+    alternation = "|".join(_plant_guard(form) + re.escape(form) for form in sorted(owner, key=len, reverse=True))
+    return re.compile(rf"\b(?:{alternation})\b"), owner
+
+
+def _plant_guard(form: str) -> str:
+    """Lookbehinds that stop a dairy word from matching inside a plant-based name like "coconut milk"."""
+    if singular(form) not in PLANT_BASED:
+        return ""
+    return "".join(f"(?<!{re.escape(qualifier)} )" for qualifier in PLANT_QUALIFIERS)
+
+
+def ingredient_section(recipe_markdown: str) -> str:
+    """The ingredient list of a recipe in the agent's template, or the whole text if it is missing."""
+    match = re.search(r"###\s*\*\*Ingredients.*?\*\*(.*?)(?:\n###|\Z)", recipe_markdown, re.DOTALL | re.IGNORECASE)
+    return match.group(1) if match else recipe_markdown
+
+# --- Validation ---
+
+def find_violations(recipe_markdown: str, title: str, disliked: list, history: list, user_input: str = "") -> list:
+    """Checks a generated recipe against the dislike list and meal history; returns the violations found."""
+    violations = []
+    requested = normalize(user_input)
+    # Dislikes the user explicitly asked for in this request are allowed (same rule as the prompt)
+    active = tuple(sorted(t for t in disliked if t and not (variants(t) & set(_phrases(requested)))))
+    matcher, owner = dislike_matcher(active)
+    if matcher:
+        seen = set()
+        for match in matcher.finditer(normalize(ingredient_section(recipe_markdown))):
+            term = owner[match.group(0)]
+            if term not in seen:
+                seen.add(term)
+                violations.append(Violation("disliked", term, match.group(0)))
+
+    normalized_title = normalize(title)
+    for previous in history:
+        if normalized_title and normalize(previous) == normalized_title:
+            violations.append(Violation("repeat_title", previous, title))
+            break
+    return violations
+
+
+def describe(violations: list) -> str:
+    """'mushrooms, the name 'Fried Rice'' for a user-facing message."""
+    return ", ".join(v.found if v.kind == "disliked" else f"the name '{v.found}'" for v in violations)
+
+
+def resolved(violations: list, remaining: list) -> list:
+    """The violations that a repair removed (those not found again in the repaired recipe)."""
+    left = {(v.kind, v.term) for v in remaining}
+    return [v for v in violations if (v.kind, v.term) not in left]
+
+
+def _phrases(text: str, max_words: int = 3):
+    """Every 1..max_words word phrase of a normalized text."""
+    words = text.split()
+    for n in range(1, max_words + 1):
+        for i in range(len(words) - n + 1):
+            yield " ".join(words[i:i + n])
+
+
+def build_repair_prompt(recipe_markdown: str, action_block: str, violations: list) -> str:
+    """A targeted edit request: fix only what broke the rules and keep the rest of the answer as it is."""
+    fixes = []
+    for violation in violations:
+        if violation.kind == "disliked":
+            fixes.append(f"- Replace {violation.found} (the user dislikes {violation.term}) with a suitable common ingredient and adjust the steps that use it.")
+        else:
+            fixes.append(f"- Rename the dish: the user recently cooked '{violation.term}'. Use a new plain text name everywhere it appears, including the [ACTIONS] block.")
+    return (
+        "You are Chef Remy. Edit the recipe and action plan below. Make ONLY these changes:\n"
+        + "\n".join(fixes)
+        + "\n\nKeep every other line, the template formatting and the [ACTIONS] block exactly as they are. "
+        "Reply with the full edited recipe followed by the [ACTIONS] block and NO other commentary.\n\n"
+        f"{recipe_markdown}\n\n[ACTIONS]\n{action_block}"
+    )
@@ -0,0 +1,118 @@
+import re
+from collections import namedtuple
+
+# --- Intents ---
+# Everything that is not a recipe request is answered locally; only GENERATE reaches the LLM.
+
+GENERATE = "generate"
+DISLIKE = "dislike"
+SHOW_RECIPES = "show_recipes"
+HISTORY = "history"
+SCHEDULE = "schedule"
+DELETE = "delete"
+SCALE = "scale"
+
+Intent = namedtuple("Intent", ["name", "argument"])
+
+# --- Precompiled Matchers (Built once at import, shared by every rerun and session) ---
+
+# Greetings and politeness in front of a command ("hey chef, can you please ...")
+_LEAD_IN = r"(?:(?:hey|hi|ok|okay)(?:\s+(?:chef|remy))?[,!]?\s+)?(?:(?:can|could|would)\s+you\s+|please\s+)*"
+_END = r"[\s?.!]*"
+
+_PATTERNS = [
+    (DISLIKE, r"(?:i\s+(?:really\s+)?(?:do\s+not|don't|dont)\s+(?:like|want|eat)|i\s+(?:really\s+)?(?:hate|dislike|can't\s+stand)"
+              r"|avoid|exclude|no\s+more)\s+(?P<arg>.+?)"),
+    (DELETE, r"(?:delete|remove|get\s+rid\s+of|forget)\s+(?:the\s+|my\s+)?(?P<arg>.+?)(?P<recipe>\s+recipe)?"),
+    (SCALE, r"(?:(?:make|scale|resize|change|adjust|redo)(?:\s+(?:it|that|this|the\s+(?:last\s+)?recipe))?(?:\s+(?:for|to))?\s+(?P<arg>\w+)"
+            r"|(?:now\s+)?for\s+(?P<arg2>\w+)(?:\s+(?:people|persons|servings|portions))?\s+instead"
+            r"|(?P<arg3>double|triple|halve)\s+(?:it|that|this|the\s+(?:last\s+)?recipe))"
+            r"(?:\s+(?:people|persons|servings?|portions?))?(?:\s+(?:please|instead))?"),
+    (SHOW_RECIPES, r"(?:(?:show|list|open|view|see)\s+(?:me\s+)?(?:all\s+)?(?:of\s+)?(?:my\s+|the\s+)?(?:saved\s+)?recipes(?:\s+book)?"
+                   r"|(?:open\s+)?(?:my\s+)?recipe\s+book|what\s+recipes\s+(?:do\s+i\s+have|have\s+i\s+saved)|my\s+saved\s+recipes)"),
+    (HISTORY, r"(?:what\s+(?:did|have)\s+i\s+(?:cook|cooked|make|made|eat|eaten)|what\s+have\s+i\s+been\s+(?:cooking|eating)"
+              r"|(?:show\s+(?:me\s+)?)?(?:my\s+)?(?:meal|cooking)\s+history|(?:show\s+(?:me\s+)?)?(?:my\s+)?recently\s+cooked(?:\s+meals)?)"
+              r"(?P<arg>\s+.*?)?"),
+    (SCHEDULE, r"(?:(?:show|list)\s+(?:me\s+)?(?:my\s+)?(?:schedule|reminders|calendar|scheduled\s+(?:events|actions))"
+               r"|what(?:'s|\s+is)\s+(?:on\s+)?(?:my\s+)?(?:schedule|calendar)|what(?:'s|\s+is)\s+scheduled|my\s+(?:schedule|reminders))"),
+]
+_MATCHERS = [(name, re.compile(f"{_LEAD_IN}(?:{pattern}){_END}")) for name, pattern in _PATTERNS]
+
+# Words that make a message a recipe request even if it starts like a local command
+_GENERATION_CUES = re.compile(r"\b(?:make|cook\s+(?:me|us|something)|generate|suggest|create|recipe\s+for|instead|breakfast|lunch|dinner|servings?|i\s+have)\b")
+
+# Context around a dislike that is not part of the ingredient ("... in my food anymore")
+_DISLIKE_TRAILER = re.compile(r"(?:\s+(?:in|on|with)\s+(?:my|the|any)\s+(?:food|meals?|dishes|recipes?))?(?:\s+(?:anymore|any\s+more|at\s+all|please))*$")
+_ITEM_SPLIT = re.compile(r"\s*(?:,|&|/|\band\b|\bor\b)\s*")
+_ARTICLES = re.compile(r"^(?:the|any|some|all|more)\s+")
+_NUMBER_WORDS = {"one": 1, "two": 2, "three": 3, "four": 4, "five": 5, "six": 6, "seven": 7, "eight": 8}
+_MULTIPLIERS = {"double": 2.0, "triple": 3.0, "halve": 0.5}
+# "remove the onions from the recipe" edits a recipe rather than deleting one
+_EDIT_CUES = re.compile(r"\b(?:from|in|out\s+of|off)\b")
+
+
+def normalize(text: str) -> str:
+    """Lowercases, straightens quotes and collapses whitespace."""
+    text = text.lower().replace("’", "'").replace("‘", "'")
+    return re.sub(r"\s+", " ", text).strip()
+
+
+def split_items(text: str) -> list[str]:
+    """Splits 'mushrooms, olives and blue cheese' into ['mushrooms', 'olives', 'blue cheese']."""
+    items = []
+    for item in _ITEM_SPLIT.split(text):
+        item = _ARTICLES.sub("", item.strip(" .!?'\""))
+        if item and len(item.split()) <= 4: # Longer fragments are sentences, not ingredients
+            items.append(item)
+    return items
+
+
+def parse_servings_target(argument: str):
+    """'4' or 'four' -> 4; 'double' -> 2.0 (a multiplier, as a float); None if it is not a count."""
+    if argument in _MULTIPLIERS:
+        return _MULTIPLIERS[argument]
+    if argument.isdigit():
+        return int(argument)
+    return _NUMBER_WORDS.get(argument)
+
+
+def match_titles(target: str, titles) -> list:
+    """The titles that contain every word of `target` ('fried rice' matches 'Quick Egg Fried Rice')."""
+    wanted = set(normalize(target).split())
+    return [title for title in titles if wanted and wanted <= set(normalize(title).split())]
+
+
+def classify(text: str, titles=()) -> Intent:
+    """
+    Routes a chat message to a local intent, or GENERATE when it needs the LLM.
+
+    `titles` are the user's saved recipe titles: "delete X" is only a DELETE when X matches
+    one of them or the message says "recipe", so "remove the onions" or "forget it" still
+    reach the LLM.
+    """
+    normalized = normalize(text)
+    for name, matcher in _MATCHERS:
+        match = matcher.fullmatch(normalized)
+        if not match:
+            continue
+        groups = match.groupdict()
+        argument = (groups.get("arg") or groups.get("arg2") or groups.get("arg3") or "").strip()
+        if name == DISLIKE:
+            argument = _DISLIKE_TRAILER.sub("", argument)
+        if argument and _GENERATION_CUES.search(argument):
+            break # e.g. "I don't want rice, make pasta instead" is a recipe request
+        if name == SCALE:
+            target = parse_servings_target(argument)
+            if not target:
+                break
+            return Intent(SCALE, target)
+        if name == DISLIKE:
+            items = split_items(argument)
+            if not items:
+                break
+            return Intent(DISLIKE, items)
+        if name == DELETE:
+            if _EDIT_CUES.search(argument) or not (groups.get("recipe") or match_titles(argument, titles)):
+                break
+        return Intent(name, argument)
+    return Intent(GENERATE, text)
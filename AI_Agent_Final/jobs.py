@@ -0,0 +1,129 @@
+import os
+import time
+import uuid
+import threading
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+
+import metrics
+
+# --- Configuration ---
+MAX_WORKERS = int(os.environ.get("CHEF_JOB_WORKERS", 4))  # Generation jobs running at once across all sessions
+JOB_TTL_SECONDS = 3600  # Finished jobs nobody picked up (closed tabs) are dropped after this long
+
+QUEUED, RUNNING, DONE, FAILED, CANCELLED = "queued", "running", "done", "failed", "cancelled"
+
+# --- Background Job Registry ---
+# Lives at module level so jobs outlive the Streamlit rerun that submitted them and a
+# session can pick up its results on a later rerun.
+
+_lock = threading.Lock()
+_jobs = {}  # job id -> Job
+_executor = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix="chef-job")
+_current_job = contextvars.ContextVar("current_job", default=None)
+
+
+class Job:
+    """One unit of background work (e.g. a recipe generation) and, once finished, its result."""
+    def __init__(self, owner: str, label: str):
+        self.job_id = uuid.uuid4().hex[:12]
+        self.owner = owner
+        self.label = label
+        self.status = QUEUED
+        self.submitted_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.result = None
+        self.error = None
+        self.notices = []  # Problems reported while running, shown to the user on pickup
+        self.trace_id = metrics.current_trace_id()  # The request that submitted the job; its worker and pickup traces reuse it
+        self.future = None
+
+    @property
+    def finished(self) -> bool:
+        return self.status in (DONE, FAILED, CANCELLED)
+
+    def elapsed(self) -> float:
+        """Seconds since submission (or until completion, once finished)."""
+        return (self.finished_at or time.time()) - self.submitted_at
+
+
+def _run(job: Job, func, args, kwargs):
+    with _lock:
+        if job.status == CANCELLED:
+            return
+        job.status = RUNNING
+        job.started_at = time.time()
+    metrics.record_duration("job_queue_wait", (job.started_at - job.submitted_at) * 1000)
+
+    token = _current_job.set(job)
+    try:
+        result = func(*args, **kwargs)
+        status, error = DONE, None
+    except Exception as e:
+        result, status, error = None, FAILED, f"{type(e).__name__}: {e}"
+        metrics.increment("jobs.failed")
+    finally:
+        _current_job.reset(token)
+
+    with _lock:
+        job.result = result
+        job.error = error
+        job.status = status
+        job.finished_at = time.time()
+
+
+def submit(owner: str, label: str, func, *args, **kwargs) -> str:
+    """Queues func(*args, **kwargs) on the worker pool and returns the job id."""
+    prune()
+    job = Job(owner, label)
+    with _lock:
+        _jobs[job.job_id] = job
+    job.future = _executor.submit(_run, job, func, args, kwargs)
+    metrics.increment("jobs.submitted")
+    return job.job_id
+
+
+def get(job_id: str):
+    with _lock:
+        return _jobs.get(job_id)
+
+
+def cancel(job_id: str) -> bool:
+    """Cancels a job that has not started yet; running jobs are left to finish."""
+    with _lock:
+        job = _jobs.get(job_id)
+        if job is None or job.status != QUEUED:
+            return False
+        job.status = CANCELLED
+        job.finished_at = time.time()
+    job.future.cancel()
+    return True
+
+
+def release(job_id: str) -> None:
+    """Forgets a finished job once its result has been picked up."""
+    with _lock:
+        _jobs.pop(job_id, None)
+
+
+def prune(ttl: float = JOB_TTL_SECONDS) -> None:
+    """Drops finished jobs whose results were never picked up."""
+    cutoff = time.time() - ttl
+    with _lock:
+        for job_id in [j for j, job in _jobs.items() if job.finished and job.finished_at < cutoff]:
+            del _jobs[job_id]
+
+
+def current():
+    """The job running on this thread, or None outside a job."""
+    return _current_job.get()
+
+
+def add_notice(level: str, message: str, log: tuple = None) -> bool:
+    """Attaches a user-facing notice to the job running on this thread; returns False outside a job."""
+    job = _current_job.get()
+    if job is None:
+        return False
+    job.notices.append({"level": level, "message": message, "log": log})
+    return True
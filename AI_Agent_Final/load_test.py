@@ -0,0 +1,184 @@
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import metrics
+
+APP_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "app.py")
+
+SAMPLE_PROMPTS = [
+    "I have chicken, soy sauce, rice, and eggs. Make a quick dinner for two.",
+    "Can you make a dinner with pasta, tomatoes, and cheese, and schedule me to start cooking at 6:45 PM?",
+    "I have leftover rice, eggs, and soy sauce. Make a quick dinner for one.",
+    "Black beans, tortillas and a lime. Something cheap for lunch please.",
+    "I only have potatoes, onions and butter. Make something warm for 3 people.",
+]
+
+# --- SIMULATED SESSION (Runs in a worker process) ---
+
+def _init_worker(work_dir: str, trace_file: str):
+    """Every worker runs sessions from the shared work dir and exports its traces to one JSONL file."""
+    os.chdir(work_dir)
+    metrics.METRICS_JSONL_FILE = trace_file
+    # Forked workers would otherwise share one seed and inject failures in lockstep
+    os.environ["GEMINI_MOCK_SEED"] = str(int(os.environ.get("GEMINI_MOCK_SEED", 0)) + os.getpid())
+
+
+def wait_for_jobs(at, timeout: float, poll_s: float = 0.05):
+    """Reruns the app until its background generation jobs are picked up (what the page's auto-refresh does)."""
+    deadline = time.perf_counter() + timeout
+    while at.session_state["pending_jobs"] and not at.exception:
+        if time.perf_counter() > deadline:
+            raise TimeoutError(f"jobs still pending after {timeout}s")
+        time.sleep(poll_s)
+        at.run()
+
+
+def run_session(session_id: int, turns: int, timeout: float) -> list[dict]:
+    """Drives one user session through the real app: prompt -> background API call -> parse -> execute, `turns` times."""
+    from streamlit.testing.v1 import AppTest
+
+    at = AppTest.from_file(APP_PATH, default_timeout=timeout)
+    at.run()
+    at.sidebar.checkbox(key="sidebar_confirm_scheduling").check().run() # Authorize actions like a real user would
+
+    results = []
+    for turn in range(turns):
+        prompt = f"{SAMPLE_PROMPTS[(session_id + turn) % len(SAMPLE_PROMPTS)]} (session {session_id}, turn {turn})"
+        message_count = len(at.session_state["messages"])
+        start = time.perf_counter()
+        try:
+            at.chat_input[0].set_value(prompt).run()
+            wait_for_jobs(at, timeout)
+            exception = at.exception[0].message if at.exception else None
+        except Exception as e:
+            exception = f"{type(e).__name__}: {e}"
+        latency = time.perf_counter() - start
+
+        new_messages = at.session_state["messages"][message_count:] if exception is None else []
+        recipe_served = any(m["content"].startswith("✨ **Your meal is served") for m in new_messages)
+        results.append({
+            "session": session_id,
+            "turn": turn,
+            "latency_s": latency,
+            "ok": exception is None and recipe_served,
+            "error": exception or (None if recipe_served else "no recipe generated"),
+        })
+    return results
+
+# --- REPORTING ---
+
+def summarize(results: list[dict], wall_time: float, trace_file: str) -> dict:
+    latencies = sorted(r["latency_s"] * 1000 for r in results)
+    ok = [r for r in results if r["ok"]]
+    errors = {}
+    for r in results:
+        if not r["ok"]:
+            errors[r["error"]] = errors.get(r["error"], 0) + 1
+
+    stages = {}
+    if os.path.exists(trace_file):
+        with open(trace_file, 'r', encoding="utf-8") as f:
+            for line in f:
+                try:
+                    trace = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                for span in trace["spans"]:
+                    stages.setdefault(span["stage"], []).append(span["duration_ms"])
+
+    return {
+        "turns": len(results),
+        "succeeded": len(ok),
+        "wall_time_s": round(wall_time, 2),
+        "throughput_turns_per_s": round(len(results) / wall_time, 2) if wall_time else 0.0,
+        "latency_ms": {
+            "p50": round(metrics.percentile(latencies, 50), 1),
+            "p95": round(metrics.percentile(latencies, 95), 1),
+            "p99": round(metrics.percentile(latencies, 99), 1),
+            "max": round(latencies[-1], 1) if latencies else 0.0,
+        },
+        "errors": errors,
+        "stages_ms": {
+            stage: {
+                "count": len(samples),
+                "p50": round(metrics.percentile(sorted(samples), 50), 1),
+                "p95": round(metrics.percentile(sorted(samples), 95), 1),
+                "p99": round(metrics.percentile(sorted(samples), 99), 1),
+            }
+            for stage, samples in sorted(stages.items())
+        },
+    }
+
+
+def print_report(report: dict):
+    print(f"\nTurns: {report['turns']} ({report['succeeded']} served a recipe) in {report['wall_time_s']}s "
+          f"-> {report['throughput_turns_per_s']} turns/s")
+    latency = report["latency_ms"]
+    print(f"Turn latency ms: p50={latency['p50']} p95={latency['p95']} p99={latency['p99']} max={latency['max']}")
+    for error, count in report["errors"].items():
+        print(f"  {count:>4} x {error}")
+    if report["stages_ms"]:
+        print(f"\n{'stage':<40} {'count':>6} {'p50':>9} {'p95':>9} {'p99':>9}")
+        for stage, values in report["stages_ms"].items():
+            print(f"{stage:<40} {values['count']:>6} {values['p50']:>9} {values['p95']:>9} {values['p99']:>9}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline load test: many concurrent simulated chat sessions against the mock Gemini API.")
+    parser.add_argument("--sessions", type=int, default=20)
+    parser.add_argument("--turns", type=int, default=3, help="chat turns per session")
+    parser.add_argument("--concurrency", type=int, default=4, help="sessions running at the same time (one process each)")
+    parser.add_argument("--latency-ms", type=float, default=800.0)
+    parser.add_argument("--latency-sigma", type=float, default=0.5)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--timeout", type=float, default=120.0, help="seconds allowed per app run")
+    parser.add_argument("--work-dir", default=None, help="where the app writes recipes/logs/memory (default: a temp dir)")
+    parser.add_argument("--output", default=None, help="optional path for the JSON report")
+    args = parser.parse_args()
+
+    # The app reads these at import time in every worker process
+    os.environ.update({
+        "GEMINI_MOCK": "1",
+        "GEMINI_MOCK_LATENCY_MS": str(args.latency_ms),
+        "GEMINI_MOCK_LATENCY_SIGMA": str(args.latency_sigma),
+        "GEMINI_MOCK_ERROR_RATE": str(args.error_rate),
+        "GEMINI_MOCK_429_RATE": str(args.rate_limit_rate),
+        "GEMINI_MOCK_SEED": str(args.seed),
+    })
+    work_dir = os.path.abspath(args.work_dir or tempfile.mkdtemp(prefix="chef_load_"))
+    os.makedirs(work_dir, exist_ok=True)
+    trace_file = os.path.join(work_dir, "traces.jsonl")
+    print(f"Running {args.sessions} session(s) x {args.turns} turn(s), concurrency {args.concurrency}, work dir {work_dir}")
+
+    # AppTest swaps sys.modules['__main__'] for the app inside the workers, so hand them functions
+    # by their importable module name rather than as __main__ attributes
+    import load_test
+
+    results = []
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=args.concurrency, initializer=load_test._init_worker, initargs=(work_dir, trace_file)) as pool:
+        futures = [pool.submit(load_test.run_session, i, args.turns, args.timeout) for i in range(args.sessions)]
+        for future in as_completed(futures):
+            try:
+                results.extend(future.result())
+            except Exception as e:
+                print(f"Session crashed: {e}", file=sys.stderr)
+    wall_time = time.perf_counter() - start
+
+    report = summarize(results, wall_time, trace_file)
+    print_report(report)
+    if args.output:
+        with open(args.output, 'w', encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nReport written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+import os
+import json
+import math
+import time
+import uuid
+import threading
+import contextvars
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime
+
+# --- Configuration ---
+METRICS_JSONL_FILE = os.environ.get("CHEF_METRICS_JSONL", "")  # Optional: append one line per finished trace
+MAX_SAMPLES_PER_STAGE = 5000  # Recent samples kept per stage for the percentile histograms
+
+# --- In-process Metrics Registry ---
+# Lives at module level so it survives Streamlit reruns and is shared by every session in the server process.
+
+_lock = threading.Lock()
+_durations = {}   # stage name -> deque of durations (ms)
+_counters = {}    # counter name -> running total
+_current_trace = contextvars.ContextVar("current_trace", default=None)
+
+
+def record_duration(stage: str, duration_ms: float) -> None:
+    """Adds one latency sample (milliseconds) to the stage's histogram."""
+    with _lock:
+        samples = _durations.get(stage)
+        if samples is None:
+            samples = _durations[stage] = deque(maxlen=MAX_SAMPLES_PER_STAGE)
+        samples.append(duration_ms)
+
+
+def increment(counter: str, value: float = 1) -> None:
+    """Adds to a running counter (token totals, error counts, ...)."""
+    with _lock:
+        _counters[counter] = _counters.get(counter, 0) + value
+
+
+def percentile(sorted_samples: list, pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_samples:
+        return 0.0
+    rank = max(0, min(len(sorted_samples) - 1, math.ceil(pct / 100.0 * len(sorted_samples)) - 1))
+    return sorted_samples[rank]
+
+
+def snapshot() -> dict:
+    """Returns per-stage p50/p95/p99 latencies plus all counters."""
+    with _lock:
+        durations = {stage: sorted(samples) for stage, samples in _durations.items()}
+        counters = dict(_counters)
+
+    stages = {}
+    for stage, samples in durations.items():
+        stages[stage] = {
+            "count": len(samples),
+            "p50_ms": round(percentile(samples, 50), 2),
+            "p95_ms": round(percentile(samples, 95), 2),
+            "p99_ms": round(percentile(samples, 99), 2),
+            "max_ms": round(samples[-1], 2) if samples else 0.0,
+        }
+    return {"stages": stages, "counters": counters}
+
+
+def reset() -> None:
+    """Clears all recorded samples and counters."""
+    with _lock:
+        _durations.clear()
+        _counters.clear()
+
+# --- Tracing ---
+
+class Trace:
+    """
+    One end-to-end request (e.g. a chat turn) and the spans recorded while it ran.
+
+    Work that continues elsewhere (a background job, its pickup on a later rerun) opens its own
+    trace with the same trace_id, so the exported parts of one request can be joined again.
+    """
+    def __init__(self, name: str, trace_id: str = None):
+        self.trace_id = trace_id or uuid.uuid4().hex[:12]
+        self.name = name
+        self.started_at = datetime.now().isoformat(timespec="milliseconds")
+        self.spans = []
+        self.tokens = {"prompt": 0, "response": 0, "total": 0}
+        self.duration_ms = 0.0
+
+    def to_dict(self) -> dict:
+        return {
+            "trace_id": self.trace_id,
+            "name": self.name,
+            "started_at": self.started_at,
+            "duration_ms": round(self.duration_ms, 2),
+            "tokens": self.tokens,
+            "spans": self.spans,
+        }
+
+
+def current_trace_id():
+    """The id of the trace active in this context, or None."""
+    current = _current_trace.get()
+    return current.trace_id if current is not None else None
+
+
+@contextmanager
+def trace(name: str, trace_id: str = None):
+    """Opens a trace (continuing `trace_id` if given); spans and token counts recorded inside it are attached to it."""
+    current = Trace(name, trace_id)
+    token = _current_trace.set(current)
+    start = time.perf_counter()
+    try:
+        yield current
+    finally:
+        current.duration_ms = (time.perf_counter() - start) * 1000
+        _current_trace.reset(token)
+        record_duration(name, current.duration_ms)
+        _export(current)
+
+
+@contextmanager
+def span(stage: str, **attributes):
+    """Times a pipeline stage, feeding its histogram and the active trace (if any)."""
+    start = time.perf_counter()
+    status = "ok"
+    try:
+        yield
+    except Exception:
+        status = "error"
+        increment(f"{stage}.errors")
+        raise
+    finally:
+        duration_ms = (time.perf_counter() - start) * 1000
+        record_duration(stage, duration_ms)
+        current = _current_trace.get()
+        if current is not None:
+            current.spans.append({"stage": stage, "duration_ms": round(duration_ms, 2), "status": status, **attributes})
+
+
+def record_usage(usage_metadata: dict) -> None:
+    """Records token counts from a generateContent response's usageMetadata block."""
+    if not usage_metadata:
+        return
+    prompt_tokens = usage_metadata.get("promptTokenCount", 0)
+    response_tokens = usage_metadata.get("candidatesTokenCount", 0)
+    total_tokens = usage_metadata.get("totalTokenCount", prompt_tokens + response_tokens)
+
+    increment("tokens.prompt", prompt_tokens)
+    increment("tokens.response", response_tokens)
+    increment("tokens.total", total_tokens)
+
+    current = _current_trace.get()
+    if current is not None:
+        current.tokens["prompt"] += prompt_tokens
+        current.tokens["response"] += response_tokens
+        current.tokens["total"] += total_tokens
+
+
+def _export(finished: Trace) -> None:
+    """Appends the finished trace to the JSONL file when CHEF_METRICS_JSONL is set."""
+    if not METRICS_JSONL_FILE:
+        return
+    try:
+        with _lock, open(METRICS_JSONL_FILE, "a", encoding="utf-8") as f:
+            f.write(json.dumps(finished.to_dict()) + "\n")
+    except OSError:
+        increment("metrics.export_errors")
@@ -0,0 +1,242 @@
+import os
+import sys
+import json
+import glob
+import time
+import random
+import hashlib
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# --- Configuration ---
+RECORDINGS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "mock_recordings")
+
+# --- MOCK RESPONSE (Same interface as app.APIResponse) ---
+
+class MockResponse:
+    """Mimics the fetch response object returned by custom_fetch."""
+    def __init__(self, data: bytes, status: int):
+        self.data = data
+        self.status = status
+
+    def json(self):
+        return json.loads(self.data.decode('utf-8'))
+
+
+def _error_body(code: int, status: str, message: str) -> dict:
+    return {"error": {"code": code, "message": message, "status": status}}
+
+# --- LOCAL GEMINI STAND-IN ---
+
+class MockGemini:
+    """
+    Replays recorded generateContent responses with injected latency and failures.
+
+    Latency is log-normal around `latency_ms` (sigma controls how heavy the slow tail is),
+    `error_rate` injects HTTP 500s and `rate_limit_rate` injects HTTP 429s. The same prompt
+    always replays the same recording, so caching behavior can be tested too.
+    Streamed responses arrive in `chunk_words`-word chunks, `chunk_ms` apart.
+    """
+    def __init__(self, recordings_dir: str = RECORDINGS_DIR, latency_ms: float = 800.0,
+                 latency_sigma: float = 0.5, error_rate: float = 0.0, rate_limit_rate: float = 0.0,
+                 seed: int = None, chunk_ms: float = 40.0, chunk_words: int = 8):
+        self.recordings = self._load_recordings(recordings_dir)
+        self.latency_ms = latency_ms
+        self.latency_sigma = latency_sigma
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.chunk_ms = chunk_ms
+        self.chunk_words = chunk_words
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.calls = 0
+
+    @classmethod
+    def from_env(cls):
+        """Builds a stand-in from GEMINI_MOCK_* environment variables."""
+        seed = os.environ.get("GEMINI_MOCK_SEED")
+        return cls(
+            recordings_dir=os.environ.get("GEMINI_MOCK_RECORDINGS", RECORDINGS_DIR),
+            latency_ms=float(os.environ.get("GEMINI_MOCK_LATENCY_MS", 800)),
+            latency_sigma=float(os.environ.get("GEMINI_MOCK_LATENCY_SIGMA", 0.5)),
+            error_rate=float(os.environ.get("GEMINI_MOCK_ERROR_RATE", 0.0)),
+            rate_limit_rate=float(os.environ.get("GEMINI_MOCK_429_RATE", 0.0)),
+            seed=int(seed) if seed else None,
+            chunk_ms=float(os.environ.get("GEMINI_MOCK_CHUNK_MS", 40)),
+        )
+
+    @staticmethod
+    def _load_recordings(recordings_dir: str) -> list[dict]:
+        recordings = []
+        for path in sorted(glob.glob(os.path.join(recordings_dir, "*.json"))):
+            with open(path, 'r', encoding="utf-8") as f:
+                recordings.append(json.load(f))
+        if not recordings:
+            raise FileNotFoundError(f"No recorded responses (*.json) found in '{recordings_dir}'.")
+        return recordings
+
+    def respond(self, payload: dict, cancel: threading.Event = None) -> tuple[int, dict]:
+        """
+        Returns (HTTP status, JSON body) for one generateContent request, after the simulated delay.
+        
+        Setting `cancel` during the delay (e.g. when a hedged twin already answered) ends it early.
+        """
+        with self._lock:
+            self.calls += 1
+            delay_ms = self.latency_ms * self._random.lognormvariate(0, self.latency_sigma) if self.latency_ms > 0 else 0
+            roll = self._random.random()
+
+        if cancel is not None:
+            if cancel.wait(delay_ms / 1000.0):
+                return 499, _error_body(499, "CANCELLED", "The request was cancelled by the client. [mock]")
+        else:
+            time.sleep(delay_ms / 1000.0)
+
+        if roll < self.rate_limit_rate:
+            return 429, _error_body(429, "RESOURCE_EXHAUSTED", "Resource has been exhausted (e.g. check quota). [mock]")
+        if roll < self.rate_limit_rate + self.error_rate:
+            return 500, _error_body(500, "INTERNAL", "An internal error has occurred. [mock]")
+
+        prompt = "".join(
+            part.get("text", "")
+            for content in payload.get("contents", [])
+            for part in content.get("parts", [])
+        )
+        index = int(hashlib.sha1(prompt.encode('utf-8')).hexdigest(), 16) % len(self.recordings)
+        return 200, self.recordings[index]
+
+    def stream_chunks(self, body: dict):
+        """Splits a recorded response into streamGenerateContent chunks; the last one carries usage and finish reason."""
+        candidate = body.get("candidates", [{}])[0]
+        text = "".join(part.get("text", "") for part in candidate.get("content", {}).get("parts", []))
+        words = text.split(" ")
+        pieces = [" ".join(words[i:i + self.chunk_words]) for i in range(0, len(words), self.chunk_words)]
+        for index, piece in enumerate(pieces):
+            last = index == len(pieces) - 1
+            chunk = {"candidates": [{"content": {"role": "model", "parts": [{"text": piece if last else piece + " "}]}, "index": 0}]}
+            if last:
+                chunk["candidates"][0]["finishReason"] = candidate.get("finishReason", "STOP")
+                chunk["usageMetadata"] = body.get("usageMetadata", {})
+            yield chunk
+
+    def fetch(self, url: str, options: dict) -> MockResponse:
+        """Drop-in replacement for app.custom_fetch (usable as the `__fetch` override)."""
+        status, body = self.respond(json.loads(options.get('body') or "{}"), options.get('cancel'))
+        return MockResponse(json.dumps(body).encode('utf-8'), status)
+
+    __call__ = fetch
+
+_shared = None
+_shared_lock = threading.Lock()
+
+
+def shared_from_env() -> MockGemini:
+    """Process-wide stand-in, so Streamlit reruns and sessions share one RNG and call counter."""
+    global _shared
+    with _shared_lock:
+        if _shared is None:
+            _shared = MockGemini.from_env()
+        return _shared
+
+# --- RECORDING REAL RESPONSES ---
+
+def recording_fetch(fetch_func, recordings_dir: str = RECORDINGS_DIR):
+    """Wraps a fetch function so every successful response body is saved as a new recording."""
+    os.makedirs(recordings_dir, exist_ok=True)
+
+    def _fetch(url, options):
+        response = fetch_func(url, options)
+        if response and response.status == 200:
+            digest = hashlib.sha1(response.data).hexdigest()[:12]
+            with open(os.path.join(recordings_dir, f"recorded_{digest}.json"), 'wb') as f:
+                f.write(response.data)
+        return response
+
+    return _fetch
+
+# --- LOCAL HTTP SERVER (For the google-genai SDK in the Assistant app) ---
+
+def make_handler(mock: MockGemini):
+    class GenerateContentHandler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            streaming = ":streamGenerateContent" in self.path
+            if ":generateContent" not in self.path and not streaming:
+                self._send(404, _error_body(404, "NOT_FOUND", f"Unsupported path {self.path} [mock]"))
+                return
+            length = int(self.headers.get('Content-Length', 0))
+            try:
+                payload = json.loads(self.rfile.read(length) or b"{}")
+            except json.JSONDecodeError:
+                self._send(400, _error_body(400, "INVALID_ARGUMENT", "Request body is not JSON. [mock]"))
+                return
+            status, body = mock.respond(payload) # The simulated latency is the time to the first chunk
+            if streaming and status == 200:
+                self._stream(body)
+            else:
+                self._send(status, body)
+
+        def _stream(self, body: dict):
+            """Server-sent events, as the SDK requests with ?alt=sse."""
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/event-stream')
+            self.end_headers()
+            try:
+                for index, chunk in enumerate(mock.stream_chunks(body)):
+                    if index:
+                        time.sleep(mock.chunk_ms / 1000.0)
+                    self.wfile.write(f"data: {json.dumps(chunk)}\r\n\r\n".encode('utf-8'))
+                    self.wfile.flush()
+            except (BrokenPipeError, ConnectionResetError):
+                pass # The client cancelled the stream
+            self.close_connection = True
+
+        def _send(self, status: int, body: dict):
+            data = json.dumps(body).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, format, *args):
+            pass  # Keep the console quiet under load
+
+    return GenerateContentHandler
+
+
+def serve(mock: MockGemini, host: str = "127.0.0.1", port: int = 8765) -> ThreadingHTTPServer:
+    """Starts the mock generateContent endpoint on a background thread and returns the server."""
+    server = ThreadingHTTPServer((host, port), make_handler(mock))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local Gemini generateContent stand-in that replays recorded responses.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--recordings", default=RECORDINGS_DIR)
+    parser.add_argument("--latency-ms", type=float, default=800.0, help="median simulated latency")
+    parser.add_argument("--latency-sigma", type=float, default=0.5, help="log-normal spread; larger means a heavier slow tail")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests answered with HTTP 500")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="fraction of requests answered with HTTP 429")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--chunk-ms", type=float, default=40.0, help="delay between streamed chunks")
+    args = parser.parse_args()
+
+    mock = MockGemini(args.recordings, args.latency_ms, args.latency_sigma, args.error_rate, args.rate_limit_rate, args.seed, args.chunk_ms)
+    server = serve(mock, args.host, args.port)
+    print(f"Mock Gemini listening on http://{args.host}:{args.port} with {len(mock.recordings)} recording(s).")
+    print(f"Agent:     set GEMINI_API_BASE=http://{args.host}:{args.port}")
+    print(f"Assistant: set GEMINI_API_BASE=http://{args.host}:{args.port} and any GEMINI_API_KEY")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+        sys.exit(0)
+
+
+if __name__ == "__main__":
+    main()
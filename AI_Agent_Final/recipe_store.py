@@ -0,0 +1,309 @@
+import os
+import re
+import json
+import gzip
+import zlib
+import random
+import hashlib
+import threading
+from collections import namedtuple
+from contextlib import contextmanager
+from datetime import datetime
+
+import shared_state
+
+try:
+    import zstandard  # Optional: smaller and faster than gzip when installed
+except ImportError:
+    zstandard = None
+
+# --- Configuration ---
+STORE_DIR = "recipe_store"  # objects/<2 hex>/<sha256>.<codec> plus index.json; other users' stores live in users/<namespace>/
+NUM_PERMUTATIONS = 64  # MinHash signature length
+LSH_BANDS = 16  # 16 bands of 4 rows: pairs above ~50% similarity become candidates
+SHINGLE_WORDS = 3
+NEAR_DUPLICATE_THRESHOLD = 0.8  # Estimated Jaccard similarity above which a body is stored as a delta
+
+SaveResult = namedtuple("SaveResult", ["slug", "title", "digest", "version", "status", "similar_to", "similarity", "stored_bytes"])
+# status: "new" (body stored whole), "near_duplicate" (stored as a delta), "existing" (body already stored), "unchanged" (same as latest version)
+
+_MERSENNE = (1 << 61) - 1
+_rng = random.Random(4680) # Fixed seed: signatures must stay comparable across processes and restarts
+_PERMUTATIONS = [(_rng.randrange(1, _MERSENNE), _rng.randrange(0, _MERSENNE)) for _ in range(NUM_PERMUTATIONS)]
+_SECTION = re.compile(r"###\s*\*\*(?:Ingredients|Instructions)[^\n]*\n(.*?)(?=\n###|\Z)", re.DOTALL | re.IGNORECASE)
+
+# --- Helpers ---
+
+
+def slugify(title: str) -> str:
+    """Same naming as the old saved_recipes/<Title>.md files, so existing links and titles carry over."""
+    illegal_chars = r'[<>:"/\\|?*\'`]'
+    return re.sub(illegal_chars, '', title).replace(' ', '_').replace('**', '').replace('__', '')
+
+
+def normalize_body(content: str) -> str:
+    return "\n".join(line.rstrip() for line in content.strip().replace("\r\n", "\n").split("\n")) + "\n"
+
+
+def shingles(content: str) -> set:
+    """Word 3-grams of the ingredient and step text (the title, servings and tip are ignored)."""
+    text = " ".join(_SECTION.findall(content)) or content
+    words = re.findall(r"[a-z0-9]+", text.lower())
+    if len(words) < SHINGLE_WORDS:
+        return {" ".join(words)} if words else set()
+    return {" ".join(words[i:i + SHINGLE_WORDS]) for i in range(len(words) - SHINGLE_WORDS + 1)}
+
+
+def minhash(content: str) -> list:
+    hashes = [int.from_bytes(hashlib.blake2b(s.encode("utf-8"), digest_size=8).digest(), "big") for s in shingles(content)]
+    if not hashes:
+        return [0] * NUM_PERMUTATIONS
+    return [min((a * h + b) % _MERSENNE for h in hashes) for a, b in _PERMUTATIONS]
+
+
+def similarity(signature_a: list, signature_b: list) -> float:
+    """Estimated Jaccard similarity of two MinHash signatures."""
+    return sum(1 for a, b in zip(signature_a, signature_b) if a == b) / NUM_PERMUTATIONS
+
+
+def _bands(signature: list):
+    rows = NUM_PERMUTATIONS // LSH_BANDS
+    for band in range(LSH_BANDS):
+        yield band, tuple(signature[band * rows:(band + 1) * rows])
+
+# --- Content-Addressed Store ---
+
+
+class RecipeStore:
+    """
+    Keeps each distinct recipe body once, compressed and named by its SHA-256.
+
+    Titles point at a list of versions (body hashes), so saving a recipe again adds a version
+    instead of overwriting it. A body whose ingredients and steps are a near duplicate of one
+    already stored (found through MinHash + LSH buckets, so only likely matches are compared)
+    is stored as a zlib delta against it, which keeps regenerated variations of a dish to a
+    few hundred bytes.
+
+    Several server processes may share a store: changes are made under a file lock on the
+    index, after reloading it if another process wrote it, and reads pick up a changed index.
+    """
+    def __init__(self, root: str = STORE_DIR):
+        self.root = root
+        self.index_path = os.path.join(root, "index.json")
+        self._lock = threading.RLock()
+        self._index = {"recipes": {}, "objects": {}}
+        self._index_stamp = None
+        self._buckets = {}
+        self._refresh_index()
+
+    # --- Index ---
+
+    def _refresh_index(self) -> None:
+        """Reloads the index (and LSH buckets) if it changed on disk since it was last read."""
+        try:
+            stat = os.stat(self.index_path)
+            stamp = (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+        except FileNotFoundError:
+            stamp = None
+        with self._lock:
+            if stamp == self._index_stamp:
+                return
+            try:
+                with open(self.index_path, "r", encoding="utf-8") as f:
+                    self._index = json.load(f)
+            except FileNotFoundError:
+                self._index = {"recipes": {}, "objects": {}}
+            self._index_stamp = stamp
+            self._buckets = {}
+            for digest, info in self._index["objects"].items():
+                self._add_to_buckets(digest, info["minhash"])
+
+    @contextmanager
+    def _writing(self):
+        """Serializes a change across threads and processes, starting from the latest index."""
+        os.makedirs(self.root, exist_ok=True)
+        with self._lock, shared_state.file_lock(self.index_path):
+            self._refresh_index()
+            yield
+
+    def _save_index(self) -> None:
+        os.makedirs(self.root, exist_ok=True)
+        tmp_path = f"{self.index_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self._index, f)
+        os.replace(tmp_path, self.index_path) # Readers never see a half-written index
+        stat = os.stat(self.index_path)
+        self._index_stamp = (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+
+    def _add_to_buckets(self, digest: str, signature: list) -> None:
+        for key in _bands(signature):
+            self._buckets.setdefault(key, set()).add(digest)
+
+    def _find_similar(self, signature: list):
+        candidates = set()
+        for key in _bands(signature):
+            candidates |= self._buckets.get(key, set())
+        best, best_score = None, 0.0
+        for digest in candidates:
+            score = similarity(signature, self._index["objects"][digest]["minhash"])
+            if score > best_score:
+                best, best_score = digest, score
+        return best, best_score
+
+    # --- Objects ---
+
+    def _object_path(self, digest: str, codec: str) -> str:
+        return os.path.join(self.root, "objects", digest[:2], f"{digest}.{codec}")
+
+    def _write_object(self, digest: str, body: str, base: str = None) -> tuple:
+        """Returns (codec, stored bytes)."""
+        data = body.encode("utf-8")
+        if base:
+            codec = "delta"
+            compressor = zlib.compressobj(level=9, zdict=self.read_body(base).encode("utf-8"))
+            payload = compressor.compress(data) + compressor.flush()
+        elif zstandard is not None:
+            codec = "zst"
+            payload = zstandard.ZstdCompressor(level=10).compress(data)
+        else:
+            codec = "gz"
+            payload = gzip.compress(data, compresslevel=9, mtime=0)
+        path = self._object_path(digest, codec)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(payload)
+        os.replace(tmp_path, path)
+        return codec, len(payload)
+
+    def read_body(self, digest: str) -> str:
+        info = self._index["objects"][digest]
+        with open(self._object_path(digest, info["codec"]), "rb") as f:
+            payload = f.read()
+        if info["codec"] == "delta":
+            decompressor = zlib.decompressobj(zdict=self.read_body(info["base"]).encode("utf-8"))
+            data = decompressor.decompress(payload) + decompressor.flush()
+        elif info["codec"] == "zst":
+            data = zstandard.ZstdDecompressor().decompress(payload)
+        else:
+            data = gzip.decompress(payload)
+        return data.decode("utf-8")
+
+    # --- Recipes ---
+
+    def save(self, title: str, content: str) -> SaveResult:
+        """Adds `content` as the newest version of `title`; the body is only written if it is new."""
+        slug = slugify(title)
+        body = normalize_body(content)
+        digest = hashlib.sha256(body.encode("utf-8")).hexdigest()
+        with self._writing():
+            recipe = self._index["recipes"].setdefault(slug, {"title": title, "versions": []})
+            versions = recipe["versions"]
+            if versions and versions[-1]["hash"] == digest:
+                return SaveResult(slug, recipe["title"], digest, len(versions), "unchanged", None, 1.0, 0)
+
+            similar_to, score, stored_bytes = None, 0.0, 0
+            if digest in self._index["objects"]:
+                status = "existing"
+            else:
+                signature = minhash(body)
+                similar_to, score = self._find_similar(signature)
+                base = similar_to if score >= NEAR_DUPLICATE_THRESHOLD else None
+                # Keep delta chains one level deep, so reading a body never decompresses more than two objects
+                if base and self._index["objects"][base].get("base"):
+                    base = self._index["objects"][base]["base"]
+                codec, stored_bytes = self._write_object(digest, body, base)
+                self._index["objects"][digest] = {"codec": codec, "size": len(body), "stored": stored_bytes, "base": base, "minhash": signature}
+                self._add_to_buckets(digest, signature)
+                status = "near_duplicate" if base else "new"
+
+            versions.append({"hash": digest, "saved_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S")})
+            recipe["title"] = title
+            self._save_index()
+            similar_title = self._title_of(similar_to) if similar_to and score >= NEAR_DUPLICATE_THRESHOLD else None
+            return SaveResult(slug, title, digest, len(versions), status, similar_title, score, stored_bytes)
+
+    def _title_of(self, digest: str):
+        for recipe in self._index["recipes"].values():
+            if any(v["hash"] == digest for v in recipe["versions"]):
+                return recipe["title"]
+        return None
+
+    def list_recipes(self) -> list:
+        """(slug, title, latest hash, version count) for every saved recipe, sorted by slug."""
+        self._refresh_index()
+        with self._lock:
+            return [(slug, r["title"], r["versions"][-1]["hash"], len(r["versions"]))
+                    for slug, r in sorted(self._index["recipes"].items()) if r["versions"]]
+
+    def read(self, slug: str, version: int = None) -> str:
+        """The newest (or the given 1-based) version of a recipe; raises KeyError if it does not exist."""
+        self._refresh_index()
+        with self._lock:
+            versions = self._index["recipes"][slug]["versions"]
+            digest = versions[(version or len(versions)) - 1]["hash"]
+            return self.read_body(digest)
+
+    def delete(self, slug: str) -> bool:
+        """Removes a recipe and every version of it, then drops bodies no other recipe needs."""
+        with self._writing():
+            if self._index["recipes"].pop(slug, None) is None:
+                return False
+            self._collect_garbage()
+            self._save_index()
+            return True
+
+    def _collect_garbage(self) -> None:
+        objects = self._index["objects"]
+        live = {v["hash"] for r in self._index["recipes"].values() for v in r["versions"]}
+        live |= {objects[d]["base"] for d in live if d in objects and objects[d].get("base")}
+        for digest in [d for d in objects if d not in live]:
+            info = objects.pop(digest)
+            for key in _bands(info["minhash"]):
+                self._buckets.get(key, set()).discard(digest)
+            try:
+                os.remove(self._object_path(digest, info["codec"]))
+            except FileNotFoundError:
+                pass
+
+    def usage(self) -> dict:
+        """Totals for the recipe book caption: versions saved, distinct bodies, raw and stored bytes."""
+        self._refresh_index()
+        with self._lock:
+            objects = self._index["objects"].values()
+            return {
+                "recipes": len(self._index["recipes"]),
+                "versions": sum(len(r["versions"]) for r in self._index["recipes"].values()),
+                "bodies": len(self._index["objects"]),
+                "raw_bytes": sum(o["size"] for o in objects),
+                "stored_bytes": sum(o["stored"] for o in objects),
+            }
+
+    def import_legacy(self, directory: str) -> int:
+        """One-time import of old saved_recipes/*.md files; returns how many were imported."""
+        if self._index.get("legacy_imported") or not os.path.isdir(directory):
+            return 0
+        imported = 0
+        for name in sorted(os.listdir(directory)):
+            if name.endswith(".md"):
+                with open(os.path.join(directory, name), "r", encoding="utf-8") as f:
+                    self.save(name[:-3].replace("_", " "), f.read())
+                imported += 1
+        with self._writing():
+            self._index["legacy_imported"] = True # Recipes deleted later must not come back on the next start
+            self._save_index()
+        return imported
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def shared(user: str = shared_state.DEFAULT_USER) -> RecipeStore:
+    """The store of one user's namespace, shared by every session and rerun of this process."""
+    name = shared_state.namespace(user)
+    with _stores_lock:
+        if name not in _stores:
+            root = STORE_DIR if name == shared_state.DEFAULT_USER else os.path.join(STORE_DIR, "users", name)
+            _stores[name] = RecipeStore(root)
+        return _stores[name]
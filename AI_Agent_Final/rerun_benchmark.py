@@ -0,0 +1,132 @@
+import os
+import json
+import time
+import argparse
+import tempfile
+
+import metrics
+import mock_gemini
+from load_test import wait_for_jobs
+
+AGENT_APP = os.path.join(os.path.dirname(os.path.abspath(__file__)), "app.py")
+ASSISTANT_APP = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "AI Assistant Project", "app.py")
+
+# --- SCENARIOS ---
+# AppTest always executes the whole script, so these numbers are full-rerun costs. Fragment
+# reruns in a real browser session (chat input, safety toggle, recipe form) only run a
+# subset of that work and are cheaper still.
+
+def _timed(samples: dict, name: str, func):
+    start = time.perf_counter()
+    func()
+    samples.setdefault(name, []).append((time.perf_counter() - start) * 1000)
+
+
+def _seed_history(at, history: int):
+    """Fills the chat with `history` messages, the way a long session would look."""
+    messages = []
+    for i in range(history // 2):
+        messages.append({"role": "user", "content": f"Make me dinner number {i} with rice and eggs."})
+        messages.append({"role": "assistant", "content": f"✨ **Your meal is served: Dinner {i}!**\n\n" + "* rice, 1 cup\n" * 10})
+    at.session_state["messages"] = messages
+
+
+def bench_agent(repeats: int, history: int, timeout: float) -> dict:
+    from streamlit.testing.v1 import AppTest
+
+    samples = {}
+    for _ in range(repeats):
+        at = AppTest.from_file(AGENT_APP, default_timeout=timeout)
+        _timed(samples, "first_run", at.run)
+        _seed_history(at, history)
+        _timed(samples, "idle_rerun", at.run)
+        _timed(samples, "toggle_safety", lambda: at.sidebar.checkbox(key="sidebar_confirm_scheduling").check().run())
+        _timed(samples, "open_recipe_book", lambda: at.sidebar.radio[0].set_value("📚 Saved Recipe Book").run())
+        _timed(samples, "back_to_chat", lambda: at.sidebar.radio[0].set_value("💬 Chef Remy Chat").run())
+        _timed(samples, "chat_submit", lambda: at.chat_input[0].set_value("I have rice and eggs. Dinner for one.").run())
+        _timed(samples, "chat_turn_served", lambda: wait_for_jobs(at, timeout))
+        if at.exception:
+            raise RuntimeError(at.exception[0].message)
+    return samples
+
+
+def bench_assistant(repeats: int, timeout: float) -> dict:
+    from streamlit.testing.v1 import AppTest
+
+    samples = {}
+    for _ in range(repeats):
+        at = AppTest.from_file(ASSISTANT_APP, default_timeout=timeout)
+        _timed(samples, "first_run", at.run)
+        _timed(samples, "idle_rerun", at.run)
+        at.text_area(key="ingredients").set_value("rice, eggs, soy sauce")
+        _timed(samples, "submit_form", lambda: at.button[0].click().run())
+        _timed(samples, "rerun_after_submit", at.run)
+        if at.exception:
+            raise RuntimeError(at.exception[0].message)
+    return samples
+
+# --- REPORTING ---
+
+def summarize(samples: dict) -> dict:
+    report = {}
+    for name, values in samples.items():
+        ordered = sorted(values)
+        report[name] = {
+            "runs": len(ordered),
+            "p50_ms": round(metrics.percentile(ordered, 50), 1),
+            "p95_ms": round(metrics.percentile(ordered, 95), 1),
+            "max_ms": round(ordered[-1], 1),
+        }
+    return report
+
+
+def print_report(app: str, report: dict):
+    print(f"\n{app}")
+    print(f"{'scenario':<22} {'runs':>5} {'p50 ms':>9} {'p95 ms':>9} {'max ms':>9}")
+    for name, values in report.items():
+        print(f"{name:<22} {values['runs']:>5} {values['p50_ms']:>9} {values['p95_ms']:>9} {values['max_ms']:>9}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measures Streamlit cold-start and rerun latency of both apps against the mock Gemini API.")
+    parser.add_argument("--app", choices=["agent", "assistant", "both"], default="both")
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--history", type=int, default=100, help="chat messages already in the agent session")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="mock model latency; 0 isolates the app's own cost")
+    parser.add_argument("--timeout", type=float, default=60.0, help="seconds allowed per app run")
+    parser.add_argument("--port", type=int, default=8766, help="port for the assistant's mock endpoint")
+    parser.add_argument("--output", default=None, help="optional path for the JSON report")
+    args = parser.parse_args()
+
+    # The apps read these at import time
+    os.environ.update({
+        "GEMINI_MOCK": "1",
+        "GEMINI_MOCK_LATENCY_MS": str(args.latency_ms),
+        "GEMINI_MOCK_ERROR_RATE": "0",
+        "GEMINI_MOCK_429_RATE": "0",
+    })
+    output = os.path.abspath(args.output) if args.output else None
+    os.chdir(tempfile.mkdtemp(prefix="chef_rerun_")) # Keep recipes and memory written by the agent out of the repo
+
+    report = {}
+    if args.app in ("agent", "both"):
+        report["agent"] = summarize(bench_agent(args.repeats, args.history, args.timeout))
+        print_report(f"AI Agent ({args.history} messages in history)", report["agent"])
+    if args.app in ("assistant", "both"):
+        server = mock_gemini.serve(mock_gemini.MockGemini(latency_ms=args.latency_ms), port=args.port)
+        os.environ["GEMINI_API_BASE"] = f"http://127.0.0.1:{args.port}"
+        os.environ.setdefault("GEMINI_API_KEY", "offline-benchmark")
+        try:
+            report["assistant"] = summarize(bench_assistant(args.repeats, args.timeout))
+        finally:
+            server.shutdown()
+        print_report("AI Assistant", report["assistant"])
+
+    if output:
+        with open(output, 'w', encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nReport written to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+# Shared module: AI_Agent_Final/ and "AI Assistant Project/" each ship an identical copy so either
+# app runs from its own folder. Edit both copies together; AI_Agent_Final/tests/test_shared_modules.py
+# fails when they differ.
+import re
+from fractions import Fraction
+
+# --- Units (Quantities are converted to a base unit, scaled, then shown in the handiest unit) ---
+
+UNIT_ALIASES = {
+    "tsp": "tsp", "teaspoon": "tsp", "teaspoons": "tsp",
+    "tbsp": "tbsp", "tbs": "tbsp", "tablespoon": "tbsp", "tablespoons": "tbsp",
+    "cup": "cup", "cups": "cup",
+    "oz": "oz", "ounce": "oz", "ounces": "oz",
+    "lb": "lb", "lbs": "lb", "pound": "lb", "pounds": "lb",
+    "g": "g", "gram": "g", "grams": "g",
+    "kg": "kg", "kilogram": "kg", "kilograms": "kg",
+    "ml": "ml", "milliliter": "ml", "milliliters": "ml", "millilitre": "ml", "millilitres": "ml",
+    "l": "l", "liter": "l", "liters": "l", "litre": "l", "litres": "l",
+}
+
+# unit -> (dimension, size in the dimension's base unit)
+UNIT_SIZES = {
+    "tsp": ("volume", Fraction(1)), "tbsp": ("volume", Fraction(3)), "cup": ("volume", Fraction(48)),
+    "oz": ("weight", Fraction(1)), "lb": ("weight", Fraction(16)),
+    "g": ("metric_weight", Fraction(1)), "kg": ("metric_weight", Fraction(1000)),
+    "ml": ("metric_volume", Fraction(1)), "l": ("metric_volume", Fraction(1000)),
+}
+
+# Largest unit first; a quantity is shown in the first unit it fills at least `minimum` of
+DISPLAY_UNITS = {
+    "volume": [("cup", Fraction(1, 4)), ("tbsp", Fraction(1)), ("tsp", Fraction(0))],
+    "weight": [("lb", Fraction(1)), ("oz", Fraction(0))],
+    "metric_weight": [("kg", Fraction(1)), ("g", Fraction(0))],
+    "metric_volume": [("l", Fraction(1)), ("ml", Fraction(0))],
+}
+
+UNIT_NAMES = {
+    "tsp": ("teaspoon", "teaspoons"), "tbsp": ("tablespoon", "tablespoons"), "cup": ("cup", "cups"),
+    "oz": ("oz", "oz"), "lb": ("pound", "pounds"), "g": ("g", "g"), "kg": ("kg", "kg"), "ml": ("ml", "ml"), "l": ("l", "l"),
+}
+
+UNICODE_FRACTIONS = {"½": "1/2", "⅓": "1/3", "⅔": "2/3", "¼": "1/4", "¾": "3/4", "⅛": "1/8", "⅜": "3/8", "⅝": "5/8", "⅞": "7/8"}
+
+# --- Precompiled Patterns ---
+
+_NUMBER = r"(?:\d+\s+\d+/\d+|\d+/\d+|\d+(?:\.\d+)?)"
+_QUANTITY = re.compile(
+    rf"(?P<amount>{_NUMBER})(?:\s*(?:-|–|to)\s*(?P<upper>{_NUMBER}))?"
+    rf"(?:\s*(?P<unit>{'|'.join(sorted(UNIT_ALIASES, key=len, reverse=True))})\b\.?)?",
+    re.IGNORECASE,
+)
+_SERVINGS_LINE = re.compile(r"(\*\s*\*\*Servings:\*\*\s*<?)(\d+)(>?)", re.IGNORECASE)
+_INGREDIENT_HEADING = re.compile(r"(###\s*\*\*Ingredients[^\n]*?For\s+)(\d+)(\s+Servings)", re.IGNORECASE)
+_SECTION = re.compile(r"(###\s*\*\*Ingredients[^\n]*\n)(.*?)(?=\n###|\Z)", re.DOTALL | re.IGNORECASE)
+
+
+def parse_number(text: str) -> Fraction:
+    """'1 1/2' -> 3/2, '3/4' -> 3/4, '1.5' -> 3/2."""
+    total = Fraction(0)
+    for part in text.split():
+        total += Fraction(part)
+    return total
+
+
+def format_number(value: Fraction, unit: str = None) -> str:
+    """Rounds to a kitchen-friendly amount: 1/8 steps for imperial units, 1/2 for counts, whole metric units."""
+    if unit in ("g", "ml"):
+        return str(round(value))
+    step = 2 if unit is None else 8
+    rounded = Fraction(round(value * step), step) or Fraction(1, step)
+    # A third is a common measure, so prefer it over the nearest eighth when it is closer
+    thirds = Fraction(round(value * 3), 3)
+    if unit is not None and thirds.denominator == 3 and abs(thirds - value) < abs(rounded - value):
+        rounded = thirds
+    whole, remainder = divmod(rounded, 1)
+    if unit in ("kg", "l"):
+        return f"{float(rounded):g}"
+    if remainder == 0:
+        return str(int(whole))
+    fraction = f"{remainder.numerator}/{remainder.denominator}"
+    return f"{int(whole)} {fraction}" if whole else fraction
+
+
+def format_quantity(value: Fraction, unit: str) -> str:
+    """Converts to the handiest unit of the same kind and renders e.g. '1 1/2 cups'."""
+    dimension, size = UNIT_SIZES[unit]
+    base = value * size
+    for display_unit, minimum in DISPLAY_UNITS[dimension]:
+        amount = base / UNIT_SIZES[display_unit][1]
+        if amount >= minimum:
+            singular, plural = UNIT_NAMES[display_unit]
+            return f"{format_number(amount, display_unit)} {singular if amount <= 1 else plural}"
+    return f"{format_number(value, unit)} {unit}"
+
+
+def scale_text(text: str, factor: Fraction) -> str:
+    """Scales the first quantity (with its unit, if any) in an ingredient's amount text."""
+    for fraction_char, replacement in UNICODE_FRACTIONS.items():
+        text = re.sub(rf"(\d)\s*{fraction_char}", rf"\1 {replacement}", text).replace(fraction_char, replacement)
+
+    def _scale(match):
+        amount = parse_number(match.group("amount")) * factor
+        unit = UNIT_ALIASES.get((match.group("unit") or "").lower())
+        if match.group("upper"):
+            upper = parse_number(match.group("upper")) * factor
+            if unit:
+                singular, plural = UNIT_NAMES[unit]
+                return f"{format_number(amount, unit)}-{format_number(upper, unit)} {plural}"
+            return f"{format_number(amount)}-{format_number(upper)}"
+        if unit:
+            return format_quantity(amount, unit)
+        return format_number(amount)
+
+    return _QUANTITY.sub(_scale, text, count=1)
+
+
+def parse_servings(recipe_markdown: str):
+    """Reads the serving count from the template's '* **Servings:** N' line."""
+    match = _SERVINGS_LINE.search(recipe_markdown)
+    return int(match.group(2)) if match else None
+
+
+def rescale_recipe(recipe_markdown: str, to_servings: int, from_servings: int = None) -> str:
+    """
+    Rescales a recipe in the Chef Remy template to a new serving count, without an API call.
+
+    Every ingredient line ('* <INGREDIENT>, <QUANTITY>') gets its quantity scaled and shown in
+    the handiest unit (e.g. 12 teaspoons -> 1/4 cup); amounts like 'a pinch' or 'to taste'
+    are left as they are. Returns the recipe unchanged if the serving count is unknown.
+    """
+    from_servings = from_servings or parse_servings(recipe_markdown)
+    if not from_servings or from_servings == to_servings:
+        return recipe_markdown
+    factor = Fraction(to_servings, from_servings)
+
+    def _scale_line(line):
+        if not re.match(r"\s*[\*\-]\s+", line):
+            return line
+        name, sep, amount = line.partition(",")
+        if sep:
+            return f"{name}{sep}{scale_text(amount, factor)}"
+        return scale_text(line, factor) # '* 2 cups rice' style lines carry the amount up front
+
+    def _scale_section(match):
+        body = "\n".join(_scale_line(line) for line in match.group(2).split("\n"))
+        return f"{match.group(1)}{body}"
+
+    scaled = _SECTION.sub(_scale_section, recipe_markdown, count=1)
+    scaled = _SERVINGS_LINE.sub(lambda m: f"{m.group(1)}{to_servings}{m.group(3)}", scaled, count=1)
+    scaled = _INGREDIENT_HEADING.sub(lambda m: f"{m.group(1)}{to_servings}{m.group(3)}", scaled, count=1)
+    return scaled
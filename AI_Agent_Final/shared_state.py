@@ -0,0 +1,166 @@
+import os
+import re
+import json
+import time
+import random
+import shutil
+import hashlib
+import threading
+from collections import deque
+from contextlib import contextmanager
+
+try:
+    import fcntl  # POSIX
+except ImportError:
+    fcntl = None
+    import msvcrt  # Windows
+
+# --- Configuration ---
+STATE_DIR = os.environ.get("CHEF_STATE_DIR", "chef_state")  # users/<namespace>/ holds each user's shared state
+DEFAULT_USER = "default"  # Namespace of the pre-namespace data (open the app with ?user=default to use it)
+SESSION_TTL_DAYS = 7  # Generated namespaces (visitors who came without ?user=) idle for longer are deleted
+MAX_RETRIES = 10  # Optimistic update attempts before giving up with VersionConflict
+
+# --- Shared State (Safe across server processes) ---
+# Several Streamlit processes behind a load balancer share these files, so every write takes
+# an OS file lock (which also serializes threads), replaces the file atomically, and bumps
+# the document's version. Readers never lock: they always see a complete file.
+
+
+class VersionConflict(Exception):
+    """The document changed since it was read (or kept changing for MAX_RETRIES attempts)."""
+
+
+def namespace(user_id: str) -> str:
+    """A safe directory name for a user id: kept as is when simple, hashed otherwise."""
+    user_id = (user_id or "").strip()
+    if not user_id:
+        return DEFAULT_USER
+    if re.fullmatch(r"[A-Za-z0-9_-]{1,64}", user_id):
+        return user_id
+    return "u_" + hashlib.sha256(user_id.encode("utf-8")).hexdigest()[:24]
+
+
+def session_namespace(session_id: str) -> str:
+    """The private namespace generated for a visitor whose URL names no user; the app writes it back as ?user=."""
+    return f"s_{session_id}"
+
+
+_SESSION_NAMESPACE = re.compile(r"s_[0-9a-f]{32}")
+
+
+def prune_session_namespaces(root: str, ttl_days: float = SESSION_TTL_DAYS) -> int:
+    """Deletes the generated namespaces under `<root>/users/` that have not changed for `ttl_days`."""
+    users_dir = os.path.join(root, "users")
+    if not os.path.isdir(users_dir):
+        return 0
+    cutoff = time.time() - ttl_days * 86400
+    removed = 0
+    for name in os.listdir(users_dir):
+        path = os.path.join(users_dir, name)
+        try:
+            if _SESSION_NAMESPACE.fullmatch(name) and os.path.getmtime(path) < cutoff:
+                shutil.rmtree(path)
+                removed += 1
+        except OSError:
+            continue
+    return removed
+
+
+def user_path(user: str, name: str) -> str:
+    """Path of one state file in a user's namespace (the folder is created on demand)."""
+    directory = os.path.join(STATE_DIR, "users", namespace(user))
+    os.makedirs(directory, exist_ok=True)
+    return os.path.join(directory, name)
+
+
+_thread_locks = {}
+_thread_locks_guard = threading.Lock()
+
+
+@contextmanager
+def file_lock(path: str):
+    """Exclusive lock on `path` shared by every thread and process, held through a `<path>.lock` file."""
+    with _thread_locks_guard:
+        thread_lock = _thread_locks.setdefault(os.path.abspath(path), threading.Lock())
+    with thread_lock: # Windows locks are per process, so threads of one process also queue here
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(f"{path}.lock", "a+b") as handle:
+            if fcntl is not None:
+                fcntl.flock(handle.fileno(), fcntl.LOCK_EX)
+            else:
+                handle.seek(0)
+                msvcrt.locking(handle.fileno(), msvcrt.LK_LOCK, 1)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(handle.fileno(), fcntl.LOCK_UN)
+                else:
+                    handle.seek(0)
+                    msvcrt.locking(handle.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def _atomic_write(path: str, text: str) -> None:
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(tmp_path, path)
+
+# --- Versioned Documents ---
+
+
+def read_document(path: str, default):
+    """Returns (data, version); a missing or unreadable file gives (default, 0). Plain JSON without a version wrapper is version 0."""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            raw = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return json.loads(json.dumps(default)), 0
+    if isinstance(raw, dict) and set(raw) == {"version", "data"}:
+        return raw["data"], raw["version"]
+    return raw, 0
+
+
+def write_document(path: str, data, expected_version: int) -> int:
+    """Writes `data` if the file is still at `expected_version`; returns the new version or raises VersionConflict."""
+    with file_lock(path):
+        _, current_version = read_document(path, None)
+        if current_version != expected_version:
+            raise VersionConflict(f"{path} is at version {current_version}, expected {expected_version}")
+        _atomic_write(path, json.dumps({"version": current_version + 1, "data": data}))
+        return current_version + 1
+
+
+def update_document(path: str, mutate, default):
+    """
+    Read-modify-write with optimistic concurrency: `mutate(data)` edits the data in place
+    (and may return a value), then the write succeeds only if nobody wrote in between;
+    otherwise the latest data is re-read and `mutate` applied again. Returns mutate's result.
+    """
+    for attempt in range(MAX_RETRIES):
+        data, version = read_document(path, default)
+        result = mutate(data)
+        try:
+            write_document(path, data, version)
+            return result
+        except VersionConflict:
+            time.sleep(random.uniform(0, 0.01 * (attempt + 1))) # Back off so racing writers spread out
+    raise VersionConflict(f"Gave up updating {path} after {MAX_RETRIES} conflicting attempts")
+
+# --- Append-Only Logs ---
+
+
+def append_line(path: str, line: str) -> None:
+    with file_lock(path):
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(line.rstrip("\n") + "\n")
+
+
+def read_tail(path: str, count: int) -> list:
+    """The last `count` lines of a log, oldest first."""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return [line.rstrip("\n") for line in deque(f, maxlen=count)]
+    except FileNotFoundError:
+        return []
@@ -0,0 +1,16 @@
+import os
+import sys
+
+import pytest
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP_PATH = os.path.join(APP_DIR, "app.py")
+sys.path.insert(0, APP_DIR)
+
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    """Runs the test in an empty folder so state, stores and logs never touch the real ones."""
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("GEMINI_MOCK", "1")
+    return tmp_path
@@ -0,0 +1,39 @@
+import pytest
+
+import constraints
+
+
+def recipe(*ingredients):
+    lines = "\n".join(f"* {item}" for item in ingredients)
+    return f"## **Test Dish**\n\n### **Ingredients:**\n\n{lines}\n\n### **Instructions:**\n\n1. Cook.\n"
+
+
+def test_only_known_words_take_an_oes_plural():
+    assert "pistachioes" not in constraints.variants("pistachio")
+    assert "tomatoes" in constraints.variants("tomato")
+
+
+@pytest.mark.parametrize("ingredient", ["peanut butter, 2 tbsp", "coconut milk, 1 can", "oat milk, 1 cup", "vegan cheese, 50g"])
+def test_plant_based_compounds_are_not_dairy(ingredient):
+    assert constraints.find_violations(recipe(ingredient), "Test Dish", ["dairy"], []) == []
+
+
+@pytest.mark.parametrize("ingredient, found", [("butter, 1 tbsp", "butter"), ("cream cheese, 100g", "cream"), ("ice cream", "cream")])
+def test_dairy_is_still_flagged(ingredient, found):
+    assert constraints.find_violations(recipe(ingredient), "Test Dish", ["dairy"], []) == [
+        constraints.Violation("disliked", "dairy", found)
+    ]
+
+
+def test_a_nut_dislike_still_catches_peanut_butter():
+    assert constraints.find_violations(recipe("peanut butter, 2 tbsp"), "Test Dish", ["nut"], []) == [
+        constraints.Violation("disliked", "nut", "peanut")
+    ]
+
+
+def test_resolved_keeps_only_the_violations_a_repair_removed():
+    onions = constraints.Violation("disliked", "onion", "onions")
+    mushrooms = constraints.Violation("disliked", "mushroom", "mushroom")
+    remaining = [constraints.Violation("disliked", "mushroom", "mushrooms")]
+    assert constraints.resolved([onions, mushrooms], remaining) == [onions]
+    assert constraints.describe(remaining) == "mushrooms"
@@ -0,0 +1,64 @@
+import pytest
+from streamlit.testing.v1 import AppTest
+
+import intents
+import recipe_store
+from conftest import APP_PATH
+
+TITLES = ["Quick Egg Fried Rice", "Chicken and Lime Fiesta Bowl"]
+
+
+@pytest.mark.parametrize("message", [
+    "remove the onions",
+    "forget it",
+    "remove it",
+    "forget the tacos",
+    "remove the onions from the recipe",
+])
+def test_delete_words_without_a_recipe_reach_the_llm(message):
+    assert intents.classify(message, TITLES).name == intents.GENERATE
+
+
+@pytest.mark.parametrize("message, argument", [
+    ("delete the fried rice", "fried rice"),
+    ("get rid of the fiesta bowl", "fiesta bowl"),
+    ("Delete my fried rice recipe", "fried rice"),
+    ("delete the pasta recipe", "pasta"), # Says "recipe", so the handler explains nothing matched
+])
+def test_delete_of_a_saved_or_named_recipe(message, argument):
+    assert intents.classify(message, TITLES) == intents.Intent(intents.DELETE, argument)
+
+
+def test_delete_stages_confirmation_with_the_recipe_title(workdir):
+    recipe_store.shared("tester").save("Quick Egg Fried Rice", "## **Recipe Name: Quick Egg Fried Rice**\n")
+    at = AppTest.from_file(APP_PATH, default_timeout=30)
+    at.query_params["user"] = "tester"
+    at.run()
+    at.chat_input[0].set_value("delete the fried rice").run()
+
+    staged = at.session_state["confirm_dislikes"]
+    assert staged["slug"] == "Quick_Egg_Fried_Rice"
+    assert staged["title"] == "Quick Egg Fried Rice"
+
+
+@pytest.mark.parametrize("message, target", [
+    ("scale to 3 servings", 3),
+    ("make it 4 servings", 4),
+    ("make it for 4 people", 4),
+    ("scale it to six", 6),
+    ("double it", 2.0),
+    ("for 5 people instead", 5),
+])
+def test_resize_requests_are_answered_locally(message, target):
+    assert intents.classify(message) == intents.Intent(intents.SCALE, target)
+
+
+@pytest.mark.parametrize("message", [
+    "make pasta",
+    "make it spicy",
+    "change it to vegan",
+    "make dinner for two",
+    "make 4 pancakes",
+])
+def test_make_requests_that_are_not_resizes_reach_the_llm(message):
+    assert intents.classify(message).name == intents.GENERATE
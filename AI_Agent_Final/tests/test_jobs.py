@@ -0,0 +1,46 @@
+import time
+
+from streamlit.testing.v1 import AppTest
+
+import jobs
+from conftest import APP_PATH
+
+
+def _finished_job(status, owner="test"):
+    job = jobs.Job(owner, "rice and eggs for dinner")
+    job.status = status
+    job.finished_at = time.time()
+    with jobs._lock:
+        jobs._jobs[job.job_id] = job
+    return job
+
+
+def _audit_log(workdir):
+    path = workdir / "chef_agent_log.txt"
+    return path.read_text(encoding="utf-8") if path.exists() else ""
+
+
+def test_cancelled_job_is_not_reported_as_a_failure(workdir):
+    job = _finished_job(jobs.CANCELLED)
+    at = AppTest.from_file(APP_PATH, default_timeout=30)
+    at.session_state["pending_jobs"] = [job.job_id]
+    at.run()
+
+    replies = [m["content"] for m in at.session_state["messages"] if m["role"] == "assistant"]
+    assert len(replies) == 1
+    assert "cancelled" in replies[0]
+    assert "couldn't generate" not in replies[0]
+    assert "JOB_FAILED" not in _audit_log(workdir)
+    assert jobs.get(job.job_id) is None
+
+
+def test_failed_job_still_reports_the_failure(workdir):
+    job = _finished_job(jobs.FAILED)
+    job.error = "RuntimeError: boom"
+    at = AppTest.from_file(APP_PATH, default_timeout=30)
+    at.session_state["pending_jobs"] = [job.job_id]
+    at.run()
+
+    replies = [m["content"] for m in at.session_state["messages"] if m["role"] == "assistant"]
+    assert any("couldn't generate" in reply for reply in replies)
+    assert "JOB_FAILED" in _audit_log(workdir)
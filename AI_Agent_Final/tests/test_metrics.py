@@ -0,0 +1,45 @@
+import json
+import time
+
+from streamlit.testing.v1 import AppTest
+
+import metrics
+from conftest import APP_PATH
+
+
+def _traces(path):
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+
+def _chat(at, message, timeout=30):
+    at.chat_input[0].set_value(message).run()
+    deadline = time.time() + timeout
+    while at.session_state["pending_jobs"]:
+        assert time.time() < deadline, "generation job still pending"
+        time.sleep(0.05)
+        at.run()
+
+
+def test_one_turn_can_be_rebuilt_from_its_traces(workdir, monkeypatch):
+    monkeypatch.setattr(metrics, "METRICS_JSONL_FILE", str(workdir / "traces.jsonl"))
+    at = AppTest.from_file(APP_PATH, default_timeout=30)
+    at.run()
+    _chat(at, "I have rice, eggs and soy sauce. Make a quick dinner for one.")
+
+    traces = _traces(workdir / "traces.jsonl")
+    turn = next(t for t in traces if t["name"] == "process_query_and_run")
+    assert {"route_intent", "create_recipe_prompt"} <= {span["stage"] for span in turn["spans"]}
+    same_turn = {t["name"] for t in traces if t["trace_id"] == turn["trace_id"]}
+    assert same_turn == {"process_query_and_run", "generation_job", "apply_generation_result"}
+
+
+def test_local_replies_are_traced(workdir, monkeypatch):
+    monkeypatch.setattr(metrics, "METRICS_JSONL_FILE", str(workdir / "traces.jsonl"))
+    at = AppTest.from_file(APP_PATH, default_timeout=30)
+    at.run()
+    _chat(at, "show my recipes")
+
+    turns = [t for t in _traces(workdir / "traces.jsonl") if t["name"] == "process_query_and_run"]
+    assert len(turns) == 1
+    assert [span["stage"] for span in turns[0]["spans"]] == ["route_intent"]
@@ -0,0 +1,57 @@
+import recipe_store
+
+INGREDIENTS = [f"* ingredient number {i}, {i} cups" for i in range(1, 31)]
+STEPS = [f"{i}. Stir ingredient number {i} into the pot and simmer gently." for i in range(1, 21)]
+
+
+def recipe(title, steps=STEPS):
+    return "\n".join([f"## **Recipe Name: {title}**", "", "### **Ingredients:**", *INGREDIENTS, "", "### **Instructions:**", *steps]) + "\n"
+
+
+BASE = recipe("Vegetable Stew")
+VARIATION = recipe("Vegetable Stew Deluxe", STEPS[:-1] + ["20. Finish with fresh parsley and serve hot with crusty bread."])
+
+
+def test_saving_the_same_recipe_twice_is_unchanged(workdir):
+    store = recipe_store.RecipeStore("store")
+    first = store.save("Vegetable Stew", BASE)
+    second = store.save("Vegetable Stew", BASE)
+
+    assert first.status == "new"
+    assert second.status == "unchanged"
+    assert second.version == 1
+    assert store.usage()["bodies"] == 1
+
+
+def test_near_duplicate_is_stored_as_a_delta_and_reads_back_exactly(workdir):
+    store = recipe_store.RecipeStore("store")
+    base = store.save("Vegetable Stew", BASE)
+    variation = store.save("Vegetable Stew Deluxe", VARIATION)
+
+    assert variation.status == "near_duplicate"
+    assert variation.similar_to == "Vegetable Stew"
+    assert variation.stored_bytes < base.stored_bytes
+    assert store.read(variation.slug).encode("utf-8") == VARIATION.encode("utf-8")
+
+
+def test_deleting_the_base_recipe_keeps_the_delta_readable(workdir):
+    store = recipe_store.RecipeStore("store")
+    base = store.save("Vegetable Stew", BASE)
+    variation = store.save("Vegetable Stew Deluxe", VARIATION)
+
+    assert store.delete(base.slug)
+    assert [slug for slug, *_ in store.list_recipes()] == [variation.slug]
+    assert store.read(variation.slug) == VARIATION
+    # A fresh store reads only what is on disk, so the base body must still be there
+    assert recipe_store.RecipeStore("store").read(variation.slug) == VARIATION
+
+
+def test_a_second_store_on_the_same_root_sees_changes(workdir):
+    first = recipe_store.RecipeStore("store")
+    second = recipe_store.RecipeStore("store")
+    saved = first.save("Vegetable Stew", BASE)
+
+    assert second.read(saved.slug) == BASE
+    assert second.save("Vegetable Stew", BASE).status == "unchanged"
+    assert second.delete(saved.slug)
+    assert first.list_recipes() == []
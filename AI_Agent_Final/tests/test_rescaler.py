@@ -0,0 +1,67 @@
+from fractions import Fraction
+
+import pytest
+from streamlit.testing.v1 import AppTest
+
+import rescaler
+from conftest import APP_PATH
+
+RECIPE = """## **Recipe Name: Garlic Rice**
+
+* **Servings:** 2
+
+### **Ingredients (For 2 Servings):**
+
+* rice, 1 1/2 cups
+* butter, ½ tbsp
+* garlic, 2-3 cloves
+* salt, to taste
+
+### **Instructions:**
+
+1. Cook the rice.
+"""
+
+
+@pytest.mark.parametrize("amount, factor, expected", [
+    (", 1 1/2 cups", 2, ", 3 cups"),                      # Mixed number
+    (", 1½ cups", 2, ", 3 cups"),                          # Unicode fraction after a whole number
+    (", ½ cup", Fraction(1, 2), ", 1/4 cup"),              # Unicode fraction on its own
+    (", 2-3 cloves", 2, ", 4-6 cloves"),                   # Range without a unit
+    (", 2 to 3 tbsp", 2, ", 4-6 tablespoons"),             # Range with a unit
+    (", 12 tsp", 1, ", 1/4 cup"),                          # Promoted to a larger unit
+    (", 1/4 cup", Fraction(1, 4), ", 1 tablespoon"),       # Demoted to a smaller unit
+    (", 8 oz", 2, ", 1 pound"),
+    (", 1 lb", Fraction(1, 2), ", 8 oz"),
+    (", to taste", 3, ", to taste"),                       # Nothing to scale
+    (", a pinch", 2, ", a pinch"),
+])
+def test_scale_text(amount, factor, expected):
+    assert rescaler.scale_text(amount, Fraction(factor)) == expected
+
+
+def test_rescale_recipe_updates_servings_and_quantities():
+    scaled = rescaler.rescale_recipe(RECIPE, 4)
+    assert rescaler.parse_servings(scaled) == 4
+    assert "Ingredients (For 4 Servings)" in scaled
+    assert "* rice, 3 cups" in scaled
+    assert "* butter, 1 tablespoon" in scaled
+    assert "* garlic, 4-6 cloves" in scaled
+    assert "* salt, to taste" in scaled
+    assert "1. Cook the rice." in scaled
+
+
+def test_rescale_recipe_without_a_serving_count_is_unchanged():
+    assert rescaler.rescale_recipe("* rice, 1 cup", 4) == "* rice, 1 cup"
+
+
+def test_repeated_resizes_start_from_the_generated_recipe(workdir):
+    at = AppTest.from_file(APP_PATH, default_timeout=30)
+    at.session_state["last_recipe_title"] = "Garlic Rice"
+    at.session_state["last_recipe_markdown"] = RECIPE
+    at.run()
+    for message in ["scale to 3 servings", "scale to 7 servings", "scale to 4 servings"]:
+        at.chat_input[0].set_value(message).run()
+
+    assert at.session_state["last_recipe_markdown"] == RECIPE
+    assert at.session_state["messages"][-1]["content"].endswith(rescaler.rescale_recipe(RECIPE, 4))
@@ -0,0 +1,16 @@
+import os
+
+import pytest
+
+from conftest import APP_DIR
+
+ASSISTANT_DIR = os.path.join(os.path.dirname(APP_DIR), "AI Assistant Project")
+
+# Modules both apps use; each folder keeps its own copy so it runs standalone
+SHARED_MODULES = ["model_router.py", "rescaler.py", "hedging.py"]
+
+
+@pytest.mark.parametrize("name", SHARED_MODULES)
+def test_shared_module_copies_are_identical(name):
+    with open(os.path.join(APP_DIR, name), "rb") as agent_copy, open(os.path.join(ASSISTANT_DIR, name), "rb") as assistant_copy:
+        assert agent_copy.read() == assistant_copy.read(), f"{name} differs between the two apps; copy the change to both"
@@ -0,0 +1,63 @@
+import os
+import time
+
+from streamlit.testing.v1 import AppTest
+
+import shared_state
+from conftest import APP_PATH
+
+
+def _session(user=None):
+    at = AppTest.from_file(APP_PATH, default_timeout=30)
+    if user is not None:
+        at.query_params["user"] = user
+    at.run()
+    return at.session_state["user_id"]
+
+
+def test_sessions_without_a_user_get_their_own_namespace(workdir):
+    first, second = _session(), _session()
+    assert first != second
+    assert shared_state.DEFAULT_USER not in (first, second)
+
+
+def test_generated_namespace_is_written_to_the_url_and_reused(workdir):
+    at = AppTest.from_file(APP_PATH, default_timeout=30)
+    at.run()
+    at.chat_input[0].set_value("I don't like mushrooms").run()
+    generated = at.query_params["user"]
+    assert generated == at.session_state["user_id"]
+
+    reloaded = AppTest.from_file(APP_PATH, default_timeout=30)
+    reloaded.query_params["user"] = generated
+    reloaded.run()
+    assert reloaded.session_state["user_id"] == generated
+    assert "**Disliked Ingredients (1):** mushrooms" in [caption.value for caption in reloaded.sidebar.caption]
+
+
+def test_sessions_with_the_same_user_share_a_namespace(workdir):
+    assert _session("alice") == _session("alice") == "alice"
+
+
+def test_only_idle_session_namespaces_are_pruned(workdir):
+    idle = shared_state.session_namespace("a" * 32)
+    active = shared_state.session_namespace("b" * 32)
+    for user in (idle, active, "s_named_by_a_user"):
+        shared_state.update_document(shared_state.user_path(user, "meal_history.json"), lambda data: None, {})
+    week_ago = time.time() - 8 * 86400
+    os.utime(os.path.join(shared_state.STATE_DIR, "users", idle), (week_ago, week_ago))
+    os.utime(os.path.join(shared_state.STATE_DIR, "users", "s_named_by_a_user"), (week_ago, week_ago))
+
+    assert shared_state.prune_session_namespaces(shared_state.STATE_DIR) == 1
+    assert sorted(os.listdir(os.path.join(shared_state.STATE_DIR, "users"))) == sorted([active, "s_named_by_a_user"])
+
+
+def test_back_to_back_updates_are_read_back(workdir):
+    at = AppTest.from_file(APP_PATH, default_timeout=30)
+    at.query_params["user"] = "alice"
+    at.run()
+    for message in ["I don't like mushrooms", "I don't like olives", "I hate cilantro"]:
+        at.chat_input[0].set_value(message).run()
+
+    disliked = [caption.value for caption in at.sidebar.caption if "Disliked" in caption.value]
+    assert disliked == ["**Disliked Ingredients (3):** mushrooms, olives, cilantro"]
@@ -0,0 +1,87 @@
+from datetime import datetime
+
+import pytest
+
+import weather
+
+
+def mock_weather_api(hour, location="Your Area"):
+    """The app's original hard-coded weather, which the default provider must keep reproducing."""
+    if 6 <= hour < 10:
+        return f"The current weather in {location} is 55°F (13°C) and cloudy. Perfect for a warm breakfast."
+    elif 10 <= hour < 16:
+        return f"The current weather in {location} is 88°F (31°C) and sunny. Highly recommend a COOL, NO-COOK meal."
+    else: # Evening/Night
+        return f"The current weather in {location} is 68°F (20°C) and clear. Good for a comforting dinner."
+
+
+@pytest.fixture
+def at_hour(monkeypatch):
+    def _set(hour):
+        class FixedDatetime(datetime):
+            @classmethod
+            def now(cls, tz=None):
+                return datetime(2025, 1, 1, hour, 30)
+        monkeypatch.setattr(weather, "datetime", FixedDatetime)
+    return _set
+
+
+@pytest.mark.parametrize("provider", [weather.FileProvider, weather.ClockProvider])
+@pytest.mark.parametrize("hour", range(24))
+def test_offline_providers_match_the_original_mock(at_hour, provider, hour):
+    at_hour(hour)
+    assert weather.describe(provider().fetch("Your Area")) == mock_weather_api(hour)
+
+
+def test_provider_must_implement_fetch():
+    class Incomplete(weather.WeatherProvider):
+        name = "incomplete"
+
+    with pytest.raises(TypeError):
+        Incomplete()
+
+
+class CountingProvider(weather.WeatherProvider):
+    """Fails while `failing` is set; counts every fetch."""
+    name = "counting"
+
+    def __init__(self):
+        self.calls = 0
+        self.failing = False
+
+    def fetch(self, location):
+        self.calls += 1
+        if self.failing:
+            raise OSError("weather service down")
+        return weather.Report(location, 70, "clear", weather.time.time())
+
+
+def test_a_finished_refresh_is_served_as_fresh():
+    provider = CountingProvider()
+    cache = weather.WeatherCache(provider)
+    cache.get("Town")
+    cache._executor.shutdown(wait=True)
+
+    assert cache._refreshing == set()
+    assert cache.get("Town").temp_f == 70
+    assert provider.calls == 1
+
+
+def test_failed_refresh_is_not_retried_during_the_cooldown(monkeypatch):
+    provider = CountingProvider()
+    provider.failing = True
+    cache = weather.WeatherCache(provider)
+    cache.refresh("Town")
+    cache._executor.shutdown(wait=True)
+    cache._executor = weather.ThreadPoolExecutor(max_workers=1)
+
+    cache.refresh("Town")
+    assert provider.calls == 1
+
+    provider.failing = False
+    later = weather.time.time() + weather.FAILURE_COOLDOWN_SECONDS + 1
+    monkeypatch.setattr(weather.time, "time", lambda: later)
+    cache.refresh("Town")
+    cache._executor.shutdown(wait=True)
+    assert provider.calls == 2
+    assert cache._failed_at == {}
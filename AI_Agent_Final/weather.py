@@ -0,0 +1,201 @@
+import os
+import json
+import time
+import threading
+import urllib.request
+import urllib.parse
+from abc import ABC, abstractmethod
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import metrics
+
+# --- Configuration ---
+WEATHER_PROVIDER = os.environ.get("CHEF_WEATHER_PROVIDER", "file")  # "file" (offline stand-in), "open-meteo" or "clock"
+WEATHER_LOCATION = os.environ.get("CHEF_WEATHER_LOCATION", "Your Area")
+WEATHER_LATITUDE = os.environ.get("CHEF_WEATHER_LAT", "")  # Needed by the open-meteo provider
+WEATHER_LONGITUDE = os.environ.get("CHEF_WEATHER_LON", "")
+WEATHER_FILE = os.environ.get("CHEF_WEATHER_FILE", os.path.join(os.path.dirname(os.path.abspath(__file__)), "weather_stub.json"))
+BUCKET_SECONDS = 3600  # Reports are cached per location and hour
+FRESH_SECONDS = 900  # Younger reports are served as they are; older ones are served while a refresh runs
+STALE_SECONDS = 3 * 3600  # Older than this a report is no longer used, even as a placeholder
+FETCH_TIMEOUT = 5
+FAILURE_COOLDOWN_SECONDS = 60  # After a failed fetch, no new refresh for the location is started for this long
+
+Report = namedtuple("Report", ["location", "temp_f", "conditions", "fetched_at"])
+
+
+def describe(report: Report) -> str:
+    """The sentence injected into the prompt, e.g. 'The current weather in X is 88°F (31°C) and sunny. ...'"""
+    temp_c = round((report.temp_f - 32) * 5 / 9)
+    # Same wording as the original mock_weather_api, so the default stub yields the same prompts
+    if report.temp_f >= 80:
+        advice = "Highly recommend a COOL, NO-COOK meal."
+    elif report.temp_f <= 58:
+        advice = "Perfect for a warm breakfast."
+    else:
+        advice = "Good for a comforting dinner."
+    return f"The current weather in {report.location} is {round(report.temp_f)}°F ({temp_c}°C) and {report.conditions}. {advice}"
+
+# --- Providers (fetch() may block; it is only ever called on the refresh thread) ---
+
+
+class WeatherProvider(ABC):
+    """Returns the current conditions for a location."""
+    name = "base"
+
+    @abstractmethod
+    def fetch(self, location: str) -> Report:
+        """Current conditions for `location`; may block and may raise."""
+
+
+class ClockProvider(WeatherProvider):
+    """Guesses from the time of day alone; no I/O, so it is also the placeholder before the first real report."""
+    name = "clock"
+
+    def fetch(self, location: str) -> Report:
+        hour = datetime.now().hour
+        if 6 <= hour < 10:
+            return Report(location, 55, "cloudy", time.time())
+        if 10 <= hour < 16:
+            return Report(location, 88, "sunny", time.time())
+        return Report(location, 68, "clear", time.time())
+
+
+class FileProvider(WeatherProvider):
+    """
+    Offline stand-in that reads conditions from a local JSON file: for each location (or "*"),
+    a list of {"from_hour", "to_hour", "temp_f", "conditions"} bands for the time of day.
+    """
+    name = "file"
+
+    def __init__(self, path: str = WEATHER_FILE):
+        self.path = path
+
+    def fetch(self, location: str) -> Report:
+        with open(self.path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        bands = data.get(location) or data["*"]
+        hour = datetime.now().hour
+        for band in bands:
+            if band["from_hour"] <= hour < band["to_hour"]:
+                return Report(location, band["temp_f"], band["conditions"], time.time())
+        return Report(location, bands[-1]["temp_f"], bands[-1]["conditions"], time.time())
+
+
+class OpenMeteoProvider(WeatherProvider):
+    """Live conditions from the free Open-Meteo API (no key needed) for a fixed latitude/longitude."""
+    name = "open-meteo"
+    URL = "https://api.open-meteo.com/v1/forecast"
+    CONDITIONS = [(0, "clear"), (3, "partly cloudy"), (48, "foggy"), (67, "rainy"), (77, "snowy"), (82, "showery"), (99, "stormy")]
+
+    def __init__(self, latitude: str = WEATHER_LATITUDE, longitude: str = WEATHER_LONGITUDE):
+        self.latitude = latitude
+        self.longitude = longitude
+
+    def fetch(self, location: str) -> Report:
+        query = urllib.parse.urlencode({
+            "latitude": self.latitude,
+            "longitude": self.longitude,
+            "current": "temperature_2m,weather_code",
+            "temperature_unit": "fahrenheit",
+        })
+        with urllib.request.urlopen(f"{self.URL}?{query}", timeout=FETCH_TIMEOUT) as response:
+            current = json.loads(response.read())["current"]
+        code = current.get("weather_code", 0)
+        conditions = next((name for limit, name in self.CONDITIONS if code <= limit), "stormy")
+        return Report(location, float(current["temperature_2m"]), conditions, time.time())
+
+
+PROVIDERS = {"clock": ClockProvider, "file": FileProvider, "open-meteo": OpenMeteoProvider}
+
+# --- Cache (Stale-while-revalidate, one refresh per key at a time) ---
+
+
+class WeatherCache:
+    """
+    Serves weather reports without ever blocking the caller.
+
+    Reports are cached per (location, hour bucket). A fresh report is returned as is; a
+    stale one (or the last hour's) is returned while a background refresh replaces it; with
+    nothing cached the clock-based guess is returned and a refresh is started. Concurrent
+    lookups of the same key share one in-flight refresh, and a failed refresh is not retried
+    until the cooldown has passed.
+    """
+    def __init__(self, provider: WeatherProvider):
+        self.provider = provider
+        self._fallback = ClockProvider()
+        self._lock = threading.Lock()
+        self._reports = {}  # (location, bucket) -> Report
+        self._latest = {}  # location -> newest Report, used across bucket boundaries
+        self._refreshing = set()  # keys with a refresh in flight
+        self._failed_at = {}  # location -> time of the last failed refresh
+        self._executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="chef-weather")
+
+    @staticmethod
+    def _key(location: str, now: float) -> tuple:
+        return location, int(now // BUCKET_SECONDS)
+
+    def get(self, location: str = WEATHER_LOCATION) -> Report:
+        now = time.time()
+        key = self._key(location, now)
+        with self._lock:
+            report = self._reports.get(key) or self._latest.get(location)
+        if report and now - report.fetched_at < FRESH_SECONDS and key in self._reports:
+            metrics.increment("weather.fresh")
+            return report
+        self.refresh(location)
+        if report and now - report.fetched_at < STALE_SECONDS:
+            metrics.increment("weather.stale")
+            return report
+        metrics.increment("weather.miss")
+        return self._fallback.fetch(location)
+
+    def refresh(self, location: str = WEATHER_LOCATION) -> None:
+        """Starts a background refresh for the current bucket unless one is already running or recently failed."""
+        now = time.time()
+        key = self._key(location, now)
+        with self._lock:
+            if key in self._refreshing or now - self._failed_at.get(location, 0) < FAILURE_COOLDOWN_SECONDS:
+                return
+            self._refreshing.add(key)
+        self._executor.submit(self._refresh, key)
+
+    def _refresh(self, key: tuple) -> None:
+        location = key[0]
+        report = None
+        try:
+            with metrics.span("weather_refresh", provider=self.provider.name):
+                report = self.provider.fetch(location)
+        except Exception:
+            metrics.increment("weather.refresh_failed") # Keep serving the previous report
+        # Store and release the key together, so no lookup sees neither the report nor the refresh
+        with self._lock:
+            self._refreshing.discard(key)
+            if report is None:
+                self._failed_at[location] = time.time()
+                return
+            self._failed_at.pop(location, None)
+            self._reports[key] = report
+            self._latest[location] = report
+            for old_key in [k for k in self._reports if k[0] == location and k[1] < key[1]]:
+                del self._reports[old_key]
+
+
+_shared = None
+_shared_lock = threading.Lock()
+
+
+def shared() -> WeatherCache:
+    """Process-wide cache for the configured provider, shared by every session and rerun."""
+    global _shared
+    with _shared_lock:
+        if _shared is None:
+            _shared = WeatherCache(PROVIDERS.get(WEATHER_PROVIDER, FileProvider)())
+        return _shared
+
+
+def current_report(location: str = WEATHER_LOCATION) -> str:
+    """The weather sentence for the prompt; returns immediately, whatever the provider's latency."""
+    return describe(shared().get(location))